@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Error taxonomy report over every request log and errors.log
+
+Normalises error messages into fingerprints and keeps per-fingerprint
+counts, first/last seen and affected endpoints/cards. State is saved in
+.cache/ so each run only reads rows appended since the previous run.
+"""
+
+import argparse
+import json
+import sys
+
+from shared.utils.error_taxonomy import ErrorTaxonomy, default_state_path
+
+
+def top_items(counts, limit=3):
+    """Format the most frequent keys of a count dict"""
+    ranked = sorted(counts.items(), key=lambda item: -item[1])[:limit]
+    more = len(counts) - len(ranked)
+    text = ', '.join(f"{key}×{count}" for key, count in ranked)
+    return text + (f" (+{more} more)" if more > 0 else '')
+
+
+def print_report(taxonomy, limit):
+    total_errors = sum(entry['count'] for entry in taxonomy.fingerprints.values())
+    print(f"📊 {total_errors} errors in {taxonomy.rows_seen} rows, "
+          f"{len(taxonomy.fingerprints)} distinct fingerprints")
+    print("=" * 80)
+    for fingerprint, entry in taxonomy.ranked()[:limit]:
+        print(f"\n[{entry['count']:>4}] {entry['category']:<16} {fingerprint}")
+        print(f"       first {entry['first_seen'][:19]}  last {entry['last_seen'][:19]}")
+        print(f"       endpoints: {top_items(entry['endpoints'])}")
+        if entry['cards']:
+            print(f"       cards:     {top_items(entry['cards'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Aggregate request errors into fingerprints')
+    parser.add_argument('--state', default=default_state_path(), help='taxonomy state file')
+    parser.add_argument('--rebuild', action='store_true', help='ignore saved state and rescan everything')
+    parser.add_argument('--logs', nargs='+', help='request log CSVs (default: every request log)')
+    parser.add_argument('--include-archive', action='store_true', help='also read logs/archive/')
+    parser.add_argument('--error-logs', nargs='*', help='errors.log files (default: all found)')
+    parser.add_argument('--limit', type=int, default=25, help='fingerprints to show')
+    parser.add_argument('--json', action='store_true', help='print the full taxonomy as JSON')
+    args = parser.parse_args(argv)
+
+    taxonomy = ErrorTaxonomy() if args.rebuild else ErrorTaxonomy.load(args.state)
+    added = taxonomy.update(args.logs, args.error_logs, include_archive=args.include_archive)
+    taxonomy.save(args.state)
+
+    if args.json:
+        json.dump(dict(taxonomy.ranked()), sys.stdout, indent=2)
+        print()
+    else:
+        print(f"🔄 Read {added} new rows")
+        print_report(taxonomy, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,8 @@ from datetime import datetime
 import time
 import glob
 
+from shared.utils.timeout_policy import request_timeout
+
 def load_api_key():
     """Load API key from .env file or environment variable"""
     api_key = os.getenv('REACT_APP_SEGMIND_API_KEY')
@@ -56,7 +58,7 @@ def perform_v2_face_swap(source_path, target_path, output_path, metadata_path):
     
     try:
         start_time = time.time()
-        response = requests.post(API_URL, json=data, headers=headers, timeout=60)
+        response = requests.post(API_URL, json=data, headers=headers, timeout=request_timeout('v2'))
         request_time = time.time() - start_time
         
         response.raise_for_status()
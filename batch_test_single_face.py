@@ -12,6 +12,9 @@ from datetime import datetime
 import time
 import glob
 
+from shared.utils.stand_in import route_url
+from shared.utils.timeout_policy import request_timeout
+
 def load_api_key():
     """Load API key from .env file or environment variable"""
     api_key = os.getenv('REACT_APP_SEGMIND_API_KEY')
@@ -35,7 +38,7 @@ def image_file_to_base64(image_path):
 def perform_face_swap_v2(source_path, target_path, output_path, metadata_path):
     """Perform V2 face swap with single face (index 0)"""
     API_KEY = load_api_key()
-    API_URL = "https://api.segmind.com/v1/faceswap-v2"
+    API_URL = route_url("https://api.segmind.com/v1/faceswap-v2")
     
     source_base64 = image_file_to_base64(source_path)
     target_base64 = image_file_to_base64(target_path)
@@ -56,7 +59,7 @@ def perform_face_swap_v2(source_path, target_path, output_path, metadata_path):
     
     try:
         start_time = time.time()
-        response = requests.post(API_URL, json=data, headers=headers, timeout=120)
+        response = requests.post(API_URL, json=data, headers=headers, timeout=request_timeout('v2'))
         request_time = time.time() - start_time
         
         response.raise_for_status()
@@ -96,7 +99,7 @@ def perform_face_swap_v2(source_path, target_path, output_path, metadata_path):
 def perform_face_swap_v4(source_path, target_path, output_path, metadata_path):
     """Perform V4 face swap with single face (index 0)"""
     API_KEY = load_api_key()
-    API_URL = "https://api.segmind.com/v1/faceswap-v4"  # V4 endpoint for single face
+    API_URL = route_url("https://api.segmind.com/v1/faceswap-v4")  # V4 endpoint for single face
     
     source_base64 = image_file_to_base64(source_path)
     target_base64 = image_file_to_base64(target_path)
@@ -118,7 +121,7 @@ def perform_face_swap_v4(source_path, target_path, output_path, metadata_path):
     
     try:
         start_time = time.time()
-        response = requests.post(API_URL, json=data, headers=headers, timeout=120)
+        response = requests.post(API_URL, json=data, headers=headers, timeout=request_timeout('v4'))
         request_time = time.time() - start_time
         
         response.raise_for_status()
@@ -0,0 +1,91 @@
+"""
+Review page generators over the synthetic results tree (10k combinations by default)
+"""
+import importlib
+import itertools
+import json
+
+import pytest
+
+import build_reports
+import generate_comparison_review_page
+import generate_multiface_comparison
+import generate_review_page
+import generate_single_face_review
+import generate_single_face_review_updated
+from shared.utils import fragments, latency_histogram, results_index, stats_rollups
+
+GENERATORS = [
+    (generate_multiface_comparison, 'generate_multiface_comparison'),
+    (generate_single_face_review, 'generate_single_face_review_html'),
+    (generate_single_face_review_updated, 'generate_single_face_comparison'),
+    (generate_comparison_review_page, 'generate_comparison_review_html'),
+    (generate_review_page, 'generate_review_html'),
+    ('generate_main_review', 'generate_main_review_html'),
+]
+
+
+@pytest.fixture
+def generator_env(in_results_tree, monkeypatch, tmp_path):
+    # Keep the latency state out of the real .cache/ and start it empty
+    monkeypatch.setattr(latency_histogram, 'default_state_path',
+                        lambda: str(tmp_path / 'latency_histograms.json'))
+    # Likewise the results index; rounds after the warmup see a warm index
+    monkeypatch.setattr(results_index, 'default_state_path',
+                        lambda: str(tmp_path / 'results_index.json'))
+    monkeypatch.setattr(fragments, 'default_cache_dir', lambda: str(tmp_path / 'fragments'))
+    monkeypatch.setattr(stats_rollups, 'default_state_path', lambda: str(tmp_path / 'stats_rollups.json'))
+    monkeypatch.setattr(stats_rollups, 'default_stats_path', lambda: str(tmp_path / 'stats.json'))
+    return in_results_tree
+
+
+@pytest.fixture
+def new_results(generator_env):
+    """Add one more result (v2, v4 and v43 in both result trees) per call; removed afterwards"""
+    added = []
+    counter = itertools.count(1)
+
+    def add():
+        combo = f"source_01_to_target_new{next(counter):03d}"
+        for directory, versions in (('results', ('v2', 'v4', 'v43')), ('single-face-results', ('v2', 'v4'))):
+            for version in versions:
+                stem = generator_env / 'test-results' / directory / f"{combo}_{version}"
+                for path, data in ((f"{stem}_result.jpg", b''),
+                                   (f"{stem}_metadata.json", json.dumps({'generation_time': '12.3'}).encode())):
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    added.append(path)
+        return (), {}
+
+    yield add
+    for path in added:
+        (generator_env / path).unlink()
+
+
+def _import(module):
+    if isinstance(module, str):
+        try:
+            return importlib.import_module(module)
+        except SyntaxError as e:
+            pytest.skip(f"{module} does not compile on this Python: {e.msg}")
+    return module
+
+
+@pytest.mark.parametrize('module, function', GENERATORS, ids=lambda value: getattr(value, '__name__', value))
+def bench_generator(benchmark, generator_env, capsys, module, function):
+    # The warmup round fills the index and fragment caches; timed rounds are no-change rebuilds
+    benchmark.pedantic(getattr(_import(module), function), rounds=3, iterations=1, warmup_rounds=1)
+
+
+@pytest.mark.parametrize('module, function', GENERATORS, ids=lambda value: getattr(value, '__name__', value))
+def bench_generator_one_new_result(benchmark, new_results, capsys, module, function):
+    # Rebuild after a single new result lands: one source group is stale
+    generate = getattr(_import(module), function)
+    generate()
+    benchmark.pedantic(generate, setup=new_results, rounds=3, iterations=1)
+
+
+def bench_build_reports(benchmark, generator_env, capsys):
+    # Every results page from one shared pass; the Thortful view builds into the real tree, so it is left out
+    views = [view for view, generator in build_reports.VIEWS.items() if generator is not None]
+    benchmark.pedantic(build_reports.main, args=(['--only', *views],), rounds=3, iterations=1, warmup_rounds=1)
@@ -0,0 +1,121 @@
+"""
+Per-request harness overhead: everything the runners do around the HTTP call
+"""
+import base64
+import json
+
+import pytest
+
+import continue_multiface_v43_with_logging as multiface
+import generate_multiface_comparison
+import run_thortful_face_swap_tests as thortful
+import thortful_auth
+from conftest import BENCH_SOURCES, BENCH_TARGETS
+from shared.utils import load_result_metadata, parse_result_filename
+
+# The last combination in the synthetic tree, whatever its size
+SOURCE, TARGET = f"source_{BENCH_SOURCES:02d}", f"target_{BENCH_TARGETS:02d}"
+COMBO_KEY = f"{SOURCE}_to_{TARGET}"
+
+RESULT_NAMES = [
+    f"{COMBO_KEY}_v2_result.jpg",
+    f"{COMBO_KEY}_v43_result.jpg",
+    'face_03_to_card_template_1f2e_v4_result.jpg',
+    'reference_result.jpg',
+]
+
+
+def bench_encode_sample_images(benchmark, sample_images):
+    encoded = benchmark(lambda: [thortful.encode_image_to_base64(path) for path in sample_images])
+    assert len(encoded) == len(sample_images)
+
+
+def bench_thortful_payload(benchmark, sample_images):
+    source_base64 = thortful.encode_image_to_base64(sample_images[0])
+    card_id = thortful.CARD_IDS[0]
+
+    def build():
+        return json.dumps({
+            "source_image": source_base64,
+            "targetCardId": card_id,
+            "target_card_id": card_id,
+        })
+
+    assert benchmark(build)
+
+
+def bench_v43_payload(benchmark, sample_images):
+    with open(sample_images[0], 'rb') as f:
+        source_bytes = f.read()
+    with open(sample_images[-1], 'rb') as f:
+        target_bytes = f.read()
+
+    def build():
+        return json.dumps({
+            "source_image": base64.b64encode(source_bytes).decode('utf-8'),
+            "target_image": base64.b64encode(target_bytes).decode('utf-8'),
+            "source_face_index": "0,1,2,3",
+            "target_face_index": "0,1,2,3",
+            "detection_face_order": "big_to_small",
+            "model_type": "speed",
+            "swap_type": "face",
+        })
+
+    assert benchmark(build)
+
+
+def bench_thortful_csv_append(benchmark, tmp_path, monkeypatch, sample_images):
+    monkeypatch.setattr(thortful, 'LOG_FILE', tmp_path / 'main_test_results.csv')
+    thortful.create_csv_header()
+    card_id = thortful.CARD_IDS[0]
+    result_data = {
+        'result_image': 'result.jpg', 'success': True, 'generation_time': 12.5,
+        'request_time': 14.1, 'error_message': '',
+    }
+    benchmark(thortful.log_test_result, sample_images[0], sample_images[0], card_id, result_data)
+
+
+def bench_multiface_csv_append(benchmark, tmp_path):
+    csv_file = str(tmp_path / 'multiface_v43_requests_log.csv')
+    log_data = {
+        'timestamp': '2025-07-22T16:46:07.177267', 'request_id': 'v43_multiface_1753199167177',
+        'source_image': f"{SOURCE}.jpg", 'target_image': f"{TARGET}.png",
+        'combo_key': COMBO_KEY, 'api_version': 'v4.3',
+        'request_duration_seconds': 14.1, 'http_status_code': 200, 'success': True,
+        'api_generation_time': '12.5', 'api_remaining_credits': '4321.5',
+        'all_request_parameters_json': json.dumps({'model_type': 'speed', 'swap_type': 'face'}),
+    }
+    benchmark(multiface.log_multiface_request, csv_file, log_data)
+
+
+def bench_last_credits_from_csv(benchmark, multiface_log):
+    credits = benchmark(multiface.get_last_credits_from_csv, str(multiface_log))
+    assert credits is not None
+
+
+@pytest.fixture(scope='module')
+def metadata_stem(results_tree):
+    return str(results_tree / 'test-results' / 'results' / f"{COMBO_KEY}_v43")
+
+
+def bench_load_result_metadata(benchmark, metadata_stem):
+    # load_result_metadata maps <name>.jpg to <name>_metadata.json
+    assert benchmark(load_result_metadata, metadata_stem + '.jpg')
+
+
+def bench_generator_load_metadata(benchmark, metadata_stem):
+    assert benchmark(generate_multiface_comparison.load_metadata, metadata_stem + '_metadata.json')
+
+
+def bench_parse_result_filename(benchmark):
+    parsed = benchmark(lambda: [parse_result_filename(name) for name in RESULT_NAMES])
+    assert parsed[0]['api_version'] == 'v2'
+
+
+def bench_load_auth_headers(benchmark, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    with open('thortful_auth.json', 'w') as f:
+        json.dump({'Authorization': 'Bearer bench', 'Content-Type': 'application/json',
+                   'timestamp': '2025-07-22T16:46:07', 'note': 'benchmark'}, f)
+    headers = benchmark(thortful_auth.get_thortful_auth)
+    assert headers['Authorization'] == 'Bearer bench'
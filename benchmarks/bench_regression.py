@@ -0,0 +1,43 @@
+"""
+Session regression detector over the V4.3 log as the multiface runner appends to it
+"""
+import csv
+
+import pytest
+
+import continue_multiface_v43_with_logging as multiface
+from conftest import ROOT
+from shared.utils.regression import detect_regressions
+
+SESSIONS = [f"2025-07-2{day}T10:00:00.000000" for day in range(3, 9)]
+
+
+@pytest.fixture
+def runner_log(tmp_path):
+    """The real V4.3 log header, a legacy ragged row, then rows written by the runner itself"""
+    with open(ROOT / 'multiface_v43_requests_log.csv', newline='') as f:
+        header = next(csv.reader(f))
+    path = tmp_path / 'multiface_v43_requests_log.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerow([''] * (len(header) + 7))
+    for batch, session in enumerate(SESSIONS):
+        current = session == SESSIONS[-1]
+        for n in range(25):
+            multiface.log_multiface_request(str(path), {
+                'timestamp': session, 'request_id': f"v43_multiface_{batch}_{n}", 'api_version': 'v4.3',
+                'request_duration_seconds': (30 if current else 20) + n % 5, 'success': True,
+                'detection_face_order': 'left_to_right', 'face_detection_strategy': 'left_to_right',
+                'model_type': 'speed', 'swap_type': 'face', 'hardware_type': 'N/A',
+                'batch_number': batch * 25 + n, 'previous_credits': 580.5, 'session_start_time': session,
+                'test_type': 'multi_face',
+            })
+    return path
+
+
+def bench_detect_runner_session(benchmark, runner_log):
+    comparisons = benchmark(detect_regressions, [str(runner_log)], session=SESSIONS[-1])
+    assert [comparison.group for comparison in comparisons] == ['v4.3|speed/face/N/A/left_to_right']
+    assert comparisons[0].baseline_sessions == SESSIONS[:-1]
+    assert comparisons[0].latency_regression
@@ -0,0 +1,85 @@
+"""
+Review server: concurrent viewers loading a page's thumbnails and full-size images
+
+Each round, VIEWERS clients fetch every thumbnail and then the full-size
+images over their own connection, as browsers scrolling the review grid
+do. The same round against socketserver.TCPServer with
+SimpleHTTPRequestHandler (what serve_review.py used before) is the
+baseline. extra_info records requests per second.
+"""
+import http.client
+import os
+import shutil
+import socketserver
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler
+
+import pytest
+
+from shared.utils.review_server import ReviewServer
+
+VIEWERS = int(os.environ.get('BENCH_VIEWERS', 16))
+THUMBNAILS = 200
+THUMBNAIL_SIZE = 15 * 1024
+
+
+@pytest.fixture(scope='module')
+def review_site(sample_images, tmp_path_factory):
+    """Thumbnail-sized files plus the real sample images as the full-size results"""
+    root = tmp_path_factory.mktemp('review_site')
+    (root / 'thumbnails').mkdir()
+    (root / 'results').mkdir()
+    for n in range(THUMBNAILS):
+        (root / 'thumbnails' / f"result_{n:03d}.webp").write_bytes(os.urandom(THUMBNAIL_SIZE))
+    for image in sample_images:
+        shutil.copy(image, root / 'results' / image.name)
+    urls = [f"/thumbnails/result_{n:03d}.webp" for n in range(THUMBNAILS)]
+    urls += [f"/results/{image.name}" for image in sample_images]
+    return root, urls
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _viewer(port, urls):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    for url in urls:
+        connection.request('GET', url)
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200
+    connection.close()
+    return len(urls)
+
+
+def _round(port, urls):
+    with ThreadPoolExecutor(max_workers=VIEWERS) as executor:
+        return sum(executor.map(_viewer, [port] * VIEWERS, [urls] * VIEWERS))
+
+
+def _run(benchmark, port, urls):
+    requests = benchmark.pedantic(_round, args=(port, urls), rounds=3, warmup_rounds=1)
+    # No stats under --benchmark-disable
+    if benchmark.stats is not None:
+        benchmark.extra_info['requests_per_second'] = round(requests / benchmark.stats.stats.mean)
+
+
+def bench_concurrent_viewers(benchmark, review_site):
+    root, urls = review_site
+    with ReviewServer(str(root), host='127.0.0.1', port=0) as server:
+        _run(benchmark, server.port, urls)
+
+
+def bench_concurrent_viewers_simple_http(benchmark, review_site):
+    root, urls = review_site
+    httpd = socketserver.TCPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=str(root)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        _run(benchmark, httpd.server_address[1], urls)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,35 @@
+"""
+Sprite stage: composing a source group's contact sheet and the warm skip check
+"""
+import pytest
+
+from shared.utils import sprites, thumbnails
+
+pytestmark = pytest.mark.skipif(thumbnails.THUMBNAIL_FORMAT is None, reason='Pillow not installed')
+
+
+@pytest.fixture
+def group_thumbnails(sample_images, tmp_path):
+    """One sheet's worth of sample images, thumbnailed"""
+    store = thumbnails.ThumbnailStore(str(tmp_path / 'thumbnails'))
+    image_paths = [str(path) for path in sample_images[:sprites.MAX_TILES]]
+    store.update(image_paths, workers=1)
+    return store, {'source_01': image_paths}
+
+
+def bench_compose_sheet(benchmark, group_thumbnails, tmp_path):
+    store, groups = group_thumbnails
+    sheets = sprites.SpriteSheets(str(tmp_path / 'sprites'))
+
+    def compose():
+        sheets.sheets.clear()
+        return sheets.update(groups, store, workers=1)
+
+    assert benchmark(compose) == 1
+
+
+def bench_update_unchanged(benchmark, group_thumbnails, tmp_path):
+    store, groups = group_thumbnails
+    sheets = sprites.SpriteSheets(str(tmp_path / 'sprites'))
+    assert sheets.update(groups, store, workers=1) == 1
+    assert benchmark(sheets.update, groups, store) == 0
@@ -0,0 +1,52 @@
+"""
+Static site build: rewriting a 10k-result page to hashed names and the warm rebuild
+"""
+import os
+
+import pytest
+
+from shared.utils import static_build
+
+
+@pytest.fixture
+def review_page(in_results_tree):
+    """A page naming every result image the way the generators do (src, srcset, modal)"""
+    results = sorted(os.listdir(os.path.join('test-results', 'results')))
+    with open('bench_page.html', 'w') as f:
+        f.write('<html><head><link rel="stylesheet" href="bench.css?v=0"></head><body>\n')
+        for name in results:
+            if name.endswith('.jpg'):
+                path = f"test-results/results/{name}"
+                f.write(f'<img class="test-image" src="{path}" srcset="{path} 2x" loading="lazy" '
+                        f'onclick="openModal(\'{path}\')">\n')
+        f.write('</body></html>\n')
+    with open('bench.css', 'w') as f:
+        f.write('body { margin: 0; }\n')
+    yield 'bench_page.html'
+    os.remove('bench_page.html')
+    os.remove('bench.css')
+
+
+def bench_build_page(benchmark, review_page, tmp_path):
+    def build():
+        site = static_build.StaticSite(str(tmp_path / 'dist'))
+        site.add_page(review_page)
+        return site
+
+    site = benchmark(build)
+    assert site.files['bench.css']['immutable']
+
+
+def bench_rebuild_unchanged(benchmark, review_page, tmp_path):
+    site_dir = str(tmp_path / 'dist')
+    site = static_build.StaticSite(site_dir)
+    site.add_page(review_page)
+    site.finish(workers=1)
+
+    def rebuild():
+        site = static_build.StaticSite.load(site_dir)
+        site.add_page(review_page)
+        site.finish(workers=1)
+        return site
+
+    assert benchmark(rebuild).written == 0
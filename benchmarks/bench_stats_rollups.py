@@ -0,0 +1,20 @@
+"""
+Stats rollups: folding a 10k-row request log and the warm no-new-rows update
+"""
+from shared.utils.stats_rollups import StatsRollups
+
+
+def bench_rollup_full_log(benchmark, multiface_log):
+    def fold():
+        rollups = StatsRollups()
+        rollups.update([str(multiface_log)])
+        return rollups
+
+    rollups = benchmark(fold)
+    assert sum(rollup.count for rollup in rollups.merged('api').values()) == 10000
+
+
+def bench_rollup_unchanged(benchmark, multiface_log):
+    rollups = StatsRollups()
+    rollups.update([str(multiface_log)])
+    assert benchmark(rollups.update, [str(multiface_log)]) == 0
@@ -0,0 +1,21 @@
+"""
+Thumbnail stage: rendering the review image sizes and the warm skip check
+"""
+import pytest
+
+from shared.utils import thumbnails
+
+pytestmark = pytest.mark.skipif(thumbnails.THUMBNAIL_FORMAT is None, reason='Pillow not installed')
+
+
+def bench_render_sample_image(benchmark, sample_images, tmp_path):
+    outputs = [(width, str(tmp_path / f"{width}.img")) for width in thumbnails.THUMBNAIL_WIDTHS]
+    image_path, error = benchmark(thumbnails._render, (str(sample_images[0]), outputs))
+    assert error is None
+
+
+def bench_update_unchanged(benchmark, sample_images, tmp_path):
+    store = thumbnails.ThumbnailStore(str(tmp_path / 'thumbnails'))
+    image_paths = [str(path) for path in sample_images]
+    assert store.update(image_paths, workers=1) == len(image_paths)
+    assert benchmark(store.update, image_paths) == 0
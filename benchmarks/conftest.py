@@ -0,0 +1,108 @@
+"""
+Shared fixtures for the harness micro-benchmarks
+
+The synthetic results tree mimics what the batch runners leave behind
+(result JPEGs plus metadata sidecars for v2, v4 and v4.3) for
+BENCH_SOURCES x BENCH_TARGETS combinations, 100 x 100 = 10k by default.
+"""
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+THORTFUL_DIR = ROOT / 'thortful-v4-single-face'
+for path in (ROOT, THORTFUL_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+BENCH_SOURCES = int(os.environ.get('BENCH_SOURCES', 100))
+BENCH_TARGETS = int(os.environ.get('BENCH_TARGETS', 100))
+
+
+def _touch(path, data=b''):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _metadata(api_version, index):
+    return json.dumps({
+        'timestamp': '2025-07-22T16:46:07.177267',
+        'api_version': api_version,
+        'generation_time': f"{10 + index % 50}.{index % 10}",
+        'remaining_credits': str(5000 - index),
+        'request_time': f"{12 + index % 50}.{index % 10}",
+    }).encode('utf-8')
+
+
+@pytest.fixture(scope='session')
+def results_tree(tmp_path_factory):
+    """Synthetic repo layout with result files for every combination"""
+    root = tmp_path_factory.mktemp('results_tree')
+    dirs = {
+        'results': root / 'test-results' / 'results',
+        'single': root / 'test-results' / 'single-face-results',
+        'sources': root / 'test-results' / 'source-images',
+        'multi_targets': root / 'test-results' / 'multiface-target-images',
+        'single_targets': root / 'test-results' / 'single-face-target-images',
+        'single_sources': root / 'source-single-face',
+    }
+    for directory in dirs.values():
+        directory.mkdir(parents=True)
+
+    for i in range(1, BENCH_SOURCES + 1):
+        _touch(dirs['sources'] / f"source_{i:02d}.jpg")
+        _touch(dirs['single_sources'] / f"face_{i:02d}.jpg")
+    for j in range(1, BENCH_TARGETS + 1):
+        _touch(dirs['multi_targets'] / f"target_{j:02d}.png")
+        _touch(dirs['single_targets'] / f"target_{j:02d}.png")
+
+    index = 0
+    for i in range(1, BENCH_SOURCES + 1):
+        for j in range(1, BENCH_TARGETS + 1):
+            combo = f"source_{i:02d}_to_target_{j:02d}"
+            for version in ('v2', 'v4', 'v43'):
+                _touch(dirs['results'] / f"{combo}_{version}_result.jpg")
+                _touch(dirs['results'] / f"{combo}_{version}_metadata.json", _metadata(version, index))
+            for version in ('v2', 'v4'):
+                _touch(dirs['single'] / f"{combo}_{version}_result.jpg")
+                _touch(dirs['single'] / f"{combo}_{version}_metadata.json", _metadata(version, index))
+            index += 1
+    return root
+
+
+@pytest.fixture
+def in_results_tree(results_tree, monkeypatch):
+    """Run the test from inside the synthetic tree (generators use relative paths)"""
+    monkeypatch.chdir(results_tree)
+    return results_tree
+
+
+@pytest.fixture(scope='session')
+def sample_images():
+    """The real source images the Thortful runner encodes"""
+    images = sorted((THORTFUL_DIR / 'source-images').glob('*.jpg'))
+    if not images:
+        pytest.skip('no sample images in thortful-v4-single-face/source-images/')
+    return images
+
+
+@pytest.fixture(scope='session')
+def multiface_log(tmp_path_factory):
+    """10k-row copy of the V4.3 request log schema"""
+    with open(ROOT / 'multiface_v43_requests_log.csv', newline='') as f:
+        header = next(csv.reader(f))
+    path = tmp_path_factory.mktemp('logs') / 'multiface_v43_requests_log.csv'
+    credits_index = header.index('api_remaining_credits')
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for n in range(10000):
+            row = [''] * len(header)
+            row[0] = '2025-07-22T16:46:07.177267'
+            row[credits_index] = str(5000 - n * 0.5)
+            writer.writerow(row)
+    return path
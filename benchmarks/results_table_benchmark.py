@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark ResultTable loading against list(csv.DictReader(f))
+
+Writes a synthetic request log in the detailed V4.3 schema, then reports
+load time and peak memory per million rows for both approaches, plus the
+time of a filter and a percentile group-by on the loaded table.
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from shared.utils.results_table import load_results_table
+
+HEADER = [
+    'timestamp', 'request_id', 'source_image', 'target_image', 'combo_key', 'api_version',
+    'source_file_size_kb', 'target_file_size_kb', 'source_base64_size_kb', 'target_base64_size_kb',
+    'total_payload_size_mb', 'request_start_time', 'request_end_time', 'request_duration_seconds',
+    'http_status_code', 'success', 'timeout_occurred', 'error_type', 'error_message',
+    'response_content_length', 'response_content_type', 'api_generation_time',
+    'api_remaining_credits', 'api_request_id', 'detection_face_order', 'model_type', 'swap_type',
+    'hardware_type', 'source_faces_index', 'target_faces_index', 'output_file_saved',
+    'batch_number', 'session_start_time', 'test_type', 'face_detection_strategy'
+]
+
+
+def write_synthetic_log(path, rows, seed=42):
+    """Write a synthetic request log with realistic value mixes"""
+    rng = random.Random(seed)
+    versions = ['v2', 'v4', 'v4.3', 'v4-thortful']
+    orders = ['big_to_small', 'left_to_right', 'top_to_bottom']
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            source = f"source_{rng.randint(1, 40):02d}"
+            target = f"target_{rng.randint(1, 26):02d}"
+            duration = rng.lognormvariate(3.0, 0.5)
+            failed = rng.random() < 0.05
+            status = 504 if failed else 200
+            writer.writerow([
+                f"2025-07-{rng.randint(20, 31)}T12:00:{i % 60:02d}.000000", f"req_{i}",
+                f"{source}.jpg", f"{target}.png", f"{source}_to_{target}", rng.choice(versions),
+                41.12, 39.13, 54.83, 52.18, 0.1, '', '', f"{duration:.3f}", status,
+                not failed, False, 'http_error' if failed else '',
+                'HTTP 504: Gateway Timeout' if failed else '', 63680, 'image/jpeg',
+                f"{duration * 0.8:.3f}", 599.17 - i * 0.01, f"{i:032x}", rng.choice(orders),
+                'speed', 'face', 'N/A', '0', '0', not failed, i, '2025-07-22T16:46:07.178122',
+                'multi_face', 'big_to_small'
+            ])
+
+
+def measure(label, fn):
+    """Time fn, then run it again under tracemalloc for its peak memory"""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} {elapsed:8.2f}s  peak {peak / 2**20:8.1f} MB")
+    return result, elapsed, peak
+
+
+def load_dict_rows(path):
+    with open(path, 'r', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='synthetic rows to generate')
+    parser.add_argument('--skip-dict', action='store_true', help='skip the DictReader baseline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic_requests_log.csv')
+        print(f"📝 Writing {args.rows:,} synthetic rows...")
+        write_synthetic_log(path, args.rows)
+        print(f"   {os.path.getsize(path) / 2**20:.1f} MB on disk")
+
+        scale = 1_000_000 / args.rows
+        print(f"\n⏱️  Load ({args.rows:,} rows)")
+        if not args.skip_dict:
+            rows, dict_time, dict_peak = measure('list(csv.DictReader)', lambda: load_dict_rows(path))
+            del rows
+        table, table_time, table_peak = measure('load_results_table', lambda: load_results_table([path]))
+        print(f"  ResultTable column arrays: {table.nbytes / 2**20:.1f} MB")
+
+        print("\n⏱️  Queries")
+        start = time.perf_counter()
+        subset = table.filter(api_version='v4', success=1)
+        print(f"  filter(api_version='v4')      {time.perf_counter() - start:8.3f}s  ({len(subset):,} rows)")
+        start = time.perf_counter()
+        groups = table.group_by(['api_version', 'target_image'], aggregates=('count', 'mean'),
+                                percentiles=(50, 95, 99))
+        print(f"  group_by + p50/p95/p99        {time.perf_counter() - start:8.3f}s  ({len(groups)} groups)")
+
+        print("\n📊 Per million rows")
+        if not args.skip_dict:
+            print(f"  DictReader:  {dict_time * scale:8.2f}s  {dict_peak * scale / 2**20:8.1f} MB")
+        print(f"  ResultTable: {table_time * scale:8.2f}s  {table_peak * scale / 2**20:8.1f} MB peak, "
+              f"{table.nbytes * scale / 2**20:.1f} MB resident")
+
+
+if __name__ == "__main__":
+    main()
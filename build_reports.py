@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Build every review page in one pass
+
+Runs the page generators against one shared ReportBuild, so the results
+trees are listed, result files stat'ed, metadata parsed, thumbnails checked
+and the request logs aggregated once for all pages instead of once per
+page. Then brings the Thortful review data up to date:
+
+    main         face_swap_test_results.html   (generate_main_review.py)
+    single-face  single_face_comparison.html   (generate_single_face_review_updated.py)
+    multiface    multiface_comparison.html     (generate_multiface_comparison.py)
+    comparison   face_swap_comparison.html     (generate_comparison_review_page.py)
+    review       face_swap_review.html         (generate_review_page.py)
+    thortful     thortful-v4-single-face/review-data/ (build_review_data.py)
+
+Run it from the repository root, like the generators. generate_single_face_review.py
+writes the same file as the single-face view from an older layout and is
+left out. Each generator still runs on its own.
+
+The pass and the source-group markup (shared/utils/review_html.py) are
+shared; each page's data walk and rendering are not, so building every page
+costs the shared pass plus each page's own rendering rather than one page's.
+
+    python3 build_reports.py
+    python3 build_reports.py --only multiface thortful
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from shared.utils.report_build import ReportBuild
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+THORTFUL_DIR = os.path.join(HERE, 'thortful-v4-single-face')
+
+# view -> (module, function); generators are imported only when their view is built
+VIEWS = {
+    'multiface': ('generate_multiface_comparison', 'generate_multiface_comparison'),
+    'single-face': ('generate_single_face_review_updated', 'generate_single_face_comparison'),
+    'comparison': ('generate_comparison_review_page', 'generate_comparison_review_html'),
+    'review': ('generate_review_page', 'generate_review_html'),
+    'main': ('generate_main_review', 'generate_main_review_html'),
+    'thortful': None,
+}
+
+
+def build_thortful():
+    """Bring thortful-v4-single-face/review-data/ and its thumbnails up to date"""
+    if THORTFUL_DIR not in sys.path:
+        sys.path.insert(0, THORTFUL_DIR)
+    import build_review_data
+
+    cwd = os.getcwd()
+    os.chdir(THORTFUL_DIR)
+    try:
+        if not os.path.exists(build_review_data.LOG_PATH):
+            print(f"⚠️ Skipping Thortful review data: {build_review_data.LOG_PATH} not found")
+            return
+        shards, added, store = build_review_data.build_review_data()
+        print(f"📦 Thortful review data: {shards.total} rows in {len(shards.shards)} shards ({added} new)")
+        if store is not None:
+            print(f"🖼️ Thortful thumbnails: {store.summary()}")
+    finally:
+        os.chdir(cwd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build every review page from one pass over the results')
+    parser.add_argument('--only', nargs='+', choices=list(VIEWS), help='build just these views')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    build = ReportBuild()
+    timings = []
+    for view in args.only or list(VIEWS):
+        print(f"\n{'=' * 20} {view} {'=' * 20}")
+        view_started = time.perf_counter()
+        if VIEWS[view] is None:
+            build_thortful()
+        else:
+            module, function = VIEWS[view]
+            getattr(__import__(module), function)(build)
+        timings.append((view, time.perf_counter() - view_started))
+
+    build.finish()
+    print(f"\n{'=' * 50}")
+    if build.fragment_caches:
+        print(f"🖼️ Thumbnails: {build.thumbnails.summary()}")
+    for page, sheets in build.sprite_sheets.items():
+        print(f"🧩 Sprite sheets ({page}): {sheets.summary()}")
+    for view, seconds in timings:
+        print(f"   {view:<12} {seconds:6.2f}s")
+    print(f"✅ Built {len(timings)} views in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
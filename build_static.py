@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Build the review site into dist/ for static hosting
+
+Copies the root review pages, public/ and the Thortful pages with every
+local file they reference renamed by content hash, the Thortful review
+data with hashed shard names, and .gz/.br variants of the text files, plus
+dist/manifest.json (shared/utils/static_build.py). Hashed files can be
+cached forever, so a repeat visit downloads only what changed. Run it from
+the repository root after build_reports.py, and publish dist/.
+
+    python3 build_static.py
+    python3 build_static.py --out site --workers 4
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+from shared.utils.static_build import SITE_DIR, StaticSite
+
+THORTFUL_DIR = 'thortful-v4-single-face'
+
+PAGES = ['*.html', os.path.join('public', '*.html'), os.path.join(THORTFUL_DIR, '*.html')]
+# Served under their own names: public/ as create-react-app expects it, and
+# the Thortful images the review page builds URLs to from its shard rows
+NAMED_FILES = [os.path.join('public', '**', '*')] + [
+    os.path.join(THORTFUL_DIR, directory, '**', f'*.{extension}')
+    for directory in ('results', 'source-images', 'thumbnails')
+    for extension in ('jpg', 'jpeg', 'png', 'webp')]
+REVIEW_DATA = [os.path.join(THORTFUL_DIR, 'review-data')]
+
+
+def _files(patterns):
+    return sorted({path for pattern in patterns for path in glob.glob(pattern, recursive=True)
+                   if os.path.isfile(path)})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a content-hashed, precompressed copy of the review site')
+    parser.add_argument('--out', default=SITE_DIR, help='output directory')
+    parser.add_argument('--workers', type=int, help='compression processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    site = StaticSite.load(args.out)
+    pages = _files(PAGES)
+    for path in _files(NAMED_FILES):
+        if not path.endswith('.html'):
+            site.add_file(path, hashed=False)
+    for data_dir in REVIEW_DATA:
+        if os.path.exists(os.path.join(data_dir, 'index.json')):
+            print(f"📦 {data_dir}/: {site.add_review_data(data_dir)} shards")
+        else:
+            print(f"⚠️ Skipping {data_dir}/: not built (build_review_data.py)")
+    for path in pages:
+        site.add_page(path)
+    print(f"📄 {len(pages)} pages")
+    site.finish(args.workers)
+
+    print(f"🗜️ {args.out}/: {site.summary()}")
+    print(f"✅ Built the site in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Refresh stats.json, the pre-aggregated request statistics index.html loads
+
+Folds the rows appended to every request log since the previous run into
+per-API, per-card, per-source and per-session rollups (count, success,
+timeouts, generation time, credits and a latency histogram) kept in
+.cache/, then writes the compact stats JSON and prints the per-API rollups.
+The review generators refresh the same state as they build.
+"""
+
+import argparse
+import os
+import sys
+
+from shared.utils.stats_rollups import StatsRollups, default_state_path, default_stats_path
+
+
+def format_seconds(value):
+    return '-' if value is None else f"{value:.1f}s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh the pre-aggregated stats JSON from the request logs')
+    parser.add_argument('--state', default=default_state_path(), help='rollup state file')
+    parser.add_argument('--out', default=default_stats_path(), help='stats JSON to write')
+    parser.add_argument('--rebuild', action='store_true', help='ignore saved state and rescan everything')
+    parser.add_argument('--logs', nargs='+', help='request log CSVs (default: all found)')
+    args = parser.parse_args(argv)
+
+    rollups = StatsRollups() if args.rebuild else StatsRollups.load(args.state)
+    added = rollups.update(args.logs)
+    if args.rebuild:
+        rollups.dirty = True
+    rollups.save(args.state)
+    rollups.write_stats(args.out, args.logs)
+
+    print(f"🔄 Read {added} new rows from {len(rollups.logs)} logs")
+    print(f"\n{'api':<22}  {'n':>5}  {'success':>7}  {'gen':>7}  {'p50':>7}  {'p99':>7}  {'credits':>8}")
+    print('-' * 76)
+    for api, rollup in sorted(rollups.merged('api', args.logs).items()):
+        success_rate = f"{rollup.success_rate:.0%}" if rollup.success_rate is not None else '-'
+        print(f"{api:<22}  {rollup.count:>5}  {success_rate:>7}  {format_seconds(rollup.generation_mean):>7}  "
+              f"{format_seconds(rollup.latency.percentile(50)):>7}  {format_seconds(rollup.latency.percentile(99)):>7}  "
+              f"{rollup.credits_used:>8.1f}")
+    print(f"\n📈 Stats written to {os.path.relpath(args.out)} ({os.path.getsize(args.out) / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Build and inspect record/replay cassettes (shared/utils/cassette.py)
+
+Record a live run, or import a past Thortful run from its log and results,
+then replay it offline through the runners' normal transport:
+
+    python3 cassette_tool.py import-thortful cassettes/thortful_main
+    python3 cassette_tool.py info cassettes/thortful_main
+    cd thortful-v4-single-face && \\
+        FACESWAP_CASSETTE=replay:../cassettes/thortful_main FACESWAP_CASSETTE_SPEED=50 \\
+        python3 run_thortful_face_swap_tests.py
+
+Record with FACESWAP_CASSETTE=record:<dir> instead. The runners still
+write their usual logs during replay, so use a scratch checkout if those
+rows should not mix with real data.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from shared.utils.cassette import CASSETTE_ENV, SPEED_ENV, Cassette, import_thortful_log
+
+THORTFUL_DIR = 'thortful-v4-single-face'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and inspect HTTP record/replay cassettes')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    info = commands.add_parser('info', help='summarise a cassette')
+    info.add_argument('cassette', help='cassette directory')
+    info.add_argument('--json', action='store_true', help='print the summary as JSON')
+
+    thortful = commands.add_parser('import-thortful', help='build a cassette from a Thortful runner log')
+    thortful.add_argument('cassette', help='cassette directory to create or extend')
+    thortful.add_argument('--log', default=os.path.join(THORTFUL_DIR, 'logs', 'main_test_results.csv'))
+    thortful.add_argument('--sources', nargs='+', default=[os.path.join(THORTFUL_DIR, 'source-images'),
+                                                           os.path.join(THORTFUL_DIR, 'diverse-source-images')],
+                          help='directories holding the logged source images')
+    thortful.add_argument('--results', default=os.path.join(THORTFUL_DIR, 'results'))
+    args = parser.parse_args(argv)
+
+    if args.command == 'import-thortful':
+        if os.path.exists(Cassette(args.cassette).interactions_path):
+            print(f"⚠️ {args.cassette} already has interactions; importing again would duplicate them")
+            return 1
+        counts = import_thortful_log(args.log, args.cassette, args.sources, args.results)
+        print(f"📼 Imported {counts['imported']} interactions from {args.log}")
+        if counts['missing_source'] or counts['missing_result']:
+            print(f"⚠️ Skipped {counts['missing_source']} rows without a source image and "
+                  f"{counts['missing_result']} successes without a saved result")
+        print(f"\n   export {CASSETTE_ENV}=replay:{os.path.abspath(args.cassette)}")
+        print(f"   export {SPEED_ENV}=50   # 0 replays without waiting")
+        return 0
+
+    summary = Cassette(args.cassette).summary()
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+        return 0
+    print(f"📼 {args.cassette}")
+    print(f"   {summary['interactions']} interactions, {summary['distinct_requests']} distinct requests")
+    print(f"   statuses: {', '.join(f'{status}×{count}' for status, count in sorted(summary['statuses'].items()))}")
+    print(f"   recorded time: {summary['recorded_seconds']:.0f}s")
+    print(f"   bodies: {summary['bodies']} ({summary['body_bytes'] / 1024 / 1024:.1f} MB compressed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
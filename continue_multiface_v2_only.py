@@ -14,6 +14,7 @@ import base64
 import traceback
 from datetime import datetime
 from batch_test_single_face import load_api_key
+from shared.utils.timeout_policy import request_timeout
 
 def initialize_multiface_v2_csv_log():
     """Initialize CSV log file with headers for V2-only multi-face testing"""
@@ -251,12 +252,13 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
             'Content-Type': 'application/json'
         }
         
-        # Make request with timing
+        # Make request with timing (connect/read timeouts tuned from past latencies)
+        timeout = request_timeout('v2')
         log_data['request_start_time'] = datetime.now().isoformat()
         start_time = time.time()
         
         try:
-            response = requests.post(API_URL, json=data, headers=headers, timeout=120)
+            response = requests.post(API_URL, json=data, headers=headers, timeout=timeout)
             end_time = time.time()
             log_data['request_end_time'] = datetime.now().isoformat()
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
@@ -323,7 +325,7 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
             log_data['timeout_occurred'] = True
             log_data['error_type'] = 'timeout'
-            log_data['error_message'] = 'Request timed out after 120 seconds'
+            log_data['error_message'] = f'Request timed out after {timeout[1]:g} seconds'
             return False, None
             
         except Exception as e:
@@ -6,6 +6,7 @@ Tests different detection_face_order values and logs all requests for analysis
 
 import csv
 import os
+import sys
 import time
 import glob
 import json
@@ -14,60 +15,72 @@ import base64
 import traceback
 from datetime import datetime
 from batch_test_single_face import load_api_key
+from shared.utils import tracing
+from shared.utils.events import default_events_path, open_event_stream, RequestEvents
+from shared.utils.metrics import NullMetrics, pop_metrics_port, start_metrics
+from shared.utils.phase_timing import log_phase_timings, phase_timer, timed_session
+from shared.utils.regression import check_session_regressions
+from shared.utils.stand_in import route_url
+from shared.utils.timeout_policy import request_timeout
+
+# Shared keep-alive session recording DNS/connect/TLS/upload/first-byte timings
+SESSION = timed_session()
+
+# Columns of a new log. An existing log keeps the header it was created with and
+# rows follow that header, so no value lands under another column's name
+LOG_COLUMNS = [
+    'timestamp',
+    'request_id',
+    'source_image',
+    'target_image',
+    'combo_key',
+    'api_version',
+    'source_file_size_kb',
+    'target_file_size_kb',
+    'source_base64_size_kb',
+    'target_base64_size_kb',
+    'total_payload_size_mb',
+    'request_start_time',
+    'request_end_time',
+    'request_duration_seconds',
+    'http_status_code',
+    'success',
+    'timeout_occurred',
+    'error_type',
+    'error_message',
+    'response_content_length',
+    'response_content_type',
+    'api_generation_time',
+    'api_remaining_credits',
+    'api_request_id',
+    'detection_face_order',
+    'model_type',
+    'swap_type',
+    'hardware_type',
+    'source_faces_index',
+    'target_faces_index',
+    'credits_used',
+    'cost_per_request',
+    'previous_credits',
+    'output_file_saved',
+    'batch_number',
+    'session_start_time',
+    'test_type',
+    'api_endpoint_url',
+    'face_restore',
+    'face_upsample',
+    'codeformer_fidelity',
+    'all_request_parameters_json'
+]
 
 def initialize_multiface_csv_log():
     """Initialize CSV log file with headers for multi-face testing"""
     csv_file = "multiface_v43_requests_log.csv"
     
     if not os.path.exists(csv_file):
-        headers = [
-            'timestamp',
-            'request_id',
-            'source_image',
-            'target_image',
-            'combo_key',
-            'api_version',
-            'source_file_size_kb',
-            'target_file_size_kb', 
-            'source_base64_size_kb',
-            'target_base64_size_kb',
-            'total_payload_size_mb',
-            'request_start_time',
-            'request_end_time',
-            'request_duration_seconds',
-            'http_status_code',
-            'success',
-            'timeout_occurred',
-            'error_type',
-            'error_message',
-            'response_content_length',
-            'response_content_type',
-            'api_generation_time',
-            'api_remaining_credits',
-            'api_request_id',
-            'detection_face_order',
-            'model_type',
-            'swap_type',
-            'hardware_type',
-            'source_faces_index',
-            'target_faces_index',
-            'credits_used',
-            'cost_per_request',
-            'previous_credits',
-            'output_file_saved',
-            'batch_number',
-            'session_start_time',
-            'test_type',
-            'api_endpoint_url',
-            'face_restore',
-            'face_upsample', 
-            'codeformer_fidelity',
-            'all_request_parameters_json'
-        ]
-        
         with open(csv_file, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(headers)
+            writer.writerow(LOG_COLUMNS)
         
         print(f"📊 Created multi-face CSV log: {csv_file}")
     else:
@@ -89,6 +102,7 @@ def get_base64_size_kb(base64_string):
     except:
         return 0
 
+@tracing.traced('credits_lookup')
 def get_last_credits_from_csv(csv_file):
     """Get the most recent remaining credits from CSV log"""
     if not os.path.exists(csv_file):
@@ -128,58 +142,22 @@ def calculate_cost_metrics(current_credits, previous_credits):
     except:
         return None, None, previous_credits
 
+@tracing.traced('log')
 def log_multiface_request(csv_file, log_data):
-    """Log multi-face request to CSV"""
+    """Log multi-face request to CSV, in the column order of the log's header"""
+    header = LOG_COLUMNS
+    if os.path.exists(csv_file):
+        with open(csv_file, 'r', newline='') as f:
+            header = next(csv.reader(f), None) or LOG_COLUMNS
     with open(csv_file, 'a', newline='') as f:
         writer = csv.writer(f)
-        row = [
-            log_data.get('timestamp', ''),
-            log_data.get('request_id', ''),
-            log_data.get('source_image', ''),
-            log_data.get('target_image', ''),
-            log_data.get('combo_key', ''),
-            log_data.get('api_version', ''),
-            log_data.get('source_file_size_kb', ''),
-            log_data.get('target_file_size_kb', ''),
-            log_data.get('source_base64_size_kb', ''),
-            log_data.get('target_base64_size_kb', ''),
-            log_data.get('total_payload_size_mb', ''),
-            log_data.get('request_start_time', ''),
-            log_data.get('request_end_time', ''),
-            log_data.get('request_duration_seconds', ''),
-            log_data.get('http_status_code', ''),
-            log_data.get('success', ''),
-            log_data.get('timeout_occurred', ''),
-            log_data.get('error_type', ''),
-            log_data.get('error_message', ''),
-            log_data.get('response_content_length', ''),
-            log_data.get('response_content_type', ''),
-            log_data.get('api_generation_time', ''),
-            log_data.get('api_remaining_credits', ''),
-            log_data.get('api_request_id', ''),
-            log_data.get('detection_face_order', ''),
-            log_data.get('model_type', ''),
-            log_data.get('swap_type', ''),
-            log_data.get('hardware_type', ''),
-            log_data.get('source_faces_index', ''),
-            log_data.get('target_faces_index', ''),
-            log_data.get('credits_used', ''),
-            log_data.get('cost_per_request', ''),
-            log_data.get('previous_credits', ''),
-            log_data.get('output_file_saved', ''),
-            log_data.get('batch_number', ''),
-            log_data.get('session_start_time', ''),
-            log_data.get('test_type', ''),
-            log_data.get('api_endpoint_url', ''),
-            log_data.get('face_restore', ''),
-            log_data.get('face_upsample', ''),
-            log_data.get('codeformer_fidelity', ''),
-            log_data.get('all_request_parameters_json', '')
-        ]
-        writer.writerow(row)
+        writer.writerow([log_data.get(column, '') for column in header])
 
-def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path, metadata_path, csv_file, batch_number, session_start_time):
+def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path, metadata_path, csv_file, batch_number, session_start_time, events=None, metrics=None):
     """Perform V2 multi-face swap with comprehensive logging"""
+    events = events or RequestEvents(None, '')
+    metrics = metrics or NullMetrics()
+    timer = None
     
     # Initialize log data
     log_data = {
@@ -203,15 +181,16 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
         'timeout_occurred': False,
         'output_file_saved': False,
         'test_type': 'multi_face',
-        'api_endpoint_url': 'https://api.segmind.com/v1/faceswap-v2',
+        'api_endpoint_url': route_url('https://api.segmind.com/v1/faceswap-v2'),
         'face_restore': True,
         'face_upsample': True,
         'codeformer_fidelity': 0.8
     }
     
     try:
-        API_KEY = load_api_key()
-        API_URL = "https://api.segmind.com/v1/faceswap-v2"
+        with tracing.span('auth'):
+            API_KEY = load_api_key()
+        API_URL = route_url("https://api.segmind.com/v1/faceswap-v2")
         
         # Get previous credits for cost calculation
         previous_credits = get_last_credits_from_csv(csv_file)
@@ -220,14 +199,20 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
         print(f"  📊 Logging V2 request: {log_data['request_id']}")
         
         # Encode images and measure sizes
-        with open(source_path, 'rb') as f:
-            source_base64 = base64.b64encode(f.read()).decode('utf-8')
-        with open(target_path, 'rb') as f:
-            target_base64 = base64.b64encode(f.read()).decode('utf-8')
+        events.mark('encode_start')
+        with tracing.span('read', file=os.path.basename(source_path)), open(source_path, 'rb') as f:
+            source_bytes = f.read()
+        with tracing.span('encode', bytes=len(source_bytes)):
+            source_base64 = base64.b64encode(source_bytes).decode('utf-8')
+        with tracing.span('read', file=os.path.basename(target_path)), open(target_path, 'rb') as f:
+            target_bytes = f.read()
+        with tracing.span('encode', bytes=len(target_bytes)):
+            target_base64 = base64.b64encode(target_bytes).decode('utf-8')
         
         log_data['source_base64_size_kb'] = get_base64_size_kb(source_base64)
         log_data['target_base64_size_kb'] = get_base64_size_kb(target_base64)
         log_data['total_payload_size_mb'] = round((log_data['source_base64_size_kb'] + log_data['target_base64_size_kb']) / 1024, 2)
+        events.mark('encode_end', total_payload_size_mb=log_data['total_payload_size_mb'])
         
         data = {
             "source_img": source_base64,
@@ -253,19 +238,27 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
             'Content-Type': 'application/json'
         }
         
-        # Make request with timing
+        # Make request with timing (connect/read timeouts tuned from past latencies)
+        timeout = request_timeout('v2')
         log_data['request_start_time'] = datetime.now().isoformat()
         start_time = time.time()
         
         try:
-            response = requests.post(API_URL, json=data, headers=headers, timeout=120)
+            events.mark('send')
+            with phase_timer() as timer, tracing.span('http'):
+                response = SESSION.post(API_URL, json=data, headers=headers, timeout=timeout, stream=True)
+                events.mark('first_byte', status=response.status_code)
+                body = response.content  # read the body inside the timed phase
+                timer.mark('body_end')
             end_time = time.time()
+            events.mark('complete', status=response.status_code, bytes=len(body),
+                        api_generation_time=response.headers.get('X-generation-time', ''))
             log_data['request_end_time'] = datetime.now().isoformat()
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
             
             # Log response details
             log_data['http_status_code'] = response.status_code
-            log_data['response_content_length'] = len(response.content)
+            log_data['response_content_length'] = len(body)
             log_data['response_content_type'] = response.headers.get('Content-Type', '')
             log_data['api_generation_time'] = response.headers.get('X-generation-time', '')
             log_data['api_remaining_credits'] = response.headers.get('X-remaining-credits', '')
@@ -281,7 +274,7 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
                 log_data['cost_per_request'] = cost_per_request
                 
                 # Success - save files
-                with open(output_path, 'wb') as f:
+                with tracing.span('write', file=os.path.basename(output_path)), open(output_path, 'wb') as f:
                     f.write(response.content)
                 
                 # Save metadata
@@ -307,8 +300,10 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
                     "cost_per_request": cost_per_request
                 }
                 
-                with open(metadata_path, 'w') as f:
+                with tracing.span('write', file=os.path.basename(metadata_path)), open(metadata_path, 'w') as f:
                     json.dump(metadata, f, indent=2)
+                timer.mark('write_end')
+                events.mark('write', output_image=os.path.basename(output_path))
                 
                 log_data['success'] = True
                 log_data['output_file_saved'] = True
@@ -326,7 +321,7 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
             log_data['timeout_occurred'] = True
             log_data['error_type'] = 'timeout'
-            log_data['error_message'] = 'Request timed out after 120 seconds'
+            log_data['error_message'] = f'Request timed out after {timeout[1]:g} seconds'
             return False, None
             
         except Exception as e:
@@ -345,14 +340,25 @@ def perform_v2_multiface_swap_with_logging(source_path, target_path, output_path
     finally:
         # Always log the request
         log_multiface_request(csv_file, log_data)
+        if timer is not None:
+            log_phase_timings(csv_file, {'request_id': log_data['request_id'],
+                                         'api_version': log_data['api_version']},
+                              timer, log_data.get('api_generation_time', ''))
+        events.mark('log', success=log_data['success'], error_type=log_data.get('error_type', ''))
+        metrics.observe(log_data['api_version'], log_data.get('request_duration_seconds'),
+                        log_data['success'], log_data.get('error_message', ''))
+        metrics.set_credits(log_data['api_version'], log_data.get('api_remaining_credits'))
 
-def perform_v43_multiface_swap_with_logging(source_path, target_path, output_path, metadata_path, csv_file, batch_number, session_start_time, detection_face_order="left_to_right"):
+def perform_v43_multiface_swap_with_logging(source_path, target_path, output_path, metadata_path, csv_file, batch_number, session_start_time, detection_face_order="left_to_right", events=None, request_id=None, metrics=None):
     """Perform V4.3 multi-face swap with comprehensive logging"""
+    events = events or RequestEvents(None, '')
+    metrics = metrics or NullMetrics()
+    timer = None
     
     # Initialize log data
     log_data = {
         'timestamp': datetime.now().isoformat(),
-        'request_id': f"v43_multiface_{int(time.time()*1000)}",
+        'request_id': request_id or f"v43_multiface_{int(time.time()*1000)}",
         'source_image': os.path.basename(source_path),
         'target_image': os.path.basename(target_path),
         'combo_key': os.path.basename(output_path).replace('_v43_result.jpg', ''),
@@ -360,6 +366,7 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
         'source_file_size_kb': get_file_size_kb(source_path),
         'target_file_size_kb': get_file_size_kb(target_path),
         'detection_face_order': detection_face_order,
+        'face_detection_strategy': detection_face_order,
         'model_type': 'speed',
         'swap_type': 'face',
         'hardware_type': 'N/A',
@@ -371,15 +378,16 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
         'timeout_occurred': False,
         'output_file_saved': False,
         'test_type': 'multi_face',
-        'api_endpoint_url': 'https://api.segmind.com/v1/faceswap-v4.3',
+        'api_endpoint_url': route_url('https://api.segmind.com/v1/faceswap-v4.3'),
         'face_restore': 'N/A',
         'face_upsample': 'N/A',
         'codeformer_fidelity': 'N/A'
     }
     
     try:
-        API_KEY = load_api_key()
-        API_URL = "https://api.segmind.com/v1/faceswap-v4.3"
+        with tracing.span('auth'):
+            API_KEY = load_api_key()
+        API_URL = route_url("https://api.segmind.com/v1/faceswap-v4.3")
         
         # Get previous credits for cost calculation
         previous_credits = get_last_credits_from_csv(csv_file)
@@ -388,14 +396,20 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
         print(f"  📊 Logging V4.3 request: {log_data['request_id']} (order: {detection_face_order})")
         
         # Encode images and measure sizes
-        with open(source_path, 'rb') as f:
-            source_base64 = base64.b64encode(f.read()).decode('utf-8')
-        with open(target_path, 'rb') as f:
-            target_base64 = base64.b64encode(f.read()).decode('utf-8')
+        events.mark('encode_start')
+        with tracing.span('read', file=os.path.basename(source_path)), open(source_path, 'rb') as f:
+            source_bytes = f.read()
+        with tracing.span('encode', bytes=len(source_bytes)):
+            source_base64 = base64.b64encode(source_bytes).decode('utf-8')
+        with tracing.span('read', file=os.path.basename(target_path)), open(target_path, 'rb') as f:
+            target_bytes = f.read()
+        with tracing.span('encode', bytes=len(target_bytes)):
+            target_base64 = base64.b64encode(target_bytes).decode('utf-8')
         
         log_data['source_base64_size_kb'] = get_base64_size_kb(source_base64)
         log_data['target_base64_size_kb'] = get_base64_size_kb(target_base64)
         log_data['total_payload_size_mb'] = round((log_data['source_base64_size_kb'] + log_data['target_base64_size_kb']) / 1024, 2)
+        events.mark('encode_end', total_payload_size_mb=log_data['total_payload_size_mb'])
         
         # V4.3 Multi-face: Use comma-separated string for multiple faces with swap_type="face"
         data = {
@@ -422,19 +436,27 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
             'Content-Type': 'application/json'
         }
         
-        # Make request with timing
+        # Make request with timing (connect/read timeouts tuned from past latencies)
+        timeout = request_timeout('v4.3')
         log_data['request_start_time'] = datetime.now().isoformat()
         start_time = time.time()
         
         try:
-            response = requests.post(API_URL, json=data, headers=headers, timeout=120)
+            events.mark('send')
+            with phase_timer() as timer, tracing.span('http'):
+                response = SESSION.post(API_URL, json=data, headers=headers, timeout=timeout, stream=True)
+                events.mark('first_byte', status=response.status_code)
+                body = response.content  # read the body inside the timed phase
+                timer.mark('body_end')
             end_time = time.time()
+            events.mark('complete', status=response.status_code, bytes=len(body),
+                        api_generation_time=response.headers.get('X-generation-time', ''))
             log_data['request_end_time'] = datetime.now().isoformat()
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
             
             # Log response details
             log_data['http_status_code'] = response.status_code
-            log_data['response_content_length'] = len(response.content)
+            log_data['response_content_length'] = len(body)
             log_data['response_content_type'] = response.headers.get('Content-Type', '')
             log_data['api_generation_time'] = response.headers.get('X-generation-time', '')
             log_data['api_remaining_credits'] = response.headers.get('X-remaining-credits', '')
@@ -450,7 +472,7 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
                 log_data['cost_per_request'] = cost_per_request
                 
                 # Success - save files
-                with open(output_path, 'wb') as f:
+                with tracing.span('write', file=os.path.basename(output_path)), open(output_path, 'wb') as f:
                     f.write(response.content)
                 
                 # Save metadata
@@ -476,8 +498,10 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
                     "cost_per_request": cost_per_request
                 }
                 
-                with open(metadata_path, 'w') as f:
+                with tracing.span('write', file=os.path.basename(metadata_path)), open(metadata_path, 'w') as f:
                     json.dump(metadata, f, indent=2)
+                timer.mark('write_end')
+                events.mark('write', output_image=os.path.basename(output_path))
                 
                 log_data['success'] = True
                 log_data['output_file_saved'] = True
@@ -495,7 +519,7 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
             log_data['timeout_occurred'] = True
             log_data['error_type'] = 'timeout'
-            log_data['error_message'] = 'Request timed out after 120 seconds'
+            log_data['error_message'] = f'Request timed out after {timeout[1]:g} seconds'
             return False, None
             
         except Exception as e:
@@ -514,9 +538,18 @@ def perform_v43_multiface_swap_with_logging(source_path, target_path, output_pat
     finally:
         # Always log the request
         log_multiface_request(csv_file, log_data)
+        if timer is not None:
+            log_phase_timings(csv_file, {'request_id': log_data['request_id'],
+                                         'api_version': log_data['api_version']},
+                              timer, log_data.get('api_generation_time', ''))
+        events.mark('log', success=log_data['success'], error_type=log_data.get('error_type', ''))
+        metrics.observe(log_data['api_version'], log_data.get('request_duration_seconds'),
+                        log_data['success'], log_data.get('error_message', ''))
+        metrics.set_credits(log_data['api_version'], log_data.get('api_remaining_credits'))
 
-def continue_multiface_testing_with_logging(max_tests=5):
+def continue_multiface_testing_with_logging(max_tests=5, events_path=None, metrics=None):
     """Continue multi-face testing with comprehensive logging for both V2 and V4.3"""
+    metrics = metrics or NullMetrics()
     
     # Initialize CSV logging
     csv_file = initialize_multiface_csv_log()
@@ -586,31 +619,47 @@ def continue_multiface_testing_with_logging(max_tests=5):
     tests_to_run = min(max_tests, len(missing_tests))
     print(f"🚀 Running next {tests_to_run} V4.3 multi-face tests with logging...")
     
-    successful = 0
-    for i, test in enumerate(missing_tests[:tests_to_run]):
-        api_version = test['api_version']
-        face_order = test['face_order']
-        print(f"\n[{i+1}/{tests_to_run}] {test['combo_key']} (V4.3 - {face_order})")
+    with open_event_stream(events_path, runner='continue_multiface_v43_with_logging',
+                           session_start_time=session_start_time) as event_stream:
+        successful = 0
+        for i, test in enumerate(missing_tests[:tests_to_run]):
+            api_version = test['api_version']
+            face_order = test['face_order']
+            print(f"\n[{i+1}/{tests_to_run}] {test['combo_key']} (V4.3 - {face_order})")
         
-        success, gen_time = perform_v43_multiface_swap_with_logging(
-            test['source_path'], 
-            test['target_path'], 
-            test['output_path'], 
-            test['metadata_path'],
-            csv_file,
-            batch_number + i,
-            session_start_time,
-            test['face_order']
-        )
+            request_id = f"v43_multiface_{int(time.time()*1000)}"
+            metrics.set_queue_depth('v4.3', tests_to_run - i)
+            with tracing.span('request', category='request', request_id=request_id,
+                              combo_key=test['combo_key']):
+                with event_stream.request(request_id, source_image=os.path.basename(test['source_path']),
+                                          target_image=os.path.basename(test['target_path']),
+                                          combo_key=test['combo_key'], api_version='v4.3',
+                                          detection_face_order=face_order) as events:
+                    with metrics.tracking('v4.3'):
+                        success, gen_time = perform_v43_multiface_swap_with_logging(
+                            test['source_path'], 
+                            test['target_path'], 
+                            test['output_path'], 
+                            test['metadata_path'],
+                            csv_file,
+                            batch_number + i,
+                            session_start_time,
+                            test['face_order'],
+                            events=events,
+                            request_id=request_id,
+                            metrics=metrics
+                        )
         
-        if success:
-            successful += 1
-            print(f"  ✅ Success ({gen_time}s)")
-        else:
-            print(f"  ❌ Failed (logged to CSV)")
+            if success:
+                successful += 1
+                print(f"  ✅ Success ({gen_time}s)")
+            else:
+                print(f"  ❌ Failed (logged to CSV)")
         
-        time.sleep(3)  # Rate limiting between requests
+            with tracing.span('pause', category='idle'):
+                time.sleep(3)  # Rate limiting between requests
     
+    metrics.set_queue_depth('v4.3', 0)
     new_v43_completed = v43_completed + successful
     new_completed = v2_completed + new_v43_completed
     print(f"\n📊 Updated progress: V2={v2_completed}/{v2_expected}, V4.3={new_v43_completed}/{v43_expected}")
@@ -618,12 +667,37 @@ def continue_multiface_testing_with_logging(max_tests=5):
     print(f"✅ This batch: {successful}/{tests_to_run} successful")
     print(f"📊 All V4.3 requests logged to: {csv_file}")
     
+    # Compare this session's latency and success rate with earlier sessions
+    regressions = []
+    try:
+        regressions = [c for c in check_session_regressions([csv_file], 'logs', session=session_start_time)
+                       if c.is_regression]
+        if regressions:
+            print(f"⚠️ {len(regressions)} regressions vs earlier sessions "
+                  f"({', '.join(c.group for c in regressions)})")
+    except Exception as e:
+        print(f"⚠️ Regression check failed: {e}")
+    
     if new_v43_completed < v43_expected:
         print(f"⏳ Still need {v43_expected - new_v43_completed} more V4.3 tests")
     else:
         print("🎉 All V4.3 multi-face tests complete!")
+    
+    return regressions
 
 if __name__ == "__main__":
     print("🔄 Continue Multi-Face V4.3 vs V2 Testing with CSV Logging")
     print("=" * 65)
-    continue_multiface_testing_with_logging(max_tests=5)
\ No newline at end of file
+    argv, metrics_port = pop_metrics_port(sys.argv)
+    events_path = None if '--no-events' in argv else default_events_path('logs')
+    metrics = start_metrics(metrics_port, 'continue_multiface_v43_with_logging')
+    # --trace writes a Chrome/Perfetto trace of every stage span to logs/traces/
+    if '--trace' in argv:
+        tracing.enable(tracing.default_trace_path('logs'), runner='continue_multiface_v43_with_logging')
+    try:
+        regressions = continue_multiface_testing_with_logging(max_tests=5, events_path=events_path, metrics=metrics)
+    finally:
+        metrics.close()
+        tracing.close()
+    # A non-zero exit lets the batch loop that drives this runner stop on a regression
+    sys.exit(1 if regressions else 0)
\ No newline at end of file
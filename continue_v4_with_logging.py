@@ -10,6 +10,7 @@ import glob
 import json
 from datetime import datetime
 from batch_test_single_face import perform_face_swap_v4, load_api_key
+from shared.utils.timeout_policy import request_timeout
 
 def initialize_csv_log():
     """Initialize CSV log file with headers"""
@@ -175,12 +176,13 @@ def perform_v4_face_swap_with_logging(source_path, target_path, output_path, met
             'Content-Type': 'application/json'
         }
         
-        # Make request with timing
+        # Make request with timing (connect/read timeouts tuned from past latencies)
+        timeout = request_timeout('v4')
         log_data['request_start_time'] = datetime.now().isoformat()
         start_time = time.time()
         
         try:
-            response = requests.post(API_URL, json=data, headers=headers, timeout=120)
+            response = requests.post(API_URL, json=data, headers=headers, timeout=timeout)
             end_time = time.time()
             log_data['request_end_time'] = datetime.now().isoformat()
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
@@ -239,7 +241,7 @@ def perform_v4_face_swap_with_logging(source_path, target_path, output_path, met
             log_data['request_duration_seconds'] = round(end_time - start_time, 3)
             log_data['timeout_occurred'] = True
             log_data['error_type'] = 'timeout'
-            log_data['error_message'] = 'Request timed out after 120 seconds'
+            log_data['error_message'] = f'Request timed out after {timeout[1]:g} seconds'
             return False, None
             
         except Exception as e:
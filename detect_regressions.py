@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Latency and success-rate regressions of a session against earlier sessions
+
+For each endpoint/parameter set, compares the latest session (or
+--session) with the pooled previous sessions using one-sided Mann-Whitney
+U and KS tests on successful latencies and a two-proportion z-test on the
+success rate. Exits with status 1 when a regression is flagged, so it can
+gate a scheduled batch.
+
+    python3 detect_regressions.py
+    python3 detect_regressions.py --session 2025-07-23T11:50:03.105870 --all
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from shared.utils import get_project_root
+from shared.utils.regression import (
+    default_report_path, detect_regressions, format_regression_report, save_regression_report,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Flag latency/success regressions across test sessions')
+    parser.add_argument('--logs', nargs='+', help='request log CSVs (default: all found)')
+    parser.add_argument('--session', help='session to test (default: latest per endpoint/parameter set)')
+    parser.add_argument('--baseline-sessions', type=int, default=5, help='previous sessions pooled as baseline')
+    parser.add_argument('--alpha', type=float, default=0.01, help='significance level after Holm correction')
+    parser.add_argument('--min-slowdown', type=float, default=0.10,
+                        help='smallest median slowdown worth flagging (0.10 = 10%%)')
+    parser.add_argument('--min-success-drop', type=float, default=0.05,
+                        help='smallest success-rate drop worth flagging (0.05 = 5 points)')
+    parser.add_argument('--min-samples', type=int, default=5, help='requests needed in the current session')
+    parser.add_argument('--min-baseline', type=int, default=20, help='requests needed in the baseline')
+    parser.add_argument('--all', action='store_true', help='show every comparison, not only regressions')
+    parser.add_argument('--json', action='store_true', help='print the comparisons as JSON')
+    parser.add_argument('--output', help='report path (default: logs/regressions/regression_<timestamp>.json)')
+    args = parser.parse_args(argv)
+
+    settings = {
+        'session': args.session, 'baseline_sessions': args.baseline_sessions, 'alpha': args.alpha,
+        'min_slowdown': args.min_slowdown, 'min_success_drop': args.min_success_drop,
+        'min_samples': args.min_samples, 'min_baseline': args.min_baseline,
+    }
+    comparisons = detect_regressions(args.logs, **settings)
+
+    if args.json:
+        json.dump([comparison.to_dict() for comparison in comparisons], sys.stdout, indent=2)
+        print()
+    else:
+        print(format_regression_report(comparisons, show_all=args.all))
+        output = args.output or default_report_path(os.path.join(get_project_root(), 'logs'))
+        save_regression_report(comparisons, output, logs=args.logs, **settings)
+        print(f"\n📋 Report saved to: {os.path.relpath(output)}")
+    return 1 if any(comparison.is_regression for comparison in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
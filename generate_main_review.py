@@ -3,20 +3,32 @@
 Generate main review page with navigation between single-face and multi-face results
 """
 
-import os
-import glob
+from shared.utils.page_writer import PageWriter, publish_asset
+from shared.utils.report_build import ReportBuild
 
-def generate_main_review_html():
+def generate_main_review_html(build=None):
     """Generate main review page with links to both test types"""
+    # One pass over the trees and caches; build_reports.py shares it between every page
+    standalone = build is None
+    build = build or ReportBuild()
     
     # Check what results are available
-    multi_face_v2 = glob.glob("test-results/results/*_v2_result.jpg")
-    multi_face_v4 = glob.glob("test-results/results/*_v4_result.jpg")
-    single_face_v2 = glob.glob("test-results/single-face-results/*_v2_result.jpg")
-    single_face_v4 = glob.glob("test-results/single-face-results/*_v4_result.jpg")
+    index = build.index
+    multi_face = index.results("test-results/results")
+    single_face = index.results("test-results/single-face-results")
+    multi_face_v2 = multi_face.by_version('v2')
+    multi_face_v4 = multi_face.by_version('v4')
+    single_face_v2 = single_face.by_version('v2')
+    single_face_v4 = single_face.by_version('v4')
     
     multi_face_available = len(multi_face_v2) > 0 or len(multi_face_v4) > 0
     single_face_available = len(single_face_v2) > 0 or len(single_face_v4) > 0
+    # Built outside the template: f-string expressions cannot contain backslashes before Python 3.12
+    multi_face_onclick = 'onclick="window.location.href=\'face_swap_comparison.html\'"' if multi_face_available else ''
+    single_face_onclick = 'onclick="window.location.href=\'single_face_comparison.html\'"' if single_face_available else ''
+    
+    # The stylesheet is a shared asset, cached by the browser across rebuilds
+    css_url = publish_asset('face_swap_test_results.css')
     
     # Generate HTML
     html_content = f'''<!DOCTYPE html>
@@ -25,238 +37,7 @@ def generate_main_review_html():
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Face Swap API Test Results</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: #1d1d1f;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }}
-
-        .container {{
-            max-width: 800px;
-            width: 100%;
-        }}
-
-        .header {{
-            text-align: center;
-            margin-bottom: 40px;
-            padding: 40px;
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 10px 30px rgba(0, 0, 0, 0.2);
-        }}
-
-        .header h1 {{
-            margin: 0 0 10px 0;
-            font-size: 3rem;
-            font-weight: 700;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }}
-
-        .header p {{
-            margin: 0;
-            font-size: 1.2rem;
-            color: #86868b;
-        }}
-
-        .test-options {{
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 30px;
-            margin-bottom: 40px;
-        }}
-
-        .test-card {{
-            background: white;
-            border-radius: 16px;
-            padding: 30px;
-            text-align: center;
-            box-shadow: 0 8px 25px rgba(0, 0, 0, 0.15);
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }}
-
-        .test-card:hover {{
-            transform: translateY(-5px);
-            box-shadow: 0 15px 40px rgba(0, 0, 0, 0.2);
-        }}
-
-        .test-card.available {{
-            cursor: pointer;
-        }}
-
-        .test-card.unavailable {{
-            opacity: 0.6;
-            cursor: not-allowed;
-        }}
-
-        .test-card::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 4px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        }}
-
-        .test-card.single-face::before {{
-            background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-        }}
-
-        .test-icon {{
-            font-size: 4rem;
-            margin-bottom: 20px;
-        }}
-
-        .test-card h2 {{
-            margin: 0 0 10px 0;
-            font-size: 1.8rem;
-            font-weight: 600;
-            color: #1d1d1f;
-        }}
-
-        .test-description {{
-            font-size: 1rem;
-            color: #86868b;
-            margin-bottom: 20px;
-            line-height: 1.5;
-        }}
-
-        .test-stats {{
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 20px;
-            padding: 15px;
-            background: #f8f9fa;
-            border-radius: 8px;
-        }}
-
-        .stat {{
-            text-align: center;
-        }}
-
-        .stat-number {{
-            font-size: 1.5rem;
-            font-weight: 700;
-            color: #007AFF;
-        }}
-
-        .stat-label {{
-            font-size: 0.8rem;
-            color: #86868b;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-
-        .test-button {{
-            display: inline-block;
-            padding: 12px 24px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            text-decoration: none;
-            border-radius: 8px;
-            font-weight: 600;
-            transition: transform 0.2s ease;
-        }}
-
-        .test-button.single-face {{
-            background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-        }}
-
-        .test-button:hover {{
-            transform: scale(1.05);
-        }}
-
-        .test-button.disabled {{
-            background: #ccc;
-            cursor: not-allowed;
-            transform: none;
-        }}
-
-        .status-badge {{
-            position: absolute;
-            top: 15px;
-            right: 15px;
-            padding: 4px 8px;
-            border-radius: 12px;
-            font-size: 0.8rem;
-            font-weight: 600;
-        }}
-
-        .status-available {{
-            background: #d4edda;
-            color: #155724;
-        }}
-
-        .status-unavailable {{
-            background: #f8d7da;
-            color: #721c24;
-        }}
-
-        .info-section {{
-            background: white;
-            border-radius: 16px;
-            padding: 30px;
-            box-shadow: 0 8px 25px rgba(0, 0, 0, 0.15);
-        }}
-
-        .info-section h3 {{
-            margin: 0 0 15px 0;
-            font-size: 1.4rem;
-            font-weight: 600;
-            color: #1d1d1f;
-        }}
-
-        .info-list {{
-            list-style: none;
-            padding: 0;
-        }}
-
-        .info-list li {{
-            margin-bottom: 10px;
-            padding-left: 20px;
-            position: relative;
-        }}
-
-        .info-list li::before {{
-            content: '•';
-            color: #667eea;
-            font-weight: 600;
-            position: absolute;
-            left: 0;
-        }}
-
-        @media (max-width: 768px) {{
-            .test-options {{
-                grid-template-columns: 1fr;
-                gap: 20px;
-            }}
-            
-            .header h1 {{
-                font-size: 2rem;
-            }}
-            
-            .test-card {{
-                padding: 20px;
-            }}
-            
-            .test-stats {{
-                flex-direction: column;
-                gap: 10px;
-            }}
-        }}
-    </style>
+    <link rel="stylesheet" href="{css_url}">
 </head>
 <body>
     <div class="container">
@@ -266,7 +47,7 @@ def generate_main_review_html():
         </div>
 
         <div class="test-options">
-            <div class="test-card {'available' if multi_face_available else 'unavailable'}" {'onclick="window.location.href=\'face_swap_comparison.html\'"' if multi_face_available else ''}>
+            <div class="test-card {'available' if multi_face_available else 'unavailable'}" {multi_face_onclick}>
                 <div class="status-badge {'status-available' if multi_face_available else 'status-unavailable'}">
                     {'Available' if multi_face_available else 'No Data'}
                 </div>
@@ -292,7 +73,7 @@ def generate_main_review_html():
                 </a>
             </div>
 
-            <div class="test-card single-face {'available' if single_face_available else 'unavailable'}" {'onclick="window.location.href=\'single_face_comparison.html\'"' if single_face_available else ''}>
+            <div class="test-card single-face {'available' if single_face_available else 'unavailable'}" {single_face_onclick}>
                 <div class="status-badge {'status-available' if single_face_available else 'status-unavailable'}">
                     {'Available' if single_face_available else 'No Data'}
                 </div>
@@ -334,13 +115,15 @@ def generate_main_review_html():
 </html>'''
     
     # Write HTML file
-    with open('face_swap_test_results.html', 'w') as f:
-        f.write(html_content)
+    with PageWriter('face_swap_test_results.html') as page:
+        page.write(html_content)
+    if standalone:
+        build.finish()
     
-    print(f"✅ Generated main review page: face_swap_test_results.html")
+    print("✅ Generated main review page: face_swap_test_results.html")
     print(f"📊 Multi-face results: {'Available' if multi_face_available else 'Not available'}")
     print(f"🎯 Single-face results: {'Available' if single_face_available else 'Not available'}")
-    print(f"🌐 Open face_swap_test_results.html to navigate between test types")
+    print("🌐 Open face_swap_test_results.html to navigate between test types")
 
 if __name__ == "__main__":
     generate_main_review_html()
\ No newline at end of file
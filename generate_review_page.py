@@ -4,23 +4,53 @@ Generate HTML review page with actual file listings
 """
 
 import os
-import glob
-import json
 from datetime import datetime
 
+from shared.utils.latency_histogram import latency_section_html
+from shared.utils.page_writer import PageWriter, publish_asset
+from shared.utils.report_build import ReportBuild
+from shared.utils.results_index import results_index
+from shared.utils.review_html import GROUP_CLOSE, ROW_CLOSE, group_open, image_cell, metadata_cell, row_open
+
 def load_metadata(metadata_path):
-    """Load metadata from JSON file"""
-    try:
-        with open(metadata_path, 'r') as f:
-            return json.load(f)
-    except:
-        return {}
+    """Load metadata from JSON file (cached until the file changes)"""
+    return results_index().metadata(metadata_path)
+
+def source_group_html(source_id, source_results, sprites):
+    """Render one source family's results table"""
+    group = f"source_{source_id}"
+    source_path = f"test-results/source-images/source_{source_id}.jpg"
+    html = group_open(source_path, f"Source {source_id}",
+                      f"Source Family {source_id} Results ({len(source_results)} combinations)",
+                      ['Target Image', 'Source Image', 'Face Swap Result', 'Details'])
+    
+    for result in source_results:
+        gen_time = result['metadata'].get('generation_time', 'N/A')
+        html += row_open()
+        html += image_cell(sprites.attrs(group, result['target_path']), result['target_path'],
+                           f"Target {result['target_id']}", f"Target {result['target_id']}", in_details_row=False)
+        html += image_cell(sprites.attrs(group, result['source_path']), result['source_path'],
+                           f"Source {result['source_id']}", f"Source {result['source_id']}", in_details_row=False)
+        html += image_cell(sprites.attrs(group, result['result_path']), result['result_path'],
+                           f"Result {result['source_id']} → {result['target_id']}", 'Face Swap Result',
+                           in_details_row=False)
+        html += metadata_cell(['4 Faces Swapped', 'API v2', 'CodeFormer', f"{gen_time}s"])
+        html += ROW_CLOSE
+    
+    return html + GROUP_CLOSE
 
-def generate_review_html():
+
+def generate_review_html(build=None):
     """Generate HTML review page with actual results"""
+    # One pass over the trees and caches; build_reports.py shares it between every page
+    standalone = build is None
+    build = build or ReportBuild()
     
-    # Get all result files
-    result_files = glob.glob("test-results/results/*_result.jpg")
+    # Get all result files (listed once, cached until the directory changes)
+    index = build.index
+    # Source groups whose inputs are unchanged are reused from the last build
+    fragments = build.fragments('face_swap_review', __file__)
+    result_files = index.paths("test-results/results", suffix="_result.jpg")
     
     if not result_files:
         print("❌ No result files found. Please run face swap tests first.")
@@ -68,215 +98,36 @@ def generate_review_html():
     
     print(f"Found {total_tests} results from {source_count} sources × {target_count} targets")
     
-    # Generate HTML
-    html_content = f'''<!DOCTYPE html>
+    # Thumbnails for new or changed images (rendered in a process pool, skipped if unchanged)
+    thumbnails = build.thumbnails
+    group_images = {f"source_{source_id}": [result[key] for result in source_results
+                                            for key in ('source_path', 'target_path', 'result_path')]
+                    for source_id, source_results in grouped_results.items()}
+    thumbnails.update(path for image_paths in group_images.values() for path in image_paths)
+    
+    # One contact sheet per source group, so the grid loads one image per group
+    sprites = build.sprites('face_swap_review')
+    sprites.update(group_images, thumbnails)
+    
+    # Endpoint and card percentiles from the persisted request log histograms
+    latency_html = latency_section_html(build.histograms, ['v2', 'v4', 'v4.3'])
+    
+    # Stylesheet and script are shared assets, cached by the browser across pages and rebuilds
+    base_css_url = publish_asset('base.css')
+    css_url = publish_asset('face_swap_review.css')
+    js_url = publish_asset('review.js')
+    
+    # Stream the page out as it renders: header, each source group (unchanged ones straight
+    # from the fragment cache), then the footer, so only one group's HTML is held at a time
+    with PageWriter('face_swap_review.html') as page:
+        page.write(f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Face Swap Results Review</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f7;
-            color: #1d1d1f;
-        }}
-
-        .header {{
-            text-align: center;
-            margin-bottom: 40px;
-            padding: 20px;
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.07);
-        }}
-
-        .header h1 {{
-            margin: 0 0 10px 0;
-            font-size: 2.5rem;
-            font-weight: 600;
-        }}
-
-        .header p {{
-            margin: 0;
-            font-size: 1.1rem;
-            color: #86868b;
-        }}
-
-        .stats {{
-            display: flex;
-            justify-content: center;
-            gap: 30px;
-            margin-top: 20px;
-            flex-wrap: wrap;
-        }}
-
-        .stat-item {{
-            text-align: center;
-        }}
-
-        .stat-number {{
-            font-size: 2rem;
-            font-weight: 700;
-            color: #007AFF;
-        }}
-
-        .stat-label {{
-            font-size: 0.9rem;
-            color: #86868b;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-
-        .results-container {{
-            max-width: 1400px;
-            margin: 0 auto;
-        }}
-
-        .source-group {{
-            background: white;
-            border-radius: 12px;
-            margin-bottom: 30px;
-            overflow: hidden;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.07);
-        }}
-
-        .source-header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 20px;
-            font-size: 1.3rem;
-            font-weight: 600;
-            display: flex;
-            align-items: center;
-            gap: 15px;
-        }}
-
-        .source-preview {{
-            width: 60px;
-            height: 45px;
-            border-radius: 8px;
-            object-fit: cover;
-            border: 2px solid rgba(255, 255, 255, 0.3);
-        }}
-
-        .results-table {{
-            width: 100%;
-            border-collapse: collapse;
-        }}
-
-        .results-table th {{
-            background: #f8f9fa;
-            padding: 15px;
-            text-align: center;
-            font-weight: 600;
-            color: #495057;
-            border-bottom: 2px solid #dee2e6;
-        }}
-
-        .results-table td {{
-            padding: 8px;
-            text-align: center;
-            border-bottom: 1px solid #f1f3f4;
-            vertical-align: top;
-        }}
-
-        .results-table tr:hover {{
-            background-color: #f8f9fa;
-        }}
-
-        .image-cell {{
-            position: relative;
-            width: 25%;
-        }}
-
-        .test-image {{
-            width: 100%;
-            max-width: 350px;
-            height: auto;
-            border-radius: 6px;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.15);
-            cursor: pointer;
-            transition: transform 0.2s ease;
-        }}
-
-        .test-image:hover {{
-            transform: scale(1.02);
-        }}
-
-        .image-label {{
-            font-size: 0.8rem;
-            color: #86868b;
-            margin-top: 4px;
-            font-weight: 500;
-        }}
-
-        .metadata {{
-            margin-top: 10px;
-            font-size: 0.8rem;
-            color: #666;
-            line-height: 1.4;
-        }}
-
-        .metadata-item {{
-            display: inline-block;
-            background: #e3f2fd;
-            padding: 2px 6px;
-            border-radius: 4px;
-            margin: 2px;
-        }}
-
-        .modal {{
-            display: none;
-            position: fixed;
-            z-index: 1000;
-            padding-top: 100px;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(0,0,0,0.9);
-        }}
-
-        .modal-content {{
-            margin: auto;
-            display: block;
-            max-width: 90%;
-            max-height: 80%;
-            border-radius: 8px;
-        }}
-
-        .close {{
-            position: absolute;
-            top: 50px;
-            right: 35px;
-            color: #f1f1f1;
-            font-size: 40px;
-            font-weight: bold;
-            cursor: pointer;
-        }}
-
-        .close:hover {{
-            color: #bbb;
-        }}
-
-        @media (max-width: 768px) {{
-            .test-image {{
-                width: 100%;
-                max-width: 250px;
-            }}
-            
-            .results-table td {{
-                padding: 5px;
-            }}
-            
-            .image-cell {{
-                width: auto;
-            }}
-        }}
-    </style>
+    <link rel="stylesheet" href="{base_css_url}">
+    <link rel="stylesheet" href="{css_url}">
 </head>
 <body>
     <div class="header">
@@ -300,67 +151,17 @@ def generate_review_html():
                 <div class="stat-label">Avg Time (s)</div>
             </div>
         </div>
+        {latency_html}
     </div>
 
-    <div class="results-container">'''
-    
-    # Generate source groups
-    for source_id in sorted(grouped_results.keys()):
-        source_results = grouped_results[source_id]
-        source_path = f"test-results/source-images/source_{source_id}.jpg"
+    <div class="results-container">''')
         
-        html_content += f'''
-        <div class="source-group">
-            <div class="source-header">
-                <img class="source-preview" src="{source_path}" alt="Source {source_id}">
-                Source Family {source_id} Results ({len(source_results)} combinations)
-            </div>
-            
-            <table class="results-table">
-                <thead>
-                    <tr>
-                        <th>Target Image</th>
-                        <th>Source Image</th>
-                        <th>Face Swap Result</th>
-                        <th>Details</th>
-                    </tr>
-                </thead>
-                <tbody>'''
+        for source_id in sorted(grouped_results.keys()):
+            source_results = grouped_results[source_id]
+            fragments.stream(page.write, f"source_{source_id}", lambda: source_group_html(source_id, source_results, sprites),
+                             inputs=[source_results, sprites.token(f"source_{source_id}")])
         
-        for result in source_results:
-            gen_time = result['metadata'].get('generation_time', 'N/A')
-            request_id = result['metadata'].get('request_id', 'N/A')
-            
-            html_content += f'''
-                    <tr>
-                        <td class="image-cell">
-                            <img class="test-image" src="{result['target_path']}" alt="Target {result['target_id']}" onclick="openModal('{result['target_path']}')">
-                            <div class="image-label">Target {result['target_id']}</div>
-                        </td>
-                        <td class="image-cell">
-                            <img class="test-image" src="{result['source_path']}" alt="Source {result['source_id']}" onclick="openModal('{result['source_path']}')">
-                            <div class="image-label">Source {result['source_id']}</div>
-                        </td>
-                        <td class="image-cell">
-                            <img class="test-image" src="{result['result_path']}" alt="Result {result['source_id']} → {result['target_id']}" onclick="openModal('{result['result_path']}')">
-                            <div class="image-label">Face Swap Result</div>
-                        </td>
-                        <td>
-                            <div class="metadata">
-                                <div class="metadata-item">4 Faces Swapped</div>
-                                <div class="metadata-item">API v2</div>
-                                <div class="metadata-item">CodeFormer</div>
-                                <div class="metadata-item">{gen_time}s</div>
-                            </div>
-                        </td>
-                    </tr>'''
-        
-        html_content += '''
-                </tbody>
-            </table>
-        </div>'''
-    
-    html_content += '''
+        page.write(f'''
     </div>
 
     <!-- Modal for enlarged images -->
@@ -369,32 +170,14 @@ def generate_review_html():
         <img class="modal-content" id="modalImage">
     </div>
 
-    <script>
-        function openModal(imageSrc) {
-            const modal = document.getElementById('imageModal');
-            const modalImg = document.getElementById('modalImage');
-            modal.style.display = 'block';
-            modalImg.src = imageSrc;
-        }
-
-        // Modal close functionality
-        document.querySelector('.close').onclick = function() {
-            document.getElementById('imageModal').style.display = 'none';
-        }
-
-        window.onclick = function(event) {
-            const modal = document.getElementById('imageModal');
-            if (event.target === modal) {
-                modal.style.display = 'none';
-            }
-        }
-    </script>
+    <script src="{js_url}"></script>
 </body>
-</html>'''
-    
-    # Write HTML file
-    with open('face_swap_review.html', 'w') as f:
-        f.write(html_content)
+</html>''')
+    print(f"♻️ Source groups: {fragments.summary()}")
+    if standalone:
+        build.finish()
+        print(f"🖼️ Thumbnails: {thumbnails.summary()}")
+        print(f"🧩 Sprite sheets: {sprites.summary()}")
     
     print(f"✅ Generated review page: face_swap_review.html")
     print(f"📊 Page includes {total_tests} test results")
@@ -4,24 +4,71 @@ Generate HTML review page comparing V2 vs V4 single face swap results
 """
 
 import os
-import glob
-import json
 from datetime import datetime
 
+from shared.utils.latency_histogram import latency_section_html
+from shared.utils.page_writer import PageWriter, publish_asset
+from shared.utils.report_build import ReportBuild
+from shared.utils.results_index import results_index
+from shared.utils.review_html import GROUP_CLOSE, ROW_CLOSE, details_script, group_open, image_cell, result_cell, row_open
+
 def load_metadata(metadata_path):
-    """Load metadata from JSON file"""
-    try:
-        with open(metadata_path, 'r') as f:
-            return json.load(f)
-    except:
-        return {}
+    """Load metadata from JSON file (cached until the file changes)"""
+    return results_index().metadata(metadata_path)
+
+def source_group_html(source_id, source_results, sprites):
+    """Render one source image's v2 vs v4 comparison table"""
+    group = f"source_{source_id}"
+    # Get the actual source image path from the first result
+    source_path = source_results[0]['source_path'] if source_results else ""
+    html = group_open(source_path, f"Source {source_id}",
+                      f"Source Image {source_id} - Single Face Tests ({len(source_results)} targets)",
+                      ['Target Image', 'Source Image',
+                       'v2 Result<span class="single-face-indicator">Face 0</span>',
+                       'v4 Result<span class="single-face-indicator">Face 0</span>'])
+    
+    for result in source_results:
+        combo_id = f"single_{result['source_id']}_to_{result['target_id']}"
+        v2_time = result['v2']['metadata'].get('generation_time', 'N/A') if 'v2' in result else 'N/A'
+        v4_time = result['v4']['metadata'].get('generation_time', 'N/A') if 'v4' in result else 'N/A'
+        v2_path = result['v2']['result_path'] if 'v2' in result else None
+        v4_path = result['v4']['result_path'] if 'v4' in result else None
+        
+        html += row_open(combo_id)
+        html += image_cell(sprites.attrs(group, result['target_path']), result['target_path'],
+                           f"Target {result['target_id']}", f"Target {result['target_id']}")
+        html += image_cell(sprites.attrs(group, result['source_path']), result['source_path'],
+                           f"Source {result['source_id']}", f"Source {result['source_id']}")
+        html += result_cell(sprites.attrs(group, v2_path) if v2_path else None, v2_path, 'v2', 'v2 Result',
+                            ('api-v2', 'Face Index 0'))
+        html += result_cell(sprites.attrs(group, v4_path) if v4_path else None, v4_path, 'v4', 'v4 Result',
+                            ('api-v4', 'Face Index 0'))
+        html += ROW_CLOSE
+        
+        # Sidebar details for the row
+        html += details_script(
+            combo_id, f"Single Face: Source {result['source_id']} → Target {result['target_id']}",
+            [('API v2 Details (Face Index 0)', [f"{v2_time}s", 'CodeFormer', 'Single face'] if v2_path else None),
+             ('API v4 Details (Face Index 0)',
+              [f"{v4_time}s", 'Quality mode', 'Single face', 'big_to_small'] if v4_path else None)])
+    
+    return html + GROUP_CLOSE
+
 
-def generate_single_face_review_html():
+def generate_single_face_review_html(build=None):
     """Generate HTML review page comparing V2 vs V4 single face results"""
+    # One pass over the trees and caches; build_reports.py shares it between every page
+    standalone = build is None
+    build = build or ReportBuild()
     
-    # Get all result files for both versions
-    v2_files = glob.glob("test-results/single-face-results/*_v2_result.jpg")
-    v4_files = glob.glob("test-results/single-face-results/*_v4_result.jpg")
+    # Get all result files for both versions (listed once, cached until the directory changes)
+    index = build.index
+    # Source groups whose inputs are unchanged are reused from the last build
+    fragments = build.fragments('single_face_comparison', __file__)
+    v2_files = index.paths("test-results/single-face-results", suffix="_v2_result.jpg")
+    v4_files = index.paths("test-results/single-face-results", suffix="_v4_result.jpg")
+    # Sorted once; source_NN maps to the NNth source image
+    source_images = index.paths("source-single-face", suffix=".jpg")
     
     if not v2_files and not v4_files:
         print("❌ No single face result files found. Please run batch_test_single_face.py first.")
@@ -47,10 +94,9 @@ def generate_single_face_review_html():
             
             if combo_key not in combinations:
                 # Find the original source image
-                source_images = glob.glob("source-single-face/*.jpg")
                 source_path = ""
                 if len(source_images) >= int(source_id):
-                    source_path = sorted(source_images)[int(source_id) - 1]
+                    source_path = source_images[int(source_id) - 1]
                 
                 # Target path
                 target_path = f"test-results/target-images/{target_part}.png"
@@ -87,10 +133,9 @@ def generate_single_face_review_html():
             
             if combo_key not in combinations:
                 # Find the original source image
-                source_images = glob.glob("source-single-face/*.jpg")
                 source_path = ""
                 if len(source_images) >= int(source_id):
-                    source_path = sorted(source_images)[int(source_id) - 1]
+                    source_path = source_images[int(source_id) - 1]
                 
                 # Target path
                 target_path = f"test-results/target-images/{target_part}.png"
@@ -139,359 +184,46 @@ def generate_single_face_review_html():
         v4_times = [float(c['v4']['metadata'].get('generation_time', '0')) for c in combinations.values() if 'v4' in c and c['v4']['metadata'].get('generation_time', '0') != 'N/A']
         avg_time_v4 = sum(v4_times) / len(v4_times) if v4_times else 0
     
+    # Means hide the 504 tail; percentiles come from the persisted request log histograms.
+    # v4 only: the v2 histogram holds multi-face requests, and no single-face v2 log exists
+    histograms = build.histograms
+    v4_latency = histograms.get('endpoint', 'v4')
+    p99_time_v4 = v4_latency.percentile(99) if v4_latency else 0
+    latency_html = latency_section_html(histograms, ['v4'])
+
     print(f"Found {total_combinations} combinations")
     print(f"v2 results: {v2_count}, v4 results: {v4_count}")
     
-    # Generate HTML
-    html_content = f'''<!DOCTYPE html>
+    # Thumbnails for new or changed images (rendered in a process pool, skipped if unchanged)
+    thumbnails = build.thumbnails
+    group_images = {}
+    for source_id, source_results in grouped_results.items():
+        image_paths = group_images[f"source_{source_id}"] = []
+        for result in source_results:
+            image_paths += [result['source_path'], result['target_path']]
+            image_paths += [result[version]['result_path'] for version in ('v2', 'v4') if version in result]
+    thumbnails.update(path for image_paths in group_images.values() for path in image_paths)
+    
+    # One contact sheet per source group, so the grid loads one image per group
+    sprites = build.sprites('single_face_comparison')
+    sprites.update(group_images, thumbnails)
+    
+    # Stylesheet and script are shared assets, cached by the browser across pages and rebuilds
+    base_css_url = publish_asset('base.css')
+    css_url = publish_asset('single_face_comparison_legacy.css')
+    js_url = publish_asset('review.js')
+    
+    # Stream the page out as it renders: header, each source group (unchanged ones straight
+    # from the fragment cache), then the footer, so only one group's HTML is held at a time
+    with PageWriter('single_face_comparison.html') as page:
+        page.write(f'''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Single Face Swap Comparison (v2 vs v4)</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f5f7;
-            color: #1d1d1f;
-        }}
-
-        .header {{
-            text-align: center;
-            margin-bottom: 40px;
-            padding: 20px;
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.07);
-        }}
-
-        .header h1 {{
-            margin: 0 0 10px 0;
-            font-size: 2.5rem;
-            font-weight: 600;
-        }}
-
-        .header p {{
-            margin: 0;
-            font-size: 1.1rem;
-            color: #86868b;
-        }}
-
-        .test-type-badge {{
-            display: inline-block;
-            background: linear-gradient(135deg, #ff6b6b, #ee5a52);
-            color: white;
-            padding: 8px 16px;
-            border-radius: 20px;
-            font-size: 0.9rem;
-            font-weight: 600;
-            margin-top: 10px;
-        }}
-
-        .stats {{
-            display: flex;
-            justify-content: center;
-            gap: 30px;
-            margin-top: 20px;
-            flex-wrap: wrap;
-        }}
-
-        .stat-item {{
-            text-align: center;
-        }}
-
-        .stat-number {{
-            font-size: 2rem;
-            font-weight: 700;
-            color: #007AFF;
-        }}
-
-        .stat-label {{
-            font-size: 0.9rem;
-            color: #86868b;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-
-        .results-container {{
-            max-width: 1600px;
-            margin: 0 auto;
-        }}
-
-        .source-group {{
-            background: white;
-            border-radius: 12px;
-            margin-bottom: 30px;
-            overflow: hidden;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.07);
-        }}
-
-        .source-header {{
-            background: linear-gradient(135deg, #ff6b6b 0%, #ee5a52 100%);
-            color: white;
-            padding: 20px;
-            font-size: 1.3rem;
-            font-weight: 600;
-            display: flex;
-            align-items: center;
-            gap: 15px;
-        }}
-
-        .source-preview {{
-            width: 60px;
-            height: 45px;
-            border-radius: 8px;
-            object-fit: cover;
-            border: 2px solid rgba(255, 255, 255, 0.3);
-        }}
-
-        .results-table {{
-            width: 100%;
-            border-collapse: collapse;
-        }}
-
-        .results-table th {{
-            background: #f8f9fa;
-            padding: 12px 8px;
-            text-align: center;
-            font-weight: 600;
-            color: #495057;
-            border-bottom: 2px solid #dee2e6;
-            font-size: 0.9rem;
-        }}
-
-        .results-table td {{
-            padding: 8px;
-            text-align: center;
-            border-bottom: 1px solid #f1f3f4;
-            vertical-align: top;
-        }}
-
-        .results-table tr:hover {{
-            background-color: #f8f9fa;
-        }}
-
-        .image-cell {{
-            position: relative;
-            width: 25%;
-        }}
-
-        .test-image {{
-            width: 100%;
-            max-width: 280px;
-            height: auto;
-            border-radius: 6px;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.15);
-            cursor: pointer;
-            transition: transform 0.2s ease;
-        }}
-
-        .test-image:hover {{
-            transform: scale(1.02);
-        }}
-
-        .image-label {{
-            font-size: 0.75rem;
-            color: #86868b;
-            margin-top: 4px;
-            font-weight: 500;
-        }}
-
-        .api-version {{
-            font-size: 0.7rem;
-            padding: 2px 6px;
-            border-radius: 4px;
-            margin-top: 2px;
-            display: inline-block;
-            font-weight: 600;
-        }}
-
-        .api-v2 {{
-            background: #e3f2fd;
-            color: #1976d2;
-        }}
-
-        .api-v4 {{
-            background: #fff3e0;
-            color: #f57c00;
-        }}
-
-        .comparison-row {{
-            border-left: 4px solid #ff6b6b;
-        }}
-
-        .metadata {{
-            margin-top: 8px;
-            font-size: 0.75rem;
-            color: #666;
-            line-height: 1.3;
-        }}
-
-        .metadata-item {{
-            display: inline-block;
-            background: #f0f0f0;
-            padding: 1px 4px;
-            border-radius: 3px;
-            margin: 1px;
-            font-size: 0.7rem;
-        }}
-
-        .missing-result {{
-            color: #d32f2f;
-            font-style: italic;
-            padding: 20px;
-            background: #ffebee;
-            border-radius: 6px;
-        }}
-
-        .modal {{
-            display: none;
-            position: fixed;
-            z-index: 1000;
-            padding-top: 100px;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(0,0,0,0.9);
-        }}
-
-        .modal-content {{
-            margin: auto;
-            display: block;
-            max-width: 90%;
-            max-height: 80%;
-            border-radius: 8px;
-        }}
-
-        .close {{
-            position: absolute;
-            top: 50px;
-            right: 35px;
-            color: #f1f1f1;
-            font-size: 40px;
-            font-weight: bold;
-            cursor: pointer;
-        }}
-
-        .close:hover {{
-            color: #bbb;
-        }}
-
-        .details-sidebar {{
-            position: fixed;
-            top: 0;
-            right: -400px;
-            width: 400px;
-            height: 100vh;
-            background: white;
-            box-shadow: -2px 0 10px rgba(0, 0, 0, 0.1);
-            z-index: 1001;
-            transition: right 0.3s ease;
-            overflow-y: auto;
-        }}
-
-        .details-sidebar.open {{
-            right: 0;
-        }}
-
-        .sidebar-header {{
-            padding: 20px;
-            border-bottom: 1px solid #e9ecef;
-            background: #f8f9fa;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-
-        .sidebar-header h3 {{
-            margin: 0;
-            font-size: 1.2rem;
-            color: #495057;
-        }}
-
-        .sidebar-close {{
-            background: none;
-            border: none;
-            font-size: 1.5rem;
-            cursor: pointer;
-            color: #6c757d;
-            padding: 0;
-            width: 30px;
-            height: 30px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            border-radius: 50%;
-        }}
-
-        .sidebar-close:hover {{
-            background: #e9ecef;
-            color: #495057;
-        }}
-
-        .sidebar-content {{
-            padding: 20px;
-        }}
-
-        .comparison-row:hover {{
-            background-color: #f8f9fa;
-            border-left: 4px solid #ff6b6b;
-        }}
-
-        .detail-section {{
-            margin-bottom: 20px;
-            padding: 15px;
-            border: 1px solid #e9ecef;
-            border-radius: 8px;
-            background: #f8f9fa;
-        }}
-
-        .detail-section h4 {{
-            margin: 0 0 10px 0;
-            font-size: 1rem;
-            color: #495057;
-            font-weight: 600;
-        }}
-
-        .single-face-indicator {{
-            background: #fff3e0;
-            color: #f57c00;
-            padding: 2px 6px;
-            border-radius: 4px;
-            font-size: 0.7rem;
-            font-weight: 600;
-            margin-left: 8px;
-        }}
-
-        @media (max-width: 1200px) {{
-            .image-cell {{
-                width: 50%;
-            }}
-        }}
-
-        @media (max-width: 768px) {{
-            .test-image {{
-                width: 100%;
-                max-width: 200px;
-            }}
-            
-            .results-table td {{
-                padding: 4px;
-            }}
-            
-            .image-cell {{
-                width: auto;
-            }}
-            
-            .results-table th {{
-                padding: 8px 4px;
-                font-size: 0.8rem;
-            }}
-        }}
-    </style>
+    <link rel="stylesheet" href="{base_css_url}">
+    <link rel="stylesheet" href="{css_url}">
 </head>
 <body>
     <div class="header">
@@ -519,108 +251,22 @@ def generate_single_face_review_html():
                 <div class="stat-number">{avg_time_v4:.1f}s</div>
                 <div class="stat-label">Avg v4 Time</div>
             </div>
+            <div class="stat-item">
+                <div class="stat-number">{p99_time_v4:.1f}s</div>
+                <div class="stat-label">p99 v4 Request</div>
+            </div>
         </div>
+        {latency_html}
     </div>
 
-    <div class="results-container">'''
-    
-    # Generate source groups
-    for source_id in sorted(grouped_results.keys()):
-        source_results = grouped_results[source_id]
-        # Get the actual source image path from the first result
-        source_path = source_results[0]['source_path'] if source_results else ""
+    <div class="results-container">''')
         
-        html_content += f'''
-        <div class="source-group">
-            <div class="source-header">
-                <img class="source-preview" src="{source_path}" alt="Source {source_id}">
-                Source Image {source_id} - Single Face Tests ({len(source_results)} targets)
-            </div>
-            
-            <table class="results-table">
-                <thead>
-                    <tr>
-                        <th>Target Image</th>
-                        <th>Source Image</th>
-                        <th>v2 Result<span class="single-face-indicator">Face 0</span></th>
-                        <th>v4 Result<span class="single-face-indicator">Face 0</span></th>
-                    </tr>
-                </thead>
-                <tbody>'''
+        for source_id in sorted(grouped_results.keys()):
+            source_results = grouped_results[source_id]
+            fragments.stream(page.write, f"source_{source_id}", lambda: source_group_html(source_id, source_results, sprites),
+                             inputs=[source_results, sprites.token(f"source_{source_id}")])
         
-        for result in source_results:
-            combo_id = f"single_{result['source_id']}_to_{result['target_id']}"
-            v2_time = result['v2']['metadata'].get('generation_time', 'N/A') if 'v2' in result else 'N/A'
-            v4_time = result['v4']['metadata'].get('generation_time', 'N/A') if 'v4' in result else 'N/A'
-            
-            html_content += f'''
-                    <tr class="comparison-row" onclick="showDetails('{combo_id}')" style="cursor: pointer;">
-                        <td class="image-cell">
-                            <img class="test-image" src="{result['target_path']}" alt="Target {result['target_id']}" onclick="openModal('{result['target_path']}'); event.stopPropagation();">
-                            <div class="image-label">Target {result['target_id']}</div>
-                        </td>
-                        <td class="image-cell">
-                            <img class="test-image" src="{result['source_path']}" alt="Source {result['source_id']}" onclick="openModal('{result['source_path']}'); event.stopPropagation();">
-                            <div class="image-label">Source {result['source_id']}</div>
-                        </td>'''
-            
-            # v2 result
-            if 'v2' in result:
-                html_content += f'''
-                        <td class="image-cell">
-                            <img class="test-image" src="{result['v2']['result_path']}" alt="v2 Result" onclick="openModal('{result['v2']['result_path']}'); event.stopPropagation();">
-                            <div class="image-label">v2 Result</div>
-                            <div class="api-version api-v2">Face Index 0</div>
-                        </td>'''
-            else:
-                html_content += '''
-                        <td class="image-cell">
-                            <div class="missing-result">v2 result not available</div>
-                        </td>'''
-            
-            # v4 result
-            if 'v4' in result:
-                html_content += f'''
-                        <td class="image-cell">
-                            <img class="test-image" src="{result['v4']['result_path']}" alt="v4 Result" onclick="openModal('{result['v4']['result_path']}'); event.stopPropagation();">
-                            <div class="image-label">v4 Result</div>
-                            <div class="api-version api-v4">Face Index 0</div>
-                        </td>'''
-            else:
-                html_content += '''
-                        <td class="image-cell">
-                            <div class="missing-result">v4 result not available</div>
-                        </td>'''
-            
-            html_content += '''
-                    </tr>'''
-            
-            # Store details data for sidebar
-            details_data = f'''
-                <h3>Single Face: Source {result['source_id']} → Target {result['target_id']}</h3>
-                <div class="detail-section">
-                    <h4>API v2 Details (Face Index 0)</h4>
-                    {'<div class="metadata"><div class="metadata-item">' + str(v2_time) + 's</div><div class="metadata-item">CodeFormer</div><div class="metadata-item">Single face</div></div>' if 'v2' in result else '<div class="missing-result">No data</div>'}
-                </div>
-                <div class="detail-section">
-                    <h4>API v4 Details (Face Index 0)</h4>
-                    {'<div class="metadata"><div class="metadata-item">' + str(v4_time) + 's</div><div class="metadata-item">Quality mode</div><div class="metadata-item">Single face</div><div class="metadata-item">big_to_small</div></div>' if 'v4' in result else '<div class="missing-result">No data</div>'}
-                </div>
-            '''
-            
-            # Add to details storage for sidebar
-            html_content += f'''
-                <script>
-                    if (!window.detailsData) window.detailsData = {{}};
-                    window.detailsData['{combo_id}'] = `{details_data}`;
-                </script>'''
-        
-        html_content += '''
-                </tbody>
-            </table>
-        </div>'''
-    
-    html_content += '''
+        page.write(f'''
     </div>
 
     <!-- Details Sidebar -->
@@ -640,54 +286,14 @@ def generate_single_face_review_html():
         <img class="modal-content" id="modalImage">
     </div>
 
-    <script>
-        function openModal(imageSrc) {
-            const modal = document.getElementById('imageModal');
-            const modalImg = document.getElementById('modalImage');
-            modal.style.display = 'block';
-            modalImg.src = imageSrc;
-        }
-
-        function showDetails(comboId) {
-            const sidebar = document.getElementById('detailsSidebar');
-            const content = document.getElementById('sidebarContent');
-            
-            if (window.detailsData && window.detailsData[comboId]) {
-                content.innerHTML = window.detailsData[comboId];
-                sidebar.classList.add('open');
-            }
-        }
-
-        function closeSidebar() {
-            const sidebar = document.getElementById('detailsSidebar');
-            sidebar.classList.remove('open');
-        }
-
-        // Modal close functionality
-        document.querySelector('.close').onclick = function() {
-            document.getElementById('imageModal').style.display = 'none';
-        }
-
-        window.onclick = function(event) {
-            const modal = document.getElementById('imageModal');
-            const sidebar = document.getElementById('detailsSidebar');
-            
-            if (event.target === modal) {
-                modal.style.display = 'none';
-            }
-            
-            // Close sidebar when clicking outside
-            if (event.target === sidebar) {
-                closeSidebar();
-            }
-        }
-    </script>
+    <script src="{js_url}"></script>
 </body>
-</html>'''
-    
-    # Write HTML file
-    with open('single_face_comparison.html', 'w') as f:
-        f.write(html_content)
+</html>''')
+    print(f"♻️ Source groups: {fragments.summary()}")
+    if standalone:
+        build.finish()
+        print(f"🖼️ Thumbnails: {thumbnails.summary()}")
+        print(f"🧩 Sprite sheets: {sprites.summary()}")
     
     print(f"✅ Generated single face comparison page: single_face_comparison.html")
     print(f"📊 Page includes {total_combinations} combination comparisons")
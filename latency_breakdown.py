@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Stage-level latency breakdown from the runner event streams
+
+Reads the JSONL event files written under logs/events/ and reports, per
+endpoint, how long requests spend in each stage (encode, wait for first
+byte, download, write, log) without rerunning anything.
+
+With --phases, reads the *_phases.csv sidecars next to the request logs
+instead and shows where the non-generation time goes per endpoint: DNS,
+connect, TLS, upload, time to first byte beyond the server's reported
+generation time (gateway/queueing), download and local write.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+from collections import defaultdict
+
+from shared.utils import get_project_root
+from shared.utils import parse_float
+from shared.utils.events import STAGE_SPANS, group_by_request, read_events, stage_latencies
+from shared.utils.phase_timing import PHASES
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def find_event_files(root):
+    pattern = os.path.join(root, '**', 'logs', 'events', '*.jsonl')
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+def find_phase_files(root):
+    return sorted(glob.glob(os.path.join(root, '**', '*_phases.csv'), recursive=True))
+
+
+def phase_report(files):
+    """Print where non-generation time goes, per endpoint"""
+    by_endpoint = defaultdict(lambda: defaultdict(list))
+    for path in files:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                endpoint = row.get('api_version') or 'unknown'
+                phases = {name: parse_float(row.get(f'phase_{name}_seconds')) or 0.0 for name in PHASES}
+                generation = parse_float(row.get('server_generation_seconds'))
+                if generation is not None:
+                    # Split time to first byte into server generation and everything else
+                    phases['generation'] = min(generation, phases['ttfb'])
+                    phases['gateway/queue'] = max(0.0, phases['ttfb'] - generation)
+                phases['total'] = sum(phases[name] for name in PHASES)
+                for name, seconds in phases.items():
+                    by_endpoint[endpoint][name].append(seconds)
+
+    print(f"📊 Phase timings from {len(files)} sidecar files")
+    order = PHASES + ['generation', 'gateway/queue', 'total']
+    for endpoint, phases in sorted(by_endpoint.items()):
+        totals = phases['total']
+        total_time = sum(totals) or 1.0
+        generation_time = sum(phases.get('generation', []))
+        print(f"\n{endpoint}  ({len(totals)} requests)")
+        print(f"  {'phase':<14} {'mean':>9} {'p50':>9} {'p95':>9} {'% of total':>11} {'% non-gen':>10}")
+        for name in order:
+            values = sorted(phases.get(name, []))
+            if not values:
+                continue
+            share = sum(values) / total_time * 100
+            non_gen = total_time - generation_time
+            non_gen_share = (sum(values) / non_gen * 100
+                             if non_gen > 0 and name not in ('generation', 'ttfb', 'total') else None)
+            print(f"  {name:<14} {sum(values) / len(values):>8.3f}s {percentile(values, 50):>8.3f}s "
+                  f"{percentile(values, 95):>8.3f}s {share:>10.1f}% "
+                  f"{'' if non_gen_share is None else f'{non_gen_share:.1f}%':>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-stage latency breakdown from event streams')
+    parser.add_argument('files', nargs='*', help='event JSONL files (default: every logs/events/*.jsonl)')
+    parser.add_argument('--phases', action='store_true',
+                        help='report transport phases from the *_phases.csv log sidecars instead')
+    args = parser.parse_args(argv)
+
+    if args.phases:
+        files = args.files or find_phase_files(get_project_root())
+        if not files:
+            print("❌ No *_phases.csv files found (the runners write them next to their request logs)")
+            return 1
+        phase_report(files)
+        return 0
+
+    files = args.files or find_event_files(get_project_root())
+    if not files:
+        print("❌ No event files found (runners write them to logs/events/)")
+        return 1
+
+    requests = {}
+    for path in files:
+        requests.update(group_by_request(read_events(path)))
+    latencies = stage_latencies(requests)
+
+    by_endpoint = defaultdict(lambda: defaultdict(list))
+    for request_id, stages in latencies.items():
+        endpoint = requests[request_id]['attrs'].get('api_version', 'unknown')
+        for stage, seconds in stages.items():
+            by_endpoint[endpoint][stage].append(seconds)
+
+    print(f"📊 {len(requests)} requests from {len(files)} event files")
+    for endpoint, stages in sorted(by_endpoint.items()):
+        print(f"\n{endpoint}")
+        print(f"  {'stage':<10} {'n':>5} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+        for stage in STAGE_SPANS:
+            values = sorted(stages.get(stage, []))
+            if not values:
+                continue
+            mean = sum(values) / len(values)
+            print(f"  {stage:<10} {len(values):>5} {mean:>8.3f}s {percentile(values, 50):>8.3f}s "
+                  f"{percentile(values, 95):>8.3f}s {values[-1]:>8.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Latency percentile report from the persisted HDR histograms
+
+Keeps one mergeable histogram of request durations per endpoint, parameter
+set, card template and session in .cache/, folding in only the log rows
+appended since the previous run, and prints p50/p90/p99/max instead of
+the means the review pages used to show.
+"""
+
+import argparse
+import json
+import sys
+
+from shared.utils.latency_histogram import DIMENSIONS, LatencyHistograms, default_state_path
+
+
+def format_seconds(value):
+    return '-' if value is None else f"{value:.2f}s"
+
+
+def print_table(rows, dimension, limit):
+    if not rows:
+        print(f"\n(no {dimension} histograms)")
+        return
+    columns = [key for key in rows[0][1] if key != 'count']
+    width = max(len(dimension), *(len(label) for label, _ in rows[:limit]))
+    print(f"\n{dimension:<{width}}  {'n':>6}  " + '  '.join(f"{c:>9}" for c in columns))
+    print('-' * (width + 8 + 11 * len(columns)))
+    for label, summary in rows[:limit]:
+        print(f"{label:<{width}}  {summary['count']:>6}  "
+              + '  '.join(f"{format_seconds(summary[c]):>9}" for c in columns))
+    if len(rows) > limit:
+        print(f"... {len(rows) - limit} more")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Latency percentiles per endpoint, parameter set, card and session')
+    parser.add_argument('--state', default=default_state_path(), help='histogram state file')
+    parser.add_argument('--rebuild', action='store_true', help='ignore saved state and rescan everything')
+    parser.add_argument('--logs', nargs='+', help='request log CSVs (default: all found)')
+    parser.add_argument('--dimension', choices=DIMENSIONS + ['all'], default='all',
+                        help='which histograms to show')
+    parser.add_argument('--endpoint', help='only keys for this api_version')
+    parser.add_argument('--percentiles', default='50,90,99', help='comma-separated percentiles')
+    parser.add_argument('--limit', type=int, default=20, help='rows per table (slowest tail first)')
+    parser.add_argument('--json', action='store_true', help='print summaries as JSON')
+    args = parser.parse_args(argv)
+
+    histograms = LatencyHistograms() if args.rebuild else LatencyHistograms.load(args.state)
+    added = histograms.update(args.logs)
+    histograms.save(args.state)
+
+    percentiles = [float(p) for p in args.percentiles.split(',') if p.strip()]
+    dimensions = DIMENSIONS if args.dimension == 'all' else [args.dimension]
+    tables = {}
+    for dimension in dimensions:
+        rows = histograms.table(dimension, percentiles)
+        if args.endpoint:
+            rows = [(key, summary) for key, summary in rows
+                    if key == args.endpoint or key.startswith(args.endpoint + '|')]
+        tables[dimension] = rows
+
+    if args.json:
+        json.dump({dimension: dict(rows) for dimension, rows in tables.items()}, sys.stdout, indent=2)
+        print()
+        return 0
+
+    print(f"🔄 Read {added} new rows ({histograms.rows_seen} total)")
+    for dimension, rows in tables.items():
+        print_table(rows, dimension, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Open-loop load test: latency and error rate vs offered load
+
+Issues swap requests at a target arrival rate (Poisson or fixed) for a
+series of steps, independent of how fast responses come back, and reports
+per step the latency percentiles, error rate and 504 rate, then the knee
+where 504s begin. The sequential timeout tests never put more than one
+request in flight, so they cannot show this.
+
+Runs against a local stand-in by default; --target thortful/segmind-v4.3
+hits the real endpoints (and spends credits).
+
+    python3 load_test.py --rates 0.5,1,2,4,8 --step-duration 30
+    python3 load_test.py --stand-in-workers 4 --stand-in-generation 2 --stand-in-gateway-timeout 6
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from shared.utils import ensure_directory_exists, get_project_root
+from shared.utils.load_generator import (
+    ARRIVAL_PROCESSES, OpenLoopRunner, find_knee, find_latency_knee, make_sender,
+)
+from shared.utils.stand_in import StandInServer, route_url
+
+THORTFUL_ENDPOINT = route_url("https://www.thortful.com/api/v1/faceswap?variation=true")
+SEGMIND_V43_ENDPOINT = route_url("https://api.segmind.com/v1/faceswap-v4.3")
+
+ROOT = Path(get_project_root())
+THORTFUL_DIR = ROOT / 'thortful-v4-single-face'
+
+
+def encode_file(path):
+    with open(path, 'rb') as f:
+        return base64.b64encode(f.read()).decode('utf-8')
+
+
+def thortful_target(timeout):
+    """URL, headers and payload factory for the Thortful endpoint"""
+    sys.path.append(str(THORTFUL_DIR))
+    from run_thortful_face_swap_tests import CARD_IDS
+    from thortful_auth import get_thortful_auth
+
+    headers = get_thortful_auth()
+    if not headers:
+        raise SystemExit("❌ Thortful authentication failed")
+    sources = sorted((THORTFUL_DIR / 'source-images').glob('*.jpg'))
+    if not sources:
+        raise SystemExit("❌ No source images in thortful-v4-single-face/source-images/")
+    encoded = [encode_file(path) for path in sources]
+    combos = itertools.cycle(itertools.product(encoded, CARD_IDS))
+
+    def payload():
+        source, card_id = next(combos)
+        return {"source_image": source, "targetCardId": card_id, "target_card_id": card_id}
+
+    return THORTFUL_ENDPOINT, headers, payload
+
+
+def segmind_v43_target(timeout):
+    """URL, headers and payload factory for Segmind v4.3 multi-face"""
+    from batch_test_single_face import load_api_key
+
+    api_key = load_api_key()
+    if not api_key:
+        raise SystemExit("❌ No Segmind API key (REACT_APP_SEGMIND_API_KEY)")
+    sources = sorted(ROOT.glob('test-results/source-images/source_*.jpg'))
+    targets = sorted(ROOT.glob('test-results/multiface-target-images/target_*.png'))
+    if not sources or not targets:
+        raise SystemExit("❌ No multi-face source/target images under test-results/")
+    combos = itertools.cycle(itertools.product([encode_file(p) for p in sources],
+                                               [encode_file(p) for p in targets]))
+
+    def payload():
+        source, target = next(combos)
+        return {
+            "source_image": source,
+            "target_image": target,
+            "source_face_index": "0,1,2,3",
+            "target_face_index": "0,1,2,3",
+            "detection_face_order": "big_to_small",
+            "model_type": "speed",
+            "swap_type": "face",
+        }
+
+    return SEGMIND_V43_ENDPOINT, {'x-api-key': api_key, 'Content-Type': 'application/json'}, payload
+
+
+def stand_in_payload():
+    return {"source_image": "", "targetCardId": "stand-in"}
+
+
+def format_seconds(value):
+    return '-' if value is None else f"{value:.2f}s"
+
+
+def print_step(step):
+    latency = step.latency.summary()
+    print(f"  {step.offered_rate:>7.3f}/s  {step.scheduled:>5} {step.completed:>5} {step.ok:>5} "
+          f"{step.throughput:>7.3f}/s  {step.error_rate * 100:>6.1f}% {step.gateway_timeout_rate * 100:>6.1f}%  "
+          f"{format_seconds(latency['p50']):>8} {format_seconds(latency['p90']):>8} "
+          f"{format_seconds(latency['p99']):>8} {format_seconds(latency['max']):>8}"
+          + (f"  ⚠️ {step.dropped} dropped" if step.dropped else ''))
+
+
+def parse_rates(text):
+    rates = [float(rate) for rate in text.split(',') if rate.strip()]
+    if not rates or any(rate <= 0 for rate in rates):
+        raise argparse.ArgumentTypeError('rates must be positive numbers, e.g. 0.5,1,2')
+    return rates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Open-loop load test: latency and errors vs offered load')
+    parser.add_argument('--target', choices=['stand-in', 'thortful', 'segmind-v4.3'], default='stand-in')
+    parser.add_argument('--url', help='override the target URL (e.g. a stand-in started elsewhere)')
+    parser.add_argument('--rates', type=parse_rates, default=parse_rates('0.5,1,2,4'),
+                        help='offered loads in requests/second, one step each')
+    parser.add_argument('--step-duration', type=float, default=30.0, help='seconds per step')
+    parser.add_argument('--process', choices=ARRIVAL_PROCESSES, default='poisson', help='arrival process')
+    parser.add_argument('--timeout', type=float, default=150.0, help='client timeout per request')
+    parser.add_argument('--max-in-flight', type=int, default=256,
+                        help='requests allowed in flight; arrivals beyond this are counted as dropped')
+    parser.add_argument('--knee-threshold', type=float, default=0.01, help='504 rate that marks the knee')
+    parser.add_argument('--seed', type=int, help='seed for Poisson arrivals')
+    parser.add_argument('--output', help='JSON report path (default: logs/load_tests/load_<timestamp>.json)')
+    parser.add_argument('--stand-in-workers', type=int, default=4, help='stand-in concurrent generations')
+    parser.add_argument('--stand-in-generation', type=float, default=2.0, help='stand-in median generation seconds')
+    parser.add_argument('--stand-in-gateway-timeout', type=float, default=6.0, help='stand-in gateway timeout')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.target == 'thortful':
+        url, headers, payload = thortful_target(args.timeout)
+    elif args.target == 'segmind-v4.3':
+        url, headers, payload = segmind_v43_target(args.timeout)
+    else:
+        headers, payload = None, stand_in_payload
+        if args.url:
+            url = args.url
+        else:
+            server = StandInServer(workers=args.stand_in_workers, generation_seconds=args.stand_in_generation,
+                                   gateway_timeout=args.stand_in_gateway_timeout, seed=args.seed).start()
+            url = server.url
+            print(f"🧪 Stand-in at {url} ({args.stand_in_workers} workers, "
+                  f"{args.stand_in_generation}s median generation, {args.stand_in_gateway_timeout}s gateway timeout)")
+    url = args.url or url
+
+    total_requests = sum(rate * args.step_duration for rate in args.rates)
+    print(f"🚀 Open-loop {args.process} load against {url}")
+    print(f"   {len(args.rates)} steps × {args.step_duration:.0f}s, ~{total_requests:.0f} requests")
+    print(f"\n  {'offered':>9}  {'sched':>5} {'done':>5} {'ok':>5} {'goodput':>9}  {'errors':>7} {'504s':>7}  "
+          f"{'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+
+    runner = OpenLoopRunner(make_sender(url, payload, headers, args.timeout),
+                            max_in_flight=args.max_in_flight, seed=args.seed)
+    try:
+        steps = runner.run_ramp(args.rates, args.step_duration, args.process, on_step=print_step)
+    finally:
+        if server:
+            server.stop()
+
+    knee = find_knee(steps, args.knee_threshold)
+    latency_knee = find_latency_knee(steps)
+    print()
+    if knee:
+        print(f"📈 504 knee: {knee.offered_rate:g} req/s offered "
+              f"({knee.gateway_timeout_rate * 100:.1f}% 504s, p99 {format_seconds(knee.latency.percentile(99))})")
+    else:
+        print(f"✅ No 504 knee up to {args.rates[-1]:g} req/s (threshold {args.knee_threshold * 100:g}%)")
+    if latency_knee:
+        print(f"🐢 Latency knee: {latency_knee.offered_rate:g} req/s (successful p50 more than doubled)")
+
+    output = args.output or os.path.join(get_project_root(), 'logs', 'load_tests',
+                                         f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    ensure_directory_exists(os.path.dirname(output))
+    with open(output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'target': args.target,
+            'url': url,
+            'process': args.process,
+            'step_duration': args.step_duration,
+            'timeout': args.timeout,
+            'knee_threshold': args.knee_threshold,
+            'knee_rate': knee.offered_rate if knee else None,
+            'latency_knee_rate': latency_knee.offered_rate if latency_knee else None,
+            'steps': [step.to_dict() for step in steps],
+        }, f, indent=2)
+    print(f"📋 Report saved to: {os.path.relpath(output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Query the request logs from the command line
+
+Answers ad-hoc questions over every request log CSV without writing a new
+script each time. Backed by the columnar ResultTable, cached between runs.
+
+Examples:
+  python3 query_logs.py --where api_version=v4 --where target_image=card_template_07 \\
+      --since 7d --percentiles 95
+  python3 query_logs.py --group-by api_version --bin total_payload_size_mb:0.5 \\
+      --agg count,timeout_rate
+  python3 query_logs.py --group-by api_version,detection_face_order \\
+      --metric api_generation_time --bucket day --format csv
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from shared.utils import find_request_logs
+from shared.utils.results_table import AGGREGATES, load_results_table, load_results_table_cached
+
+TIME_BUCKETS = {
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+}
+
+CONDITION_PATTERN = re.compile(r'^([a-z_]+)\s*(>=|<=|!=|=|>|<)\s*(.*)$')
+RELATIVE_TIME_PATTERN = re.compile(r'^(\d+)([hdw])$')
+
+
+def parse_time(value):
+    """Parse an ISO date/time or a relative span such as 12h, 7d, 2w"""
+    match = RELATIVE_TIME_PATTERN.match(value)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        span = {'h': timedelta(hours=amount), 'd': timedelta(days=amount), 'w': timedelta(weeks=amount)}[unit]
+        return (datetime.now() - span).timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+def apply_condition(table, condition):
+    """Build a row mask from one --where expression"""
+    match = CONDITION_PATTERN.match(condition)
+    if not match:
+        raise ValueError(f"Invalid condition: {condition!r} (expected column=value, column>value, ...)")
+    name, op, raw = match.groups()
+    if name not in table.columns:
+        raise ValueError(f"Unknown column: {name}")
+
+    if name in table.categories:
+        if op not in ('=', '!='):
+            raise ValueError(f"Only = and != are supported for {name}")
+        mask = table.mask(**{name: raw.split(',')})
+        return mask if op == '=' else ~mask
+
+    column = table.columns[name]
+    if raw in ('True', 'False'):
+        value = 1 if raw == 'True' else 0
+    else:
+        value = float(raw)
+    ops = {
+        '=': np.equal, '!=': np.not_equal, '>': np.greater,
+        '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+    }
+    return ops[op](column, value)
+
+
+def add_time_bucket(table, bucket):
+    """Add a 'time_bucket' categorical holding the start of each row's bucket"""
+    width = TIME_BUCKETS[bucket]
+    timestamps = table.columns['timestamp']
+    starts = np.floor(np.nan_to_num(timestamps, nan=0.0) / width) * width
+    fmt = '%Y-%m-%d %H:00' if bucket == 'hour' else '%Y-%m-%d'
+    labels = np.array([datetime.fromtimestamp(s).strftime(fmt) if s else 'unknown' for s in starts])
+    return table.with_categorical('time_bucket', labels)
+
+
+def parse_bin_spec(spec):
+    """Split a --bin column:width spec, checking the width is a positive number"""
+    name, sep, width = spec.partition(':')
+    try:
+        width = float(width) if sep else 0.0
+    except ValueError:
+        width = 0.0
+    if not name or not width > 0:
+        raise ValueError(f"Invalid bin: {spec!r} (expected column:width, e.g. total_payload_size_mb:0.5)")
+    return name, width
+
+
+def numeric_column_error(table, name):
+    """Why a column cannot be binned or aggregated, or None if it is numeric"""
+    if name not in table.columns:
+        return f"unknown column {name}"
+    if name in table.categories:
+        return f"{name} is categorical, not numeric"
+    return None
+
+
+def add_numeric_bin(table, spec):
+    """Add a '<column>_bin' categorical from a column:width spec"""
+    name, width = parse_bin_spec(spec)
+    values = table.columns[name].astype(np.float64)
+    lower = np.floor(values / width) * width
+    labels = np.array([f"{lo:g}-{lo + width:g}" if not np.isnan(lo) else 'unknown' for lo in lower])
+    # Zero-pad the lower bound so labels sort numerically
+    keys = np.array([f"{lo:012.3f}|{label}" if not np.isnan(lo) else f"~|{label}"
+                     for lo, label in zip(lower, labels)])
+    table = table.with_categorical(f'{name}_bin', keys)
+    table.categories[f'{name}_bin'] = [k.split('|', 1)[1] for k in table.categories[f'{name}_bin']]
+    return table, f'{name}_bin'
+
+
+def write_output(rows, columns, output_format, out=sys.stdout):
+    """Print result rows as an aligned table, CSV or JSON"""
+    if output_format == 'json':
+        json.dump(rows, out, indent=2)
+        out.write('\n')
+        return
+    if output_format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+
+    def fmt(value):
+        if isinstance(value, float):
+            return 'nan' if np.isnan(value) else f"{value:.3f}"
+        return str(value)
+
+    cells = [[fmt(row.get(c, '')) for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    out.write('  '.join(c.ljust(w) for c, w in zip(columns, widths)) + '\n')
+    out.write('  '.join('-' * w for w in widths) + '\n')
+    for r in cells:
+        out.write('  '.join(v.ljust(w) for v, w in zip(r, widths)) + '\n')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='Query the face swap request logs',
+        epilog=__doc__.split('Examples:', 1)[1],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--logs', nargs='+', help='log CSVs to query (default: every request log)')
+    parser.add_argument('--include-archive', action='store_true', help='also read logs/archive/')
+    parser.add_argument('--where', action='append', default=[],
+                        help='filter, e.g. api_version=v4, success=False, request_duration_seconds>60')
+    parser.add_argument('--since', help='only rows at/after this ISO time or relative span (7d)')
+    parser.add_argument('--until', help='only rows before this ISO time or relative span')
+    parser.add_argument('--group-by', default='', help='comma-separated categorical columns')
+    parser.add_argument('--bucket', choices=sorted(TIME_BUCKETS), help='also group by time bucket')
+    parser.add_argument('--bin', help='also group by a numeric column in bins, e.g. total_payload_size_mb:0.5')
+    parser.add_argument('--metric', default='request_duration_seconds', help='numeric column to aggregate')
+    parser.add_argument('--agg', default='count,mean,success_rate', help=f"aggregates: {','.join(AGGREGATES)}")
+    parser.add_argument('--percentiles', default='', help='comma-separated percentiles, e.g. 50,95,99')
+    parser.add_argument('--format', choices=['table', 'csv', 'json'], default='table')
+    parser.add_argument('--no-cache', action='store_true', help='reload the CSVs instead of using the cache')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    bin_column = None
+    if args.bin:
+        try:
+            bin_column, _ = parse_bin_spec(args.bin)
+        except ValueError as e:
+            parser.error(str(e))
+
+    paths = args.logs or find_request_logs(include_archive=args.include_archive)
+    table = load_results_table(paths) if args.no_cache else load_results_table_cached(paths)
+    # Categorical columns hold dictionary codes, which would aggregate without complaint
+    for option, name in (('--metric', args.metric), ('--bin', bin_column)):
+        error = numeric_column_error(table, name) if name else None
+        if error:
+            parser.error(f"{option}: {error}")
+
+    mask = np.ones(len(table), dtype=bool)
+    try:
+        for condition in args.where:
+            mask &= apply_condition(table, condition)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if args.since:
+        mask &= table.columns['timestamp'] >= parse_time(args.since)
+    if args.until:
+        mask &= table.columns['timestamp'] < parse_time(args.until)
+    table = table.filter(mask)
+
+    keys = [k for k in args.group_by.split(',') if k]
+    if args.bucket:
+        table = add_time_bucket(table, args.bucket)
+        keys.append('time_bucket')
+    if args.bin:
+        table, bin_key = add_numeric_bin(table, args.bin)
+        keys.append(bin_key)
+    for key in keys:
+        if key not in table.categories:
+            print(f"❌ Cannot group by {key}: not a categorical column", file=sys.stderr)
+            return 2
+
+    aggregates = [a for a in args.agg.split(',') if a]
+    percentiles = [float(p) for p in args.percentiles.split(',') if p]
+
+    if not keys:
+        # A single group covering every selected row
+        table = table.with_categorical('all', np.array(['all'] * len(table)))
+        keys = ['all']
+    rows = table.group_by(keys, value=args.metric, aggregates=aggregates, percentiles=percentiles)
+
+    columns = keys + aggregates + [f'p{p:g}' for p in percentiles]
+    write_output(rows, columns, args.format)
+    if args.format == 'table':
+        print(f"\n{len(table):,} rows matched in {time.perf_counter() - started:.3f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+function openModal(imageSrc) {
+    const modal = document.getElementById('imageModal');
+    const modalImg = document.getElementById('modalImage');
+    modal.style.display = 'block';
+    modalImg.src = imageSrc;
+}
+
+function showDetails(comboId) {
+    const sidebar = document.getElementById('detailsSidebar');
+    const content = document.getElementById('sidebarContent');
+
+    if (window.detailsData && window.detailsData[comboId]) {
+        content.innerHTML = window.detailsData[comboId];
+        sidebar.classList.add('open');
+    }
+}
+
+function closeSidebar() {
+    const sidebar = document.getElementById('detailsSidebar');
+    sidebar.classList.remove('open');
+}
+
+// Modal close functionality
+document.querySelector('.close').onclick = function() {
+    document.getElementById('imageModal').style.display = 'none';
+}
+
+window.onclick = function(event) {
+    const modal = document.getElementById('imageModal');
+    const sidebar = document.getElementById('detailsSidebar');
+
+    if (event.target === modal) {
+        modal.style.display = 'none';
+    }
+
+    // Close sidebar when clicking outside
+    if (event.target === sidebar) {
+        closeSidebar();
+    }
+}
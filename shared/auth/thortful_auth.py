@@ -254,10 +254,11 @@ if __name__ == "__main__":
         
         print("\n" + "⚠️ " * 20)
         print("🚨 CRITICAL REMINDER FOR API CALLS:")
-        print("   - Use minimum 120s timeout (recommended: 180s)")
         print("   - Face swap processing takes 45-60+ seconds")
         print("   - Short timeouts cause false failures!")
-        print("   - Example: requests.post(url, headers=headers, timeout=180)")
+        print("   - Use the tuned timeout (180s until there is enough latency data):")
+        print("     requests.post(url, headers=headers, timeout=request_timeout('v4-thortful'))")
+        print("   - python3 timeout_report.py shows the current values per endpoint")
         print("⚠️ " * 20)
     else:
         print("\n❌ Authentication failed!")
\ No newline at end of file
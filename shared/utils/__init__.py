@@ -3,6 +3,8 @@ Shared utilities for face swap testing suite
 """
 from .common import (
     ensure_directory_exists,
+    file_signature,
+    write_json_atomic,
     save_result_metadata,
     load_result_metadata,
     log_test_result,
@@ -12,9 +14,18 @@ from .common import (
     format_test_duration,
     parse_result_filename
 )
+from .request_logs import (
+    find_request_logs,
+    iter_request_rows,
+    iter_all_request_rows,
+    parse_float,
+    parse_bool
+)
 
 __all__ = [
     'ensure_directory_exists',
+    'file_signature',
+    'write_json_atomic',
     'save_result_metadata', 
     'load_result_metadata',
     'log_test_result',
@@ -22,5 +33,10 @@ __all__ = [
     'get_project_root',
     'get_shared_auth_path',
     'format_test_duration',
-    'parse_result_filename'
+    'parse_result_filename',
+    'find_request_logs',
+    'iter_request_rows',
+    'iter_all_request_rows',
+    'parse_float',
+    'parse_bool'
 ]
\ No newline at end of file
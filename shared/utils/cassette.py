@@ -0,0 +1,318 @@
+"""
+Record/replay cassettes for the runners' HTTP traffic
+
+A cassette is a directory holding interactions.jsonl (one line per
+request: fingerprint, status, headers, timings, body hash) and bodies/
+(response bodies, gzip-compressed and stored once per content hash). The
+request fingerprint is method + path + query + a hash of the canonical JSON
+body, so the host (real API or stand-in) and auth headers do not matter.
+
+CassetteAdapter sits in the same requests transport the runners already
+use (timed_session() mounts it when FACESWAP_CASSETTE is set):
+
+    FACESWAP_CASSETTE=record:cassettes/thortful_run   python3 run_thortful_face_swap_tests.py
+    FACESWAP_CASSETTE=replay:cassettes/thortful_run FACESWAP_CASSETTE_SPEED=20 python3 ...
+
+Replay waits each interaction's recorded duration divided by the speed (0
+means no wait), replays recorded timeouts as timeouts, and raises
+CassetteMiss for a request that was never recorded. Repeated identical
+requests are answered in recorded order, cycling when exhausted.
+import_thortful_log() builds a cassette from a past Thortful run.
+"""
+import base64
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .common import ensure_directory_exists
+from .request_logs import parse_bool, parse_float
+
+CASSETTE_ENV = 'FACESWAP_CASSETTE'
+SPEED_ENV = 'FACESWAP_CASSETTE_SPEED'
+
+MODES = ('record', 'replay')
+
+THORTFUL_URL = 'https://www.thortful.com/api/v1/faceswap?variation=true'
+
+# Exceptions a recorded failure is replayed as
+REPLAYED_ERRORS = {
+    'ReadTimeout': requests.exceptions.ReadTimeout,
+    'ConnectTimeout': requests.exceptions.ConnectTimeout,
+    'Timeout': requests.exceptions.Timeout,
+    'ConnectionError': requests.exceptions.ConnectionError,
+}
+
+# Hop-by-hop or encoding headers that no longer describe the stored body
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'connection', 'keep-alive', 'content-length'}
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """A replayed request that the cassette has no recording for"""
+
+
+def request_fingerprint(method: str, url: str, body: Optional[bytes]) -> str:
+    """Stable id of a request: method, path, query and canonical JSON body"""
+    parts = urlsplit(url)
+    digest = hashlib.sha256()
+    if body:
+        try:
+            canonical = json.dumps(json.loads(body), sort_keys=True, separators=(',', ':')).encode('utf-8')
+        except ValueError:
+            canonical = body
+        digest.update(canonical)
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{method.upper()} {parts.path}{query} {digest.hexdigest()[:32]}"
+
+
+class Cassette:
+    """Interactions and content-addressed response bodies in one directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.interactions_path = os.path.join(path, 'interactions.jsonl')
+        self.bodies_dir = os.path.join(path, 'bodies')
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.interactions: List[Dict[str, Any]] = []
+        if os.path.exists(self.interactions_path):
+            with open(self.interactions_path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+
+    def _index(self, interaction: Dict[str, Any]) -> None:
+        self.interactions.append(interaction)
+        self._queues[interaction['fingerprint']].append(interaction)
+
+    def put_body(self, body: bytes) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        path = os.path.join(self.bodies_dir, f"{digest}.gz")
+        if not os.path.exists(path):
+            ensure_directory_exists(self.bodies_dir)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get_body(self, digest: str) -> bytes:
+        with gzip.open(os.path.join(self.bodies_dir, f"{digest}.gz"), 'rb') as f:
+            return f.read()
+
+    def add(self, fingerprint: str, method: str, url: str, elapsed: float, status: Optional[int] = None,
+            reason: str = '', headers: Optional[Dict[str, str]] = None, body: Optional[bytes] = None,
+            ttfb: Optional[float] = None, error: Optional[str] = None,
+            recorded_at: Optional[str] = None) -> Dict[str, Any]:
+        """Append one interaction (a response, or an error such as a timeout)"""
+        parts = urlsplit(url)
+        interaction = {
+            'fingerprint': fingerprint,
+            'method': method.upper(),
+            'path': parts.path + (f"?{parts.query}" if parts.query else ''),
+            'recorded_at': recorded_at or datetime.now().isoformat(),
+            'elapsed': round(elapsed, 4),
+            'ttfb': round(ttfb, 4) if ttfb is not None else None,
+            'status': status,
+            'reason': reason,
+            'headers': {name: value for name, value in (headers or {}).items()
+                        if name.lower() not in DROPPED_HEADERS},
+            'body': self.put_body(body) if body is not None else None,
+            'error': error,
+        }
+        with self._lock:
+            ensure_directory_exists(self.path)
+            with open(self.interactions_path, 'a') as f:
+                f.write(json.dumps(interaction, separators=(',', ':')) + '\n')
+            self._index(interaction)
+        return interaction
+
+    def next(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Next recorded interaction for a fingerprint, cycling through repeats"""
+        with self._lock:
+            queue = self._queues.get(fingerprint)
+            if not queue:
+                return None
+            interaction = queue.popleft()
+            queue.append(interaction)
+            return interaction
+
+    def summary(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = defaultdict(int)
+        for interaction in self.interactions:
+            statuses[str(interaction['status'] or interaction['error'])] += 1
+        bodies = os.listdir(self.bodies_dir) if os.path.isdir(self.bodies_dir) else []
+        return {
+            'interactions': len(self.interactions),
+            'distinct_requests': len(self._queues),
+            'statuses': dict(statuses),
+            'recorded_seconds': round(sum(i['elapsed'] for i in self.interactions), 1),
+            'bodies': len(bodies),
+            'body_bytes': sum(os.path.getsize(os.path.join(self.bodies_dir, name)) for name in bodies),
+        }
+
+
+class CassetteAdapter(BaseAdapter):
+    """Transport adapter that records through another adapter or replays a cassette"""
+
+    def __init__(self, cassette: Cassette, mode: str, inner: Optional[BaseAdapter] = None,
+                 speed: float = 1.0):
+        super().__init__()
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}, not {mode!r}")
+        self.cassette = cassette
+        self.mode = mode
+        self.inner = inner or HTTPAdapter()
+        self.speed = speed
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+        fingerprint = request_fingerprint(request.method, request.url, body)
+        if self.mode == 'replay':
+            return self._replay(request, fingerprint)
+
+        start = time.perf_counter()
+        try:
+            # Streamed so the headers arrive before the body is read: Response.elapsed
+            # is only filled in by Session.send, after the adapter returns
+            response = self.inner.send(request, stream=True, timeout=timeout, verify=verify,
+                                       cert=cert, proxies=proxies)
+            ttfb = time.perf_counter() - start
+            content = response.content  # recording needs the whole body
+        except requests.exceptions.RequestException as e:
+            self.cassette.add(fingerprint, request.method, request.url, time.perf_counter() - start,
+                              error=type(e).__name__)
+            raise
+        self.cassette.add(fingerprint, request.method, request.url, time.perf_counter() - start,
+                          status=response.status_code, reason=response.reason or '',
+                          headers=dict(response.headers), body=content,
+                          ttfb=ttfb)
+        return response
+
+    def _replay(self, request, fingerprint: str) -> requests.Response:
+        interaction = self.cassette.next(fingerprint)
+        if interaction is None:
+            raise CassetteMiss(f"No recording for {fingerprint}", request=request)
+        if self.speed > 0:
+            time.sleep(interaction['elapsed'] / self.speed)
+        if interaction['error']:
+            error = REPLAYED_ERRORS.get(interaction['error'], requests.exceptions.ConnectionError)
+            raise error(f"Replayed {interaction['error']} from cassette", request=request)
+
+        body = self.cassette.get_body(interaction['body']) if interaction['body'] else b''
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.reason = interaction['reason']
+        response.headers = CaseInsensitiveDict(interaction['headers'])
+        response.headers['Content-Length'] = str(len(body))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        # Replay timing comes from the sleep above; Session.send sets elapsed itself
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def _error_status(message: str) -> Optional[Tuple[int, str]]:
+    """(status, body) from a logged "HTTP nnn: <body>" error message"""
+    match = re.match(r'HTTP (\d{3}): ?(.*)', message or '', re.DOTALL)
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+def import_thortful_log(log_path: str, cassette_path: str, source_dirs: Iterable[str],
+                        results_dir: str, endpoint: str = THORTFUL_URL) -> Dict[str, int]:
+    """
+    Build a cassette from a Thortful runner log and its results directory
+
+    Each row's request is rebuilt exactly as run_single_face_swap sends it
+    (base64 source image plus the card id in both spellings). Successes
+    answer with the saved result image, HTTP errors with the logged status
+    and body, and exhausted timeout retries with a timeout, each taking the
+    row's logged request time.
+    """
+    cassette = Cassette(cassette_path)
+    counts = {'imported': 0, 'missing_source': 0, 'missing_result': 0}
+    encoded_sources: Dict[str, str] = {}
+    with open(log_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            source_name = row.get('source_image') or ''
+            if source_name not in encoded_sources:
+                source_path = next((os.path.join(folder, source_name) for folder in source_dirs
+                                    if os.path.isfile(os.path.join(folder, source_name))), None)
+                if source_path is None:
+                    counts['missing_source'] += 1
+                    continue
+                with open(source_path, 'rb') as image:
+                    encoded_sources[source_name] = base64.b64encode(image.read()).decode('utf-8')
+            card_id = row.get('card_id') or ''
+            body = json.dumps({
+                'source_image': encoded_sources[source_name],
+                'targetCardId': card_id,
+                'target_card_id': card_id,
+            }).encode('utf-8')
+            fingerprint = request_fingerprint('POST', endpoint, body)
+            elapsed = parse_float(row.get('request_time_seconds')) or 0.0
+            recorded_at = row.get('timestamp')
+            error = row.get('error_message') or ''
+
+            if parse_bool(row.get('success')):
+                result_path = os.path.join(results_dir, row.get('result_image') or '')
+                if not os.path.isfile(result_path):
+                    counts['missing_result'] += 1
+                    continue
+                with open(result_path, 'rb') as image:
+                    image_b64 = base64.b64encode(image.read()).decode('utf-8')
+                cassette.add(fingerprint, 'POST', endpoint, elapsed, status=200, reason='OK',
+                             headers={'Content-Type': 'application/json'},
+                             body=json.dumps({'image': image_b64}).encode('utf-8'), recorded_at=recorded_at)
+            elif _error_status(error):
+                status, text = _error_status(error)
+                cassette.add(fingerprint, 'POST', endpoint, elapsed, status=status,
+                             headers={'Content-Type': 'text/html' if text.lstrip().startswith('<')
+                                      else 'application/json'},
+                             body=text.encode('utf-8'), recorded_at=recorded_at)
+            else:
+                # "Failed after N attempts: Timeout ..." and connection failures
+                cassette.add(fingerprint, 'POST', endpoint, elapsed, recorded_at=recorded_at,
+                             error='ReadTimeout' if 'timeout' in error.lower() else 'ConnectionError')
+            counts['imported'] += 1
+    return counts
+
+
+def cassette_from_env() -> Optional[Tuple[str, str, float]]:
+    """(mode, path, speed) from FACESWAP_CASSETTE=<mode>:<path>, or None"""
+    value = os.environ.get(CASSETTE_ENV)
+    if not value:
+        return None
+    mode, _, path = value.partition(':')
+    if mode not in MODES or not path:
+        raise ValueError(f"{CASSETTE_ENV} must be record:<dir> or replay:<dir>, not {value!r}")
+    return mode, path, float(os.environ.get(SPEED_ENV, '1'))
+
+
+def install_cassette(session: requests.Session, mode: str, path: str, speed: float = 1.0) -> CassetteAdapter:
+    """Route a session's http:// and https:// traffic through a cassette"""
+    adapter = CassetteAdapter(Cassette(path), mode, inner=session.get_adapter('https://'), speed=speed)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    print(f"📼 {'Recording to' if mode == 'record' else 'Replaying'} cassette {path}"
+          + (f" at {speed:g}x" if mode == 'replay' else ''))
+    return adapter
@@ -5,13 +5,30 @@ import os
 import json
 import csv
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 def ensure_directory_exists(directory_path: str) -> None:
     """Ensure a directory exists, create if it doesn't"""
     if not os.path.exists(directory_path):
         os.makedirs(directory_path)
 
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None) -> None:
+    """Write JSON through a .tmp file and os.replace, so an interrupted run never leaves it half-written"""
+    ensure_directory_exists(os.path.dirname(path) or '.')
+    # dumps, not dump: json.dump always takes the pure-Python encoder, several times slower on large state
+    text = json.dumps(data, indent=indent) if indent is not None else json.dumps(data, separators=(',', ':'))
+    with open(path + '.tmp', 'w') as f:
+        f.write(text)
+    os.replace(path + '.tmp', path)
+
 def save_result_metadata(result_path: str, metadata: Dict[str, Any]) -> None:
     """Save metadata for a test result"""
     metadata_path = result_path.replace('.jpg', '_metadata.json')
@@ -0,0 +1,115 @@
+"""
+Consistency checks between request logs and the files on disk
+
+Each directory is listed once with os.scandir, then the log is streamed
+and checked in both directions:
+  - orphan rows: the source image is gone, or a successful row's result
+    image is missing
+  - orphan images: result files that no (non-excluded) row refers to
+
+Fixes never rewrite the log. Orphan rows are recorded in a new exclusion
+segment next to the log (<log>.segments/exclude-<timestamp>.csv), written
+atomically; request_logs readers skip excluded rows.
+"""
+import csv
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from .common import ensure_directory_exists
+from .request_logs import (
+    iter_raw_records,
+    load_exclusions,
+    normalize_row,
+    record_digest,
+    segments_dir,
+)
+
+# result_image values the runners write when there is no image
+NO_RESULT_VALUES = {'', 'error', 'exception', 'timeout_error', 'gateway_timeout', 'no_image_returned'}
+
+SEGMENT_FIELDS = ['offset', 'digest', 'reason', 'source_image', 'result_image', 'checked_at']
+
+
+def scan_names(directory: str, suffixes: Optional[Tuple[str, ...]] = None) -> Set[str]:
+    """List the file names in a directory with a single os.scandir pass"""
+    if not os.path.isdir(directory):
+        return set()
+    with os.scandir(directory) as entries:
+        return {entry.name for entry in entries
+                if entry.is_file() and (suffixes is None or entry.name.endswith(suffixes))}
+
+
+@dataclass
+class ConsistencyReport:
+    """Result of checking one log against its source and results directories"""
+    log_path: str
+    rows_checked: int = 0
+    already_excluded: int = 0
+    orphan_rows: List[Dict[str, str]] = field(default_factory=list)
+    orphan_images: List[str] = field(default_factory=list)
+
+    @property
+    def is_consistent(self) -> bool:
+        return not self.orphan_rows and not self.orphan_images
+
+
+def check_log(log_path: str, source_dir: str, results_dir: str,
+              result_suffixes: Tuple[str, ...] = ('.jpg', '.jpeg', '.png')) -> ConsistencyReport:
+    """Stream-validate a request log against its source and results directories"""
+    sources = scan_names(source_dir)
+    results = scan_names(results_dir, result_suffixes)
+    excluded = load_exclusions(log_path)
+    report = ConsistencyReport(log_path)
+    referenced: Set[str] = set()
+
+    for header, values, start, _, raw in iter_raw_records(log_path):
+        report.rows_checked += 1
+        digest = record_digest(raw)
+        if excluded.get(start) == digest:
+            report.already_excluded += 1
+            continue
+
+        row = normalize_row(dict(zip(header, values)))
+        result_image = row.get('result_image', '')
+        reason = ''
+        if row.get('source_image') not in sources:
+            reason = 'source_missing'
+        elif row.get('success') == 'True' and result_image not in NO_RESULT_VALUES:
+            if result_image in results:
+                referenced.add(result_image)
+            else:
+                reason = 'result_missing'
+
+        if reason:
+            report.orphan_rows.append({
+                'offset': str(start),
+                'digest': digest,
+                'reason': reason,
+                'source_image': row.get('source_image', ''),
+                'result_image': result_image,
+            })
+
+    report.orphan_images = sorted(results - referenced)
+    return report
+
+
+def write_exclusion_segment(log_path: str, orphan_rows: List[Dict[str, str]]) -> Optional[str]:
+    """Record orphan rows in a new exclusion segment, written atomically"""
+    if not orphan_rows:
+        return None
+    directory = segments_dir(log_path)
+    ensure_directory_exists(directory)
+    checked_at = datetime.now().isoformat()
+    segment_path = os.path.join(directory, f"exclude-{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv")
+    tmp_path = segment_path + '.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SEGMENT_FIELDS)
+        writer.writeheader()
+        for row in orphan_rows:
+            writer.writerow(dict(row, checked_at=checked_at))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, segment_path)
+    return segment_path
@@ -0,0 +1,223 @@
+"""
+Error taxonomy: normalise free-text error messages into stable fingerprints
+
+error_message holds whatever the runner caught, truncated to 200 chars:
+HTTP bodies (JSON, Cloudflare HTML pages), requests exceptions, timeouts.
+Fingerprints strip the variable parts (ids, numbers, URLs, HTML) so that
+the same failure always lands in the same bucket.
+"""
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .common import get_project_root, write_json_atomic
+from .request_logs import SKIP_DIRS, find_request_logs, iter_request_rows_from
+
+# 2: archived logs are no longer read by default, so older states are rescanned
+STATE_VERSION = 2
+
+HTTP_STATUS = re.compile(r'^HTTP (\d{3}):?\s*')
+HTML_TITLE = re.compile(r'<title>\s*(.*?)\s*</title>', re.IGNORECASE | re.DOTALL)
+HTML_START = re.compile(r'<(!DOCTYPE|html|head|body|!--)', re.IGNORECASE)
+TRACEBACK_LAST = re.compile(r'^(\w+(?:\.\w+)*(?:Error|Exception|Timeout)\b.*)$', re.MULTILINE)
+
+# Applied in order; each replaces a variable token with a placeholder
+SUBSTITUTIONS = [
+    (re.compile(r'https?://[^\s\]\)\'"]+'), '<url>'),
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b', re.I), '<uuid>'),
+    (re.compile(r'\b0x[0-9a-f]+\b', re.I), '<addr>'),
+    (re.compile(r'\b(?=[0-9a-f]*\d)[0-9a-f]{16,}\b', re.I), '<id>'),
+    (re.compile(r'\b\d+(?:\.\d+)?s?\b'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+# send_notification writes: "🚨 ERROR [2025-07-25 10:19:51] message"
+NOTIFICATION_LINE = re.compile(r'ERROR \[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.*)$')
+
+
+def fingerprint_error(message: str) -> Tuple[str, str]:
+    """Return (fingerprint, category) for a raw error message"""
+    text = (message or '').strip()
+    if not text:
+        return '', ''
+
+    prefix = ''
+    status_match = HTTP_STATUS.match(text)
+    if status_match:
+        prefix = f"HTTP {status_match.group(1)}: "
+        text = text[status_match.end():]
+
+    if 'Traceback (most recent call last)' in text:
+        exceptions = TRACEBACK_LAST.findall(text)
+        text = exceptions[-1] if exceptions else 'Traceback'
+
+    html_match = HTML_START.search(text)
+    if html_match:
+        title = HTML_TITLE.search(text)
+        text = text[:html_match.start()] + (f"<html:{title.group(1)}>" if title else '<html>')
+    else:
+        # Compact JSON bodies so whitespace differences do not split buckets
+        try:
+            text = json.dumps(json.loads(text), sort_keys=True)
+        except ValueError:
+            pass
+
+    for pattern, replacement in SUBSTITUTIONS:
+        text = pattern.sub(replacement, text)
+    fingerprint = (prefix + text.strip())[:160]
+    return fingerprint, categorize_error(fingerprint)
+
+
+def categorize_error(fingerprint: str) -> str:
+    """Coarse category for a fingerprint"""
+    lowered = fingerprint.lower()
+    if 'timeout' in lowered or 'timed out' in lowered or lowered.startswith(('http 504', 'http 524')):
+        return 'timeout'
+    if lowered.startswith(('http 502', 'http 503', 'http 500')):
+        return 'upstream_error'
+    if lowered.startswith(('http 401', 'http 403')):
+        return 'auth_error'
+    if lowered.startswith('http 4'):
+        return 'client_error'
+    if lowered.startswith('http '):
+        return 'http_error'
+    if 'pipe' in lowered or 'connection' in lowered:
+        return 'connection_error'
+    return 'exception'
+
+
+def find_error_logs(root: Optional[str] = None) -> List[str]:
+    """Find the errors.log files written by send_notification"""
+    root = root or get_project_root()
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        if 'errors.log' in filenames:
+            found.append(os.path.join(dirpath, 'errors.log'))
+    return found
+
+
+def iter_error_log_from(log_path: str, offset: int = 0) -> Iterator[Tuple[Dict[str, str], int]]:
+    """Stream send_notification error lines from a byte offset"""
+    with open(log_path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                break
+            match = NOTIFICATION_LINE.search(line.decode('utf-8', errors='replace').rstrip())
+            if match:
+                yield {
+                    'timestamp': match.group(1).replace(' ', 'T'),
+                    'error_message': match.group(2),
+                    'api_version': 'notification',
+                    'log_file': log_path,
+                }, f.tell()
+
+
+class ErrorTaxonomy:
+    """Per-fingerprint error counts, first/last seen and affected endpoints/cards"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.fingerprints: Dict[str, Dict[str, Any]] = state.get('fingerprints', {})
+        self.offsets: Dict[str, int] = state.get('offsets', {})
+        self.rows_seen: int = state.get('rows_seen', 0)
+
+    def add(self, row: Dict[str, str]) -> None:
+        """Record one log row (rows without an error message are only counted)"""
+        self.rows_seen += 1
+        fingerprint, category = fingerprint_error(row.get('error_message', ''))
+        if not fingerprint:
+            return
+
+        timestamp = row.get('timestamp', '')
+        entry = self.fingerprints.get(fingerprint)
+        if entry is None:
+            entry = self.fingerprints[fingerprint] = {
+                'category': category,
+                'count': 0,
+                'first_seen': timestamp,
+                'last_seen': timestamp,
+                'example': row.get('error_message', '')[:200],
+                'endpoints': {},
+                'cards': {},
+            }
+        entry['count'] += 1
+        if timestamp and (not entry['first_seen'] or timestamp < entry['first_seen']):
+            entry['first_seen'] = timestamp
+        if timestamp > entry['last_seen']:
+            entry['last_seen'] = timestamp
+
+        endpoint = row.get('api_version') or 'unknown'
+        entry['endpoints'][endpoint] = entry['endpoints'].get(endpoint, 0) + 1
+        card = row.get('card_id') or row.get('target_image')
+        if card:
+            entry['cards'][card] = entry['cards'].get(card, 0) + 1
+
+    def update_from_csv(self, csv_path: str) -> int:
+        """Consume rows appended to a request log since the last update"""
+        return self._consume(csv_path, iter_request_rows_from)
+
+    def update_from_error_log(self, log_path: str) -> int:
+        """Consume lines appended to an errors.log since the last update"""
+        return self._consume(log_path, iter_error_log_from)
+
+    def _consume(self, path: str, reader) -> int:
+        offset = self.offsets.get(path, 0)
+        if os.path.getsize(path) < offset:
+            offset = 0  # file was rewritten (e.g. by clean_csv.py); start over
+        added = 0
+        for row, end_offset in reader(path, offset):
+            self.add(row)
+            self.offsets[path] = end_offset
+            added += 1
+        return added
+
+    def update(self, csv_paths: Optional[List[str]] = None, error_logs: Optional[List[str]] = None,
+               include_archive: bool = False) -> int:
+        """
+        Incrementally consume every request log and errors.log
+
+        Archived logs are left out by default, like the other readers: their
+        older layouts put other columns' values under error_message.
+        """
+        added = 0
+        for path in (csv_paths if csv_paths is not None else find_request_logs(include_archive=include_archive)):
+            added += self.update_from_csv(path)
+        for path in (error_logs if error_logs is not None else find_error_logs()):
+            added += self.update_from_error_log(path)
+        return added
+
+    def ranked(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Fingerprints ordered by count, most frequent first"""
+        return sorted(self.fingerprints.items(), key=lambda item: (-item[1]['count'], item[0]))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'updated': datetime.now().isoformat(),
+            'rows_seen': self.rows_seen,
+            'offsets': self.offsets,
+            'fingerprints': self.fingerprints,
+        }
+
+    def save(self, state_path: str) -> None:
+        """Write state atomically so an interrupted run never corrupts it"""
+        write_json_atomic(state_path, self.to_state(), indent=1)
+
+    @classmethod
+    def load(cls, state_path: str) -> 'ErrorTaxonomy':
+        """Load saved state, or start empty if none exists or the format changed"""
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return cls(state)
+        return cls()
+
+
+def default_state_path() -> str:
+    return os.path.join(get_project_root(), '.cache', 'error_taxonomy.json')
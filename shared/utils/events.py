@@ -0,0 +1,195 @@
+"""
+Schema-versioned JSON-lines event stream for the swap pipeline
+
+Every request emits timestamped marks for each stage:
+
+    request -> encode_start -> encode_end -> send -> first_byte
+            -> complete -> write -> log
+
+Timestamps are time.monotonic_ns() values; the stream header records the
+wall clock at a known monotonic instant so events can be placed in real
+time. Events are handed to a background thread and serialised with orjson
+when it is installed, so emitting one costs a queue put on the request path.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .common import ensure_directory_exists
+
+SCHEMA_VERSION = 1
+
+STAGES = ['encode_start', 'encode_end', 'send', 'first_byte', 'complete', 'write', 'log']
+
+# Stage latency name -> (from mark, to mark)
+STAGE_SPANS = {
+    'encode': ('encode_start', 'encode_end'),
+    'prepare': ('encode_end', 'send'),
+    'wait': ('send', 'first_byte'),
+    'download': ('first_byte', 'complete'),
+    'write': ('complete', 'write'),
+    'log': ('write', 'log'),
+    'total': ('request', 'log'),
+}
+
+
+def _dumps(event: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(event, default=str) + b'\n'
+    return (json.dumps(event, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+
+
+class EventStream:
+    """Append events to a JSONL file from a background writer thread"""
+
+    def __init__(self, path: str, run_id: Optional[str] = None, **run_attrs: Any):
+        ensure_directory_exists(os.path.dirname(path) or '.')
+        self.path = path
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._queue: 'queue.SimpleQueue[Optional[Dict[str, Any]]]' = queue.SimpleQueue()
+        self._file = open(path, 'ab')
+        self._thread = threading.Thread(target=self._writer, name='event-writer', daemon=True)
+        self._thread.start()
+        self.emit(None, 'stream_start', schema_version=SCHEMA_VERSION,
+                  wall_time=time.time(), pid=os.getpid(), **run_attrs)
+
+    def emit(self, request_id: Optional[str], event: str, **fields: Any) -> None:
+        """Queue one event; never blocks on disk"""
+        record = {'v': SCHEMA_VERSION, 'ts': time.monotonic_ns(), 'run': self.run_id,
+                  'req': request_id, 'event': event}
+        record.update(fields)
+        self._queue.put(record)
+
+    @contextmanager
+    def request(self, request_id: str, **attrs: Any) -> Iterator['RequestEvents']:
+        """Scope a request: emits 'request' on entry and 'error' if it raises"""
+        events = RequestEvents(self, request_id)
+        self.emit(request_id, 'request', **attrs)
+        try:
+            yield events
+        except BaseException as e:
+            self.emit(request_id, 'error', error=f"{type(e).__name__}: {e}"[:200])
+            raise
+
+    def _writer(self) -> None:
+        while True:
+            record = self._queue.get()
+            batch: List[Optional[Dict[str, Any]]] = [record]
+            # Drain whatever else is queued so bursts become one write
+            try:
+                while len(batch) < 1024:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            closing = None in batch
+            self._file.write(b''.join(_dumps(r) for r in batch if r is not None))
+            self._file.flush()
+            if closing:
+                return
+
+    def close(self) -> None:
+        """Flush queued events and close the file"""
+        if self._thread.is_alive():
+            self.emit(None, 'stream_end')
+            self._queue.put(None)
+            self._thread.join()
+        self._file.close()
+
+    def __enter__(self) -> 'EventStream':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class RequestEvents:
+    """Stage marks for a single request"""
+
+    def __init__(self, stream: Optional[EventStream], request_id: str):
+        self.stream = stream
+        self.request_id = request_id
+
+    def mark(self, stage: str, **fields: Any) -> None:
+        if self.stream is not None:
+            self.stream.emit(self.request_id, stage, **fields)
+
+
+class NullEventStream:
+    """Drop-in stand-in used when event logging is disabled"""
+    path = None
+    run_id = None
+
+    def emit(self, request_id: Optional[str], event: str, **fields: Any) -> None:
+        pass
+
+    @contextmanager
+    def request(self, request_id: str, **attrs: Any) -> Iterator[RequestEvents]:
+        yield RequestEvents(None, request_id)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'NullEventStream':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+def open_event_stream(path: Optional[str], **run_attrs: Any):
+    """Return an EventStream, or a NullEventStream if path is None"""
+    return EventStream(path, **run_attrs) if path else NullEventStream()
+
+
+def default_events_path(logs_dir: str) -> str:
+    """Per-session event file under <logs_dir>/events/"""
+    return os.path.join(logs_dir, 'events', f"events_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+
+def read_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream events back from a JSONL file (skips a torn final line)"""
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.endswith(b'\n'):
+                yield loads(line)
+
+
+def group_by_request(events: Iterator[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Collect each request's attributes and stage timestamps"""
+    requests: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        request_id = event.get('req')
+        if request_id is None:
+            continue
+        entry = requests.setdefault(request_id, {'marks': {}, 'attrs': {}})
+        entry['marks'][event['event']] = event['ts']
+        if event['event'] == 'request':
+            entry['attrs'] = {k: v for k, v in event.items() if k not in ('v', 'ts', 'run', 'req', 'event')}
+        elif event['event'] in ('complete', 'error'):
+            entry['attrs'].update({k: v for k, v in event.items()
+                                   if k not in ('v', 'ts', 'run', 'req', 'event')})
+    return requests
+
+
+def stage_latencies(requests: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per-request stage durations in seconds, for every span whose marks exist"""
+    latencies = {}
+    for request_id, entry in requests.items():
+        marks = entry['marks']
+        latencies[request_id] = {
+            name: (marks[end] - marks[start]) / 1e9
+            for name, (start, end) in STAGE_SPANS.items()
+            if start in marks and end in marks
+        }
+    return latencies
@@ -0,0 +1,154 @@
+"""
+Incremental review-page builds from cached HTML fragments
+
+The generators render one fragment per source group. FragmentCache keeps
+each fragment's HTML in .cache/fragments/<page>/ together with a signature
+of everything that fed it:
+
+  - inputs: the values the fragment is rendered from (result paths, which
+    results exist, their parsed metadata), hashed as canonical JSON
+  - files: sidecars the fragment reads directly, by mtime and size
+    (a missing file counts too, so one appearing triggers a rebuild)
+  - code: the generator's own source and the helpers it renders with, so
+    template edits rebuild everything
+
+A fragment whose signature is unchanged is read back instead of rendered.
+stream() copies it straight into the page being written (render() returns
+it instead), and a rebuilt one is staged on disk until save(), so a build
+holds one group's HTML at a time however many results there are. Page
+headers and stats are cheap and always rebuilt; the latency sections in
+them come from the histograms, which already only read appended log rows.
+Delete .cache/fragments/ to force a full rebuild.
+
+    fragments = FragmentCache.load('multiface_comparison', code_paths=[__file__])
+    fragments.stream(page.write, 'source_01', lambda: render_group(...), inputs=rows)
+    fragments.save()
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from .common import ensure_directory_exists, file_signature, get_project_root, write_json_atomic
+
+STATE_VERSION = 1
+
+
+def _code_hash(code_paths: Sequence[str], variant: str = '') -> str:
+    digest = hashlib.sha256(variant.encode('utf-8'))
+    for path in [*code_paths, __file__]:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class FragmentCache:
+    """Rendered HTML fragments of one page, reused while their inputs are unchanged"""
+
+    def __init__(self, cache_dir: str, code: str, signatures: Optional[Dict[str, str]] = None,
+                 stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature):
+        self.cache_dir = cache_dir
+        self.code = code
+        self.stat = stat
+        self.signatures: Dict[str, str] = signatures or {}
+        self.rendered: Dict[str, str] = {}
+        # Rebuilt fragments, staged beside their old copies until save()
+        self.written: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, re.sub(r'[^A-Za-z0-9_.-]', '_', key) + '.html')
+
+    def signature(self, inputs: Any = None, files: Iterable[str] = ()) -> str:
+        payload = json.dumps([self.code, inputs, [[path, self.stat(path)] for path in files]],
+                             sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _cached(self, key: str, inputs: Any, files: Iterable[str]):
+        """The fragment's open cache file if its signature matches, else None"""
+        signature = self.signature(inputs, files)
+        self.rendered[key] = signature
+        if self.signatures.get(key) == signature:
+            try:
+                return open(self._path(key), 'r')
+            except OSError:
+                pass
+        return None
+
+    def _build(self, key: str, build: Callable[[], str]) -> str:
+        html = build()
+        ensure_directory_exists(self.cache_dir)
+        with open(self._path(key) + '.new', 'w') as f:
+            f.write(html)
+        self.written.add(key)
+        self.misses += 1
+        return html
+
+    def render(self, key: str, build: Callable[[], str], inputs: Any = None, files: Iterable[str] = ()) -> str:
+        """A fragment's HTML: read back if its signature matches, else built and stored"""
+        cached = self._cached(key, inputs, files)
+        if cached is None:
+            return self._build(key, build)
+        with cached:
+            self.hits += 1
+            return cached.read()
+
+    def stream(self, write: Callable[[str], None], key: str, build: Callable[[], str], inputs: Any = None,
+               files: Iterable[str] = ()) -> None:
+        """Like render(), but passes the fragment to write in blocks instead of returning it"""
+        cached = self._cached(key, inputs, files)
+        if cached is None:
+            write(self._build(key, build))
+            return
+        with cached:
+            self.hits += 1
+            for block in iter(lambda: cached.read(1 << 16), ''):
+                write(block)
+
+    def save(self) -> None:
+        """Write rebuilt fragments and the manifest; drop fragments no longer rendered"""
+        ensure_directory_exists(self.cache_dir)
+        for key in self.written:
+            os.replace(self._path(key) + '.new', self._path(key))
+        for key in set(self.signatures) - set(self.rendered):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        write_json_atomic(os.path.join(self.cache_dir, 'manifest.json'),
+                          {'version': STATE_VERSION, 'code': self.code, 'signatures': self.rendered})
+        self.signatures, self.written = dict(self.rendered), set()
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        return f"reused {self.hits}/{total} fragments, rebuilt {self.misses}"
+
+    @classmethod
+    def load(cls, page: str, code_paths: Sequence[str] = (), cache_dir: Optional[str] = None,
+             stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature,
+             variant: str = '') -> 'FragmentCache':
+        """
+        Fragment cache for a page; starts empty if missing, or if the format or code changed
+
+        Pass a FileIndex's stat to share its once-per-pass file checks, and
+        a variant for anything else that changes the markup (such as which
+        thumbnail format is available).
+        """
+        cache_dir = cache_dir or os.path.join(default_cache_dir(), page)
+        code = _code_hash(code_paths, variant)
+        manifest_path = os.path.join(cache_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as f:
+                    manifest = json.load(f)
+            except ValueError:
+                manifest = {}
+            if manifest.get('version') == STATE_VERSION and manifest.get('code') == code:
+                return cls(cache_dir, code, manifest.get('signatures', {}), stat)
+        return cls(cache_dir, code, stat=stat)
+
+
+def default_cache_dir() -> str:
+    return os.path.join(get_project_root(), '.cache', 'fragments')
@@ -0,0 +1,294 @@
+"""
+Mergeable HDR-style latency histograms per endpoint, parameter set, card and session
+
+Latencies are recorded in whole milliseconds into log-linear buckets with a
+fixed number of significant digits (the HdrHistogram layout), so any
+percentile is accurate to 0.1% at 3 digits and two histograms merge by
+adding bucket counts. Buckets are stored sparsely, which keeps the saved
+state small even with multi-minute 504 tails.
+
+LatencyHistograms keeps one histogram per (dimension, key) and, like the
+error taxonomy, remembers byte offsets so each update only reads rows
+appended to the request logs since the previous run.
+"""
+import json
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .common import get_project_root, write_json_atomic
+from .request_logs import find_request_logs, iter_request_rows_from, parse_float
+
+STATE_VERSION = 1
+
+DIMENSIONS = ['endpoint', 'params', 'card', 'session']
+
+REPORT_PERCENTILES = (50, 90, 99)
+
+
+class LatencyHistogram:
+    """Log-linear histogram of millisecond latencies"""
+
+    def __init__(self, significant_digits: int = 3):
+        self.significant_digits = significant_digits
+        # Smallest power of two that resolves 2 * 10^digits distinct values
+        sub_bucket_count = 2 ** math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._half_magnitude = int(math.log2(sub_bucket_count)) - 1
+        self._half_count = sub_bucket_count // 2
+        self._mask = sub_bucket_count - 1
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.min_ms: Optional[int] = None
+        self.max_ms: Optional[int] = None
+        self.sum_ms = 0
+
+    def _index(self, value: int) -> int:
+        bucket = (value | self._mask).bit_length() - (self._half_magnitude + 1)
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self._half_magnitude) + sub_bucket - self._half_count
+
+    def _highest_equivalent(self, index: int) -> int:
+        bucket = (index >> self._half_magnitude) - 1
+        sub_bucket = (index & (self._half_count - 1)) + self._half_count
+        if bucket < 0:
+            sub_bucket -= self._half_count
+            bucket = 0
+        return (sub_bucket << bucket) + (1 << bucket) - 1
+
+    def record(self, seconds: float, count: int = 1) -> None:
+        value = max(0, int(round(seconds * 1000)))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum_ms += value * count
+        self.min_ms = value if self.min_ms is None else min(self.min_ms, value)
+        self.max_ms = value if self.max_ms is None else max(self.max_ms, value)
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Add another histogram's counts into this one"""
+        if other.significant_digits != self.significant_digits:
+            raise ValueError('Cannot merge histograms with different precision')
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_ms += other.sum_ms
+        if other.min_ms is not None:
+            self.min_ms = other.min_ms if self.min_ms is None else min(self.min_ms, other.min_ms)
+            self.max_ms = other.max_ms if self.max_ms is None else max(self.max_ms, other.max_ms)
+        return self
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Latency in seconds at percentile p (0-100), or None if empty"""
+        if not self.total:
+            return None
+        target = max(1, math.ceil(p / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_ms) / 1000
+        return self.max_ms / 1000
+
+    def count_above(self, seconds: float) -> int:
+        """Values recorded above a threshold (to the histogram's precision)"""
+        index = self._index(max(0, int(round(seconds * 1000))))
+        return sum(count for bucket, count in self.counts.items() if bucket > index)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum_ms / self.total / 1000 if self.total else None
+
+    def summary(self, percentiles: Iterable[float] = REPORT_PERCENTILES) -> Dict[str, Any]:
+        """Count, mean, requested percentiles and max in seconds"""
+        result: Dict[str, Any] = {'count': self.total, 'mean': self.mean}
+        for p in percentiles:
+            result[f'p{p:g}'] = self.percentile(p)
+        result['max'] = self.max_ms / 1000 if self.max_ms is not None else None
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'digits': self.significant_digits,
+            'total': self.total,
+            'sum_ms': self.sum_ms,
+            'min_ms': self.min_ms,
+            'max_ms': self.max_ms,
+            'counts': {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        histogram = cls(data.get('digits', 3))
+        histogram.counts = {int(index): count for index, count in data.get('counts', {}).items()}
+        histogram.total = data.get('total', 0)
+        histogram.sum_ms = data.get('sum_ms', 0)
+        histogram.min_ms = data.get('min_ms')
+        histogram.max_ms = data.get('max_ms')
+        return histogram
+
+
+def row_dimensions(row: Dict[str, str]) -> Dict[str, str]:
+    """Histogram keys for one normalised log row"""
+    endpoint = row.get('api_version') or 'unknown'
+    params = '/'.join(part for part in (
+        row.get('model_type'), row.get('swap_type'), row.get('hardware_type'),
+        row.get('face_detection_strategy') or row.get('test_type'),
+    ) if part) or 'default'
+    card = row.get('card_id') or os.path.splitext(row.get('target_image') or '')[0] or 'unknown'
+    # The Thortful log has no session column (and some older Segmind rows are
+    # ragged); fall back to the calendar day, the closest equivalent
+    session = row.get('session_start_time') or ''
+    if session[4:5] != '-':
+        session = (row.get('timestamp') or '')[:10] or 'unknown'
+    return {
+        'endpoint': endpoint,
+        'params': f"{endpoint}|{params}",
+        'card': f"{endpoint}|{card}",
+        'session': f"{endpoint}|{session}",
+    }
+
+
+class LatencyHistograms:
+    """Histograms of request_duration_seconds keyed by dimension and value"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {
+            dimension: {key: LatencyHistogram.from_dict(data)
+                        for key, data in state.get('histograms', {}).get(dimension, {}).items()}
+            for dimension in DIMENSIONS
+        }
+        self.offsets: Dict[str, int] = state.get('offsets', {})
+        self.rows_seen: int = state.get('rows_seen', 0)
+
+    def add(self, row: Dict[str, str]) -> None:
+        """Record one log row; rows without a duration are only counted"""
+        self.rows_seen += 1
+        seconds = parse_float(row.get('request_duration_seconds'))
+        if seconds is None:
+            return
+        for dimension, key in row_dimensions(row).items():
+            histogram = self.histograms[dimension].get(key)
+            if histogram is None:
+                histogram = self.histograms[dimension][key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def update_from_csv(self, csv_path: str) -> int:
+        """Consume rows appended to a request log since the last update"""
+        offset = self.offsets.get(csv_path, 0)
+        if os.path.getsize(csv_path) < offset:
+            offset = 0  # file was rewritten; start over
+        added = 0
+        for row, end_offset in iter_request_rows_from(csv_path, offset):
+            self.add(row)
+            self.offsets[csv_path] = end_offset
+            added += 1
+        return added
+
+    def update(self, csv_paths: Optional[List[str]] = None) -> int:
+        """Incrementally consume every request log"""
+        return sum(self.update_from_csv(path)
+                   for path in (csv_paths if csv_paths is not None else find_request_logs()))
+
+    def get(self, dimension: str, key: str) -> Optional[LatencyHistogram]:
+        return self.histograms[dimension].get(key)
+
+    def merged(self, dimension: str, keys: Optional[Iterable[str]] = None) -> LatencyHistogram:
+        """Merge several histograms of one dimension (all of them by default)"""
+        result = LatencyHistogram()
+        for key, histogram in self.histograms[dimension].items():
+            if keys is None or key in keys:
+                result.merge(histogram)
+        return result
+
+    def by_card(self) -> Dict[str, LatencyHistogram]:
+        """Card histograms merged across endpoints"""
+        cards: Dict[str, LatencyHistogram] = {}
+        for key, histogram in self.histograms['card'].items():
+            card = key.split('|', 1)[1]
+            cards.setdefault(card, LatencyHistogram()).merge(histogram)
+        return cards
+
+    def table(self, dimension: str,
+              percentiles: Iterable[float] = REPORT_PERCENTILES) -> List[Tuple[str, Dict[str, Any]]]:
+        """(key, summary) rows for a dimension, slowest p99 first"""
+        percentiles = tuple(percentiles)
+        rows = [(key, histogram.summary(percentiles))
+                for key, histogram in self.histograms[dimension].items()]
+        tail = f'p{max(percentiles):g}' if percentiles else 'max'
+        return sorted(rows, key=lambda item: (-(item[1][tail] or 0), item[0]))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'updated': datetime.now().isoformat(),
+            'rows_seen': self.rows_seen,
+            'offsets': self.offsets,
+            'histograms': {dimension: {key: histogram.to_dict() for key, histogram in sorted(keys.items())}
+                           for dimension, keys in self.histograms.items()},
+        }
+
+    def save(self, state_path: str) -> None:
+        """Write state atomically so an interrupted run never corrupts it"""
+        write_json_atomic(state_path, self.to_state())
+
+    @classmethod
+    def load(cls, state_path: str) -> 'LatencyHistograms':
+        """Load saved state, or start empty if none exists or the format changed"""
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return cls(state)
+        return cls()
+
+
+def default_state_path() -> str:
+    return os.path.join(get_project_root(), '.cache', 'latency_histograms.json')
+
+
+def load_latency_histograms(state_path: Optional[str] = None) -> LatencyHistograms:
+    """Load saved histograms, fold in new log rows and save them back"""
+    state_path = state_path or default_state_path()
+    histograms = LatencyHistograms.load(state_path)
+    if histograms.update():
+        histograms.save(state_path)
+    return histograms
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return '–' if value is None else f"{value:.1f}s"
+
+
+def percentile_table_html(rows: List[Tuple[str, Dict[str, Any]]], title: str = 'Latency percentiles') -> str:
+    """Render (label, summary) rows as a small HTML table for the review pages"""
+    if not rows:
+        return ''
+    columns = [key for key in rows[0][1] if key != 'count']
+    header = ''.join(f'<th>{column}</th>' for column in ['', 'n'] + columns)
+    body = ''.join(
+        f"<tr><td>{label}</td><td>{summary['count']}</td>"
+        + ''.join(f'<td>{_format_seconds(summary[column])}</td>' for column in columns)
+        + '</tr>'
+        for label, summary in rows
+    )
+    return f"""
+        <div class="latency-percentiles">
+            <h3>{title}</h3>
+            <table>
+                <thead><tr>{header}</tr></thead>
+                <tbody>{body}</tbody>
+            </table>
+        </div>"""
+
+
+def latency_section_html(histograms: LatencyHistograms, endpoints: Iterable[str], card_limit: int = 10) -> str:
+    """Endpoint percentiles plus the cards with the worst tail, for a review page"""
+    endpoints = list(endpoints)
+    endpoint_rows = [(endpoint, histograms.get('endpoint', endpoint).summary())
+                     for endpoint in endpoints if histograms.get('endpoint', endpoint)]
+    card_rows = [(key.replace('|', ' · '), summary) for key, summary in histograms.table('card')
+                 if key.split('|', 1)[0] in endpoints][:card_limit]
+    return (percentile_table_html(endpoint_rows, 'Request latency (all logged runs)')
+            + percentile_table_html(card_rows, f'Slowest {card_limit} target templates by p99'))
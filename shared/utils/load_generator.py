@@ -0,0 +1,198 @@
+"""
+Open-loop load generation for the face swap endpoints
+
+Requests are issued on a precomputed arrival schedule (Poisson or fixed
+rate) whether or not earlier requests have finished, so a slow endpoint
+sees the queue build up the way it would under real traffic. Latency is
+measured from each request's scheduled arrival time rather than from when
+a thread got round to sending it, so client-side lag is not hidden
+(coordinated omission).
+
+A ramp runs one step per offered rate and reports latency percentiles,
+error rate and 504 rate per step; find_knee() picks the first offered load
+at which 504s appear.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from .latency_histogram import LatencyHistogram
+
+# send() returns (HTTP status or 0 for a client-side failure, error text)
+Sender = Callable[[], Tuple[int, str]]
+
+ARRIVAL_PROCESSES = ['poisson', 'fixed']
+
+
+def arrival_offsets(rate: float, duration: float, process: str = 'poisson',
+                    rng: Optional[random.Random] = None) -> List[float]:
+    """Arrival times in seconds from the start of a step"""
+    if rate <= 0:
+        return []
+    rng = rng or random.Random()
+    offsets = []
+    t = 0.0 if process == 'fixed' else rng.expovariate(rate)
+    while t < duration:
+        offsets.append(t)
+        t += 1.0 / rate if process == 'fixed' else rng.expovariate(rate)
+    return offsets
+
+
+def make_sender(url: str, payload_factory: Callable[[], Dict[str, Any]],
+                headers: Optional[Dict[str, str]] = None, timeout: float = 150.0,
+                session: Optional[requests.Session] = None) -> Sender:
+    """Build a send() that POSTs one payload and reports (status, error)"""
+    session = session or requests.Session()
+    # The default pool keeps 10 connections; open-loop bursts need more
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=256)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    def send() -> Tuple[int, str]:
+        try:
+            response = session.post(url, json=payload_factory(), headers=headers, timeout=timeout)
+        except requests.exceptions.Timeout:
+            return 0, 'client_timeout'
+        except requests.exceptions.RequestException as e:
+            return 0, f"{type(e).__name__}: {e}"[:200]
+        if response.status_code == 200:
+            return 200, ''
+        return response.status_code, response.text[:200]
+
+    return send
+
+
+@dataclass
+class StepReport:
+    """Outcome of one offered-load step"""
+    offered_rate: float
+    duration: float
+    scheduled: int = 0
+    completed: int = 0
+    ok: int = 0
+    gateway_timeouts: int = 0
+    client_timeouts: int = 0
+    other_errors: int = 0
+    dropped: int = 0
+    max_lag: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    ok_latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def error_rate(self) -> float:
+        return (self.completed - self.ok) / self.completed if self.completed else 0.0
+
+    @property
+    def gateway_timeout_rate(self) -> float:
+        return self.gateway_timeouts / self.completed if self.completed else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Successful responses per second of step time"""
+        return self.ok / self.duration if self.duration else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'offered_rate': self.offered_rate,
+            'duration': self.duration,
+            'scheduled': self.scheduled,
+            'completed': self.completed,
+            'ok': self.ok,
+            'gateway_timeouts': self.gateway_timeouts,
+            'client_timeouts': self.client_timeouts,
+            'other_errors': self.other_errors,
+            'dropped': self.dropped,
+            'error_rate': round(self.error_rate, 4),
+            'gateway_timeout_rate': round(self.gateway_timeout_rate, 4),
+            'throughput': round(self.throughput, 4),
+            'max_send_lag': round(self.max_lag, 4),
+            'latency': self.latency.summary(),
+            'ok_latency': self.ok_latency.summary(),
+        }
+
+
+class OpenLoopRunner:
+    """Fire requests on an arrival schedule, independent of completions"""
+
+    def __init__(self, send: Sender, max_in_flight: int = 256, seed: Optional[int] = None):
+        self.send = send
+        self.max_in_flight = max_in_flight
+        self.rng = random.Random(seed)
+
+    def run_step(self, rate: float, duration: float, process: str = 'poisson') -> StepReport:
+        """Offer `rate` requests/second for `duration` seconds and wait for all responses"""
+        report = StepReport(offered_rate=rate, duration=duration)
+        lock = threading.Lock()
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+        def fire(scheduled_at: float) -> None:
+            try:
+                status, error = self.send()
+            finally:
+                in_flight.release()
+            latency = time.monotonic() - scheduled_at
+            with lock:
+                report.completed += 1
+                report.latency.record(latency)
+                if status == 200:
+                    report.ok += 1
+                    report.ok_latency.record(latency)
+                elif status == 504:
+                    report.gateway_timeouts += 1
+                elif error == 'client_timeout':
+                    report.client_timeouts += 1
+                else:
+                    report.other_errors += 1
+
+        offsets = arrival_offsets(rate, duration, process, self.rng)
+        report.scheduled = len(offsets)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='load') as pool:
+            start = time.monotonic()
+            for offset in offsets:
+                scheduled_at = start + offset
+                delay = scheduled_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                report.max_lag = max(report.max_lag, time.monotonic() - scheduled_at)
+                # Never wait for a slot: that would close the loop
+                if not in_flight.acquire(blocking=False):
+                    report.dropped += 1
+                    continue
+                pool.submit(fire, scheduled_at)
+        return report
+
+    def run_ramp(self, rates: List[float], step_duration: float, process: str = 'poisson',
+                 on_step: Optional[Callable[[StepReport], None]] = None) -> List[StepReport]:
+        """Run one step per offered rate, in order"""
+        steps = []
+        for rate in rates:
+            step = self.run_step(rate, step_duration, process)
+            steps.append(step)
+            if on_step:
+                on_step(step)
+        return steps
+
+
+def find_knee(steps: List[StepReport], threshold: float = 0.01) -> Optional[StepReport]:
+    """First step whose 504 rate exceeds threshold, or None if 504s never appear"""
+    for step in steps:
+        if step.completed and step.gateway_timeout_rate > threshold:
+            return step
+    return None
+
+
+def find_latency_knee(steps: List[StepReport], factor: float = 2.0) -> Optional[StepReport]:
+    """First step whose successful p50 exceeds factor x the lowest-load step's p50"""
+    baseline = next((step.ok_latency.percentile(50) for step in steps if step.ok), None)
+    if baseline is None:
+        return None
+    for step in steps:
+        p50 = step.ok_latency.percentile(50)
+        if p50 is not None and p50 > factor * baseline:
+            return step
+    return None
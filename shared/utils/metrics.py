@@ -0,0 +1,222 @@
+"""
+Live run metrics in the Prometheus / OpenMetrics text format
+
+The runners start a small HTTP endpoint (opt-in, --metrics-port) and update
+counters as requests complete, so a local Prometheus or a plain curl can
+watch a long batch without tailing the CSV logs:
+
+    curl -s localhost:9464/metrics
+
+Exposed series (all labelled by api_version):
+    faceswap_requests_in_flight            gauge
+    faceswap_requests_total{outcome}       counter
+    faceswap_errors_total{error_type}      counter
+    faceswap_request_duration_seconds      histogram
+    faceswap_credits_remaining             gauge
+    faceswap_queue_depth                   gauge (tests left in the batch)
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .error_taxonomy import fingerprint_error
+
+# Seconds; the swap endpoints take 5-120s and the gateways give up at 60-180s
+DURATION_BUCKETS = (1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0)
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class RunMetrics:
+    """Thread-safe counters, gauges and duration histograms for one run"""
+
+    def __init__(self, runner: str):
+        self.runner = runner
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.in_flight: Dict[Labels, int] = {}
+        self.requests: Dict[Labels, int] = {}
+        self.errors: Dict[Labels, int] = {}
+        self.credits: Dict[Labels, float] = {}
+        self.queue_depth: Dict[Labels, int] = {}
+        # api_version labels -> [bucket counts..., +Inf count], sum
+        self.durations: Dict[Labels, Tuple[List[int], float]] = {}
+
+    @contextmanager
+    def tracking(self, api_version: str) -> Iterator[None]:
+        """Count a request as in flight for the duration of the block"""
+        key = _labels(api_version=api_version)
+        with self._lock:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight[key] -= 1
+
+    def observe(self, api_version: str, seconds: Optional[float], success: bool,
+                error_message: str = '') -> None:
+        """Record a finished request"""
+        outcome = 'success' if success else 'error'
+        with self._lock:
+            key = _labels(api_version=api_version, outcome=outcome)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if not success:
+                error_type = fingerprint_error(error_message)[1] or 'unknown'
+                key = _labels(api_version=api_version, error_type=error_type)
+                self.errors[key] = self.errors.get(key, 0) + 1
+            if seconds is not None:
+                key = _labels(api_version=api_version)
+                counts, total = self.durations.get(key) or ([0] * (len(DURATION_BUCKETS) + 1), 0.0)
+                counts[bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+                self.durations[key] = (counts, total + seconds)
+
+    def set_credits(self, api_version: str, credits: Any) -> None:
+        try:
+            value = float(credits)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self.credits[_labels(api_version=api_version)] = value
+
+    def set_queue_depth(self, api_version: str, depth: int) -> None:
+        with self._lock:
+            self.queue_depth[_labels(api_version=api_version)] = depth
+
+    def render(self, openmetrics: bool = False) -> str:
+        """Exposition text; OpenMetrics names counter families without _total"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            family_name = name[:-len('_total')] if openmetrics and kind == 'counter' else name
+            lines.append(f"# HELP {family_name} {help_text}")
+            lines.append(f"# TYPE {family_name} {kind}")
+
+        def samples(name: str, values: Dict[Labels, float]) -> None:
+            for labels, value in sorted(values.items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        with self._lock:
+            family('faceswap_run_start_time_seconds', 'gauge', 'Unix time the run started')
+            lines.append(f"faceswap_run_start_time_seconds{_format_labels(_labels(runner=self.runner))} "
+                         f"{self.started:.3f}")
+            family('faceswap_requests_in_flight', 'gauge', 'Swap requests currently in flight')
+            samples('faceswap_requests_in_flight', self.in_flight)
+            family('faceswap_requests_total', 'counter', 'Completed swap requests by outcome')
+            samples('faceswap_requests_total', self.requests)
+            family('faceswap_errors_total', 'counter', 'Failed swap requests by error type')
+            samples('faceswap_errors_total', self.errors)
+            family('faceswap_request_duration_seconds', 'histogram', 'End-to-end swap request duration')
+            for labels, (counts, total) in sorted(self.durations.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f"faceswap_request_duration_seconds_bucket"
+                                 f"{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"faceswap_request_duration_seconds_count{_format_labels(labels)} {cumulative}")
+                lines.append(f"faceswap_request_duration_seconds_sum{_format_labels(labels)} {total:.3f}")
+            family('faceswap_credits_remaining', 'gauge', 'Credits remaining as reported by the API')
+            samples('faceswap_credits_remaining', self.credits)
+            family('faceswap_queue_depth', 'gauge', 'Tests left to run in this batch')
+            samples('faceswap_queue_depth', self.queue_depth)
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class NullMetrics:
+    """Drop-in stand-in used when no metrics port is configured"""
+    port = None
+
+    @contextmanager
+    def tracking(self, api_version: str) -> Iterator[None]:
+        yield
+
+    def observe(self, api_version: str, seconds: Optional[float], success: bool,
+                error_message: str = '') -> None:
+        pass
+
+    def set_credits(self, api_version: str, credits: Any) -> None:
+        pass
+
+    def set_queue_depth(self, api_version: str, depth: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MetricsServer(RunMetrics):
+    """RunMetrics served on http://<host>:<port>/metrics from a daemon thread"""
+
+    def __init__(self, runner: str, port: int, host: str = '127.0.0.1'):
+        super().__init__(runner)
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+                body = metrics.render(openmetrics).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def start_metrics(port: Optional[int], runner: str):
+    """Return a served MetricsServer, or NullMetrics if port is None"""
+    if port is None:
+        return NullMetrics()
+    metrics = MetricsServer(runner, port)
+    print(f"📈 Metrics at http://127.0.0.1:{metrics.port}/metrics")
+    return metrics
+
+
+def pop_metrics_port(argv: List[str]) -> Tuple[List[str], Optional[int]]:
+    """Strip '--metrics-port N' from argv, returning (argv, port or None)"""
+    if '--metrics-port' not in argv:
+        return argv, None
+    index = argv.index('--metrics-port')
+    if index + 1 >= len(argv) or not argv[index + 1].isdigit():
+        raise SystemExit("--metrics-port needs a port number")
+    return argv[:index] + argv[index + 2:], int(argv[index + 1])
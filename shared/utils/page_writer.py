@@ -0,0 +1,80 @@
+"""
+Streaming output for the review pages, and their shared static assets
+
+The generators used to build each page as one string (the head f-string,
+then every source group concatenated onto it) and write it at the end, so
+a 10k-result page held its whole 35-65 MB of HTML in memory at least once
+over. A PageWriter writes the page out chunk by chunk as it is rendered:
+the head, each source group as it comes from the fragment cache
+(FragmentCache.stream), then the footer. The page goes to a temporary
+file that replaces the old one only once it is complete, so a failed
+build never leaves half a page behind.
+
+Stylesheets and scripts live in shared/assets/ instead of being inlined
+into every page. publish_asset() copies one next to the pages (assets/)
+when its content changed and returns a URL carrying its content hash, so
+browsers cache it across pages and rebuilds and refetch only after an
+edit.
+
+    with PageWriter('multiface_comparison.html') as page:
+        page.write(head_html)
+        for key in groups:
+            fragments.stream(page.write, key, lambda: render_group(...), inputs=rows)
+        page.write(footer_html)
+"""
+import hashlib
+import os
+from .common import ensure_directory_exists
+
+ASSET_DIR = 'assets'
+ASSET_SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+
+# Large enough that a page is written in a few hundred system calls, not one per source group
+BUFFER_SIZE = 1 << 20
+
+
+class PageWriter:
+    """A page written chunk by chunk, swapped into place atomically when complete"""
+
+    def __init__(self, path: str, buffer_size: int = BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.size = 0
+        self._file = None
+
+    def __enter__(self) -> 'PageWriter':
+        self._file = open(self.path + '.tmp', 'w', buffering=self.buffer_size)
+        return self
+
+    def write(self, chunk: str) -> None:
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.path + '.tmp', self.path)
+        else:
+            os.remove(self.path + '.tmp')
+
+
+def publish_asset(name: str, asset_dir: str = ASSET_DIR) -> str:
+    """
+    Copy shared/assets/<name> into the pages' assets/ if it differs; returns its versioned URL
+
+    The URL is relative to the pages, like the thumbnail and sprite paths.
+    """
+    with open(os.path.join(ASSET_SOURCE_DIR, name), 'rb') as f:
+        content = f.read()
+    out_path = os.path.join(asset_dir, name)
+    try:
+        with open(out_path, 'rb') as f:
+            current = f.read()
+    except OSError:
+        current = None
+    if current != content:
+        ensure_directory_exists(asset_dir)
+        with open(out_path + '.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(out_path + '.tmp', out_path)
+    return f"{asset_dir}/{name}?v={hashlib.sha256(content).hexdigest()[:12]}"
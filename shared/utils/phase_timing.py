@@ -0,0 +1,220 @@
+"""
+Per-request phase timing through urllib3 transport hooks
+
+A requests Session built by timed_session() uses connection classes that
+record when DNS resolution, TCP connect, TLS handshake, request upload and
+the first response byte finish. Callers add the body download and local
+decode/write marks themselves:
+
+    session = timed_session()
+    with phase_timer() as timer:
+        response = session.post(url, json=payload, timeout=120, stream=True)
+        body = response.content
+        timer.mark('body_end')
+        ...decode and write...
+        timer.mark('write_end')
+    timer.phases()  # {'dns': ..., 'connect': ..., 'tls': ..., 'upload': ..., ...}
+
+Reused keep-alive connections report zero DNS/connect/TLS time.
+"""
+import csv
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .cassette import cassette_from_env, install_cassette
+
+PHASES = ['dns', 'connect', 'tls', 'upload', 'ttfb', 'download', 'write']
+
+PHASE_COLUMNS = [f'phase_{name}_seconds' for name in PHASES]
+
+_local = threading.local()
+
+
+class PhaseTimer:
+    """perf_counter marks for one request attempt"""
+
+    def __init__(self):
+        self.marks: Dict[str, float] = {'start': time.perf_counter()}
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = time.perf_counter()
+
+    def add(self, name: str, seconds: float) -> None:
+        """Accumulate a duration measured inside the transport"""
+        self.marks[name] = self.marks.get(name, 0.0) + seconds
+
+    def phases(self) -> Dict[str, float]:
+        """Phase durations in seconds (0.0 for phases that did not happen)"""
+        marks = self.marks
+        result = {name: 0.0 for name in PHASES}
+        for name in ('dns', 'connect', 'tls'):
+            result[name] = marks.get(f'{name}_seconds', 0.0)
+        if 'request_sent' in marks and 'request_start' in marks:
+            # A lazily opened plain-HTTP connection is established inside request()
+            lazy_connect = marks.get('connect_in_request_seconds', 0.0)
+            result['upload'] = max(0.0, marks['request_sent'] - marks['request_start'] - lazy_connect)
+        if 'first_byte' in marks and 'request_sent' in marks:
+            result['ttfb'] = marks['first_byte'] - marks['request_sent']
+        if 'body_end' in marks and 'first_byte' in marks:
+            result['download'] = marks['body_end'] - marks['first_byte']
+        if 'write_end' in marks and 'body_end' in marks:
+            result['write'] = marks['write_end'] - marks['body_end']
+        return result
+
+    def row(self) -> Dict[str, str]:
+        """Phase durations formatted as log columns"""
+        return {f'phase_{name}_seconds': f"{seconds:.4f}" for name, seconds in self.phases().items()}
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def phase_timer() -> Iterator[PhaseTimer]:
+    """Collect transport phase marks for requests made in this thread"""
+    timer = PhaseTimer()
+    previous = current_timer()
+    _local.timer = timer
+    try:
+        yield timer
+    finally:
+        _local.timer = previous
+
+
+class _TimedConnectionMixin:
+    """Records DNS/connect/TLS/upload/first-byte marks on the active PhaseTimer"""
+
+    def _new_conn(self):
+        timer = current_timer()
+        if timer is None:
+            return super()._new_conn()
+
+        start = time.perf_counter()
+        infos = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        timer.add('dns_seconds', resolved - start)
+
+        # Connect to the resolved address so the lookup is not repeated;
+        # TLS SNI and certificate checks still use self.host
+        original_host = self._dns_host
+        self._dns_host = infos[0][4][0]
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = original_host
+        connect_seconds = time.perf_counter() - resolved
+        timer.add('connect_seconds', connect_seconds)
+        if getattr(self, '_in_request', False):
+            timer.add('connect_in_request_seconds', connect_seconds + (resolved - start))
+        return sock
+
+    def connect(self):
+        timer = current_timer()
+        if timer is None:
+            return super().connect()
+        before = timer.marks.get('dns_seconds', 0.0) + timer.marks.get('connect_seconds', 0.0)
+        start = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - start
+        after = timer.marks.get('dns_seconds', 0.0) + timer.marks.get('connect_seconds', 0.0)
+        if isinstance(self, HTTPSConnection):
+            timer.add('tls_seconds', max(0.0, elapsed - (after - before)))
+
+    def request(self, *args, **kwargs):
+        timer = current_timer()
+        if timer is None:
+            return super().request(*args, **kwargs)
+        timer.mark('request_start')
+        self._in_request = True
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            self._in_request = False
+            timer.mark('request_sent')
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timer = current_timer()
+        if timer is not None:
+            timer.mark('first_byte')
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class PhaseTimingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools use the timed connection classes"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+def timed_session() -> requests.Session:
+    """
+    requests.Session with phase timing hooks on http:// and https://
+
+    When FACESWAP_CASSETTE is set the session also records to, or replays
+    from, a cassette (see cassette.py).
+    """
+    session = requests.Session()
+    adapter = PhaseTimingAdapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    cassette = cassette_from_env()
+    if cassette:
+        install_cassette(session, *cassette)
+    return session
+
+
+def phases_log_path(log_file: str) -> str:
+    """Sidecar CSV holding phase timings for a request log"""
+    root, _ = os.path.splitext(str(log_file))
+    return f"{root}_phases.csv"
+
+
+def log_phase_timings(log_file: str, key_fields: Dict[str, str], timer: PhaseTimer,
+                      generation_seconds: Optional[str] = '') -> None:
+    """
+    Append one row of phase timings next to a request log row
+
+    key_fields identifies the log row (request_id or the row's timestamp)
+    and should include api_version so reports can group by endpoint.
+    """
+    path = phases_log_path(log_file)
+    row = dict(key_fields)
+    row.update(timer.row())
+    row['server_generation_seconds'] = generation_seconds or ''
+    write_header = not os.path.exists(path)
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+        if write_header:
+            writer.writeheader()
+        writer.writerow(row)
@@ -0,0 +1,309 @@
+"""
+Latency and success-rate regression detection across test sessions
+
+Rows are grouped per endpoint and parameter set (the latency_histogram
+'params' key) and per session. The current session of each group is
+compared against the pooled previous N sessions:
+  - latency of successful requests with a one-sided Mann-Whitney U test
+    (is the current session stochastically slower?), plus the one-sided
+    two-sample Kolmogorov-Smirnov D+ as a shape check
+  - success rate with a one-sided two-proportion z-test
+
+p-values are Holm-adjusted across every test in the report, and a
+difference is only flagged if it is also large enough to matter
+(min_slowdown on the median, min_success_drop on the success rate).
+Normal approximations are used throughout, so tiny sessions are skipped.
+"""
+import json
+import math
+import os
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .common import ensure_directory_exists
+from .latency_histogram import row_dimensions
+from .request_logs import iter_all_request_rows, parse_bool, parse_float
+
+
+def _rank_sum(current: Sequence[float], baseline: Sequence[float]) -> Tuple[float, float]:
+    """Rank sum of current within the pooled sample, and the tie term sum(t^3 - t)"""
+    pooled = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+    rank_sum = 0.0
+    ties = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum += average_rank * sum(1 for _, group in pooled[i:j + 1] if group == 0)
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    return rank_sum, ties
+
+
+def mann_whitney_greater(current: Sequence[float], baseline: Sequence[float]) -> Tuple[float, float]:
+    """U statistic and one-sided p-value that current values tend to be larger"""
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 0.0, 1.0
+    rank_sum, ties = _rank_sum(current, baseline)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def ks_greater(current: Sequence[float], baseline: Sequence[float]) -> Tuple[float, float]:
+    """One-sided two-sample KS: D+ = max(F_baseline - F_current) and its asymptotic p-value"""
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 0.0, 1.0
+    current, baseline = sorted(current), sorted(baseline)
+    i = j = 0
+    d = 0.0
+    while i < n1 and j < n2:
+        value = min(current[i], baseline[j])
+        while i < n1 and current[i] == value:
+            i += 1
+        while j < n2 and baseline[j] == value:
+            j += 1
+        d = max(d, j / n2 - i / n1)
+    effective_n = n1 * n2 / (n1 + n2)
+    return d, min(1.0, math.exp(-2 * effective_n * d * d))
+
+
+def proportion_lower(successes: int, total: int, baseline_successes: int,
+                     baseline_total: int) -> float:
+    """One-sided two-proportion z-test p-value that the current success rate is lower"""
+    if not total or not baseline_total:
+        return 1.0
+    pooled = (successes + baseline_successes) / (total + baseline_total)
+    variance = pooled * (1 - pooled) * (1 / total + 1 / baseline_total)
+    if variance <= 0:
+        return 1.0
+    z = (successes / total - baseline_successes / baseline_total) / math.sqrt(variance)
+    return 0.5 * math.erfc(-z / math.sqrt(2))
+
+
+def holm_adjust(p_values: List[float]) -> List[float]:
+    """Holm-Bonferroni adjusted p-values, in the input order"""
+    order = sorted(range(len(p_values)), key=lambda index: p_values[index])
+    adjusted = [1.0] * len(p_values)
+    running = 0.0
+    for rank, index in enumerate(order):
+        running = max(running, min(1.0, (len(p_values) - rank) * p_values[index]))
+        adjusted[index] = running
+    return adjusted
+
+
+def _median(values: Sequence[float]) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+@dataclass
+class SessionSample:
+    """Requests of one endpoint/parameter set within one session"""
+    durations: List[float] = field(default_factory=list)
+    successes: int = 0
+    requests: int = 0
+
+    def extend(self, other: 'SessionSample') -> None:
+        self.durations.extend(other.durations)
+        self.successes += other.successes
+        self.requests += other.requests
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        return self.successes / self.requests if self.requests else None
+
+
+@dataclass
+class SessionComparison:
+    """Current session of one endpoint/parameter set against its rolling baseline"""
+    group: str
+    session: str
+    baseline_sessions: List[str]
+    current_n: int
+    baseline_n: int
+    current_median: Optional[float]
+    baseline_median: Optional[float]
+    current_success_rate: Optional[float]
+    baseline_success_rate: Optional[float]
+    current_requests: int
+    baseline_requests: int
+    latency_p: Optional[float] = None
+    ks_d: Optional[float] = None
+    ks_p: Optional[float] = None
+    success_p: Optional[float] = None
+    latency_regression: bool = False
+    success_regression: bool = False
+
+    @property
+    def endpoint(self) -> str:
+        return self.group.split('|', 1)[0]
+
+    @property
+    def slowdown(self) -> Optional[float]:
+        """Relative change of the successful median, e.g. 0.25 for 25% slower"""
+        if not self.current_median or not self.baseline_median:
+            return None
+        return self.current_median / self.baseline_median - 1
+
+    @property
+    def is_regression(self) -> bool:
+        return self.latency_regression or self.success_regression
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(asdict(self), endpoint=self.endpoint, slowdown=self.slowdown)
+
+
+def collect_sessions(paths: Optional[List[str]] = None) -> Dict[str, Dict[str, SessionSample]]:
+    """
+    Per params group and session, successful durations and success counts
+
+    Ragged rows are skipped: their params and session_start_time come from
+    the wrong columns, so each would form a group of its own.
+    """
+    groups: Dict[str, Dict[str, SessionSample]] = defaultdict(lambda: defaultdict(SessionSample))
+    for row in iter_all_request_rows(paths, skip_ragged=True):
+        success = parse_bool(row.get('success'))
+        if success is None:
+            continue
+        dimensions = row_dimensions(row)
+        session = dimensions['session'].split('|', 1)[1]
+        sample = groups[dimensions['params']][session]
+        sample.requests += 1
+        if success:
+            sample.successes += 1
+            seconds = parse_float(row.get('request_duration_seconds'))
+            if seconds is not None:
+                sample.durations.append(seconds)
+    return groups
+
+
+def detect_regressions(paths: Optional[List[str]] = None, session: Optional[str] = None,
+                       baseline_sessions: int = 5, alpha: float = 0.01, min_slowdown: float = 0.10,
+                       min_success_drop: float = 0.05, min_samples: int = 5,
+                       min_baseline: int = 20) -> List[SessionComparison]:
+    """
+    Compare each group's current session with its previous sessions
+
+    session picks the session to test (a session_start_time, or a date for
+    logs without one); by default each group's latest session is used.
+    """
+    comparisons = []
+    for group, sessions in sorted(collect_sessions(paths).items()):
+        keys = sorted(sessions)
+        current_key = session if session is not None else keys[-1]
+        if current_key not in sessions:
+            continue
+        previous = [key for key in keys if key < current_key][-baseline_sessions:]
+        if not previous:
+            continue
+        current = sessions[current_key]
+        baseline = SessionSample()
+        for key in previous:
+            baseline.extend(sessions[key])
+
+        comparison = SessionComparison(
+            group=group, session=current_key, baseline_sessions=previous,
+            current_n=len(current.durations), baseline_n=len(baseline.durations),
+            current_median=_median(current.durations), baseline_median=_median(baseline.durations),
+            current_success_rate=current.success_rate, baseline_success_rate=baseline.success_rate,
+            current_requests=current.requests, baseline_requests=baseline.requests,
+        )
+        if comparison.current_n >= min_samples and comparison.baseline_n >= min_baseline:
+            comparison.latency_p = mann_whitney_greater(current.durations, baseline.durations)[1]
+            comparison.ks_d, comparison.ks_p = ks_greater(current.durations, baseline.durations)
+        if current.requests >= min_samples and baseline.requests >= min_baseline:
+            comparison.success_p = proportion_lower(current.successes, current.requests,
+                                                    baseline.successes, baseline.requests)
+        comparisons.append(comparison)
+
+    # Holm over every test in the report: many groups means many chances of a fluke
+    tests = [(comparison, name) for comparison in comparisons for name in ('latency_p', 'success_p')
+             if getattr(comparison, name) is not None]
+    adjusted = holm_adjust([getattr(comparison, name) for comparison, name in tests])
+    for (comparison, name), p_value in zip(tests, adjusted):
+        setattr(comparison, name, p_value)
+        if name == 'latency_p':
+            comparison.latency_regression = (p_value < alpha and comparison.slowdown is not None
+                                             and comparison.slowdown >= min_slowdown)
+        else:
+            comparison.success_regression = (
+                p_value < alpha
+                and comparison.baseline_success_rate - comparison.current_success_rate >= min_success_drop)
+    return comparisons
+
+
+def _format_rate(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value * 100:.1f}%"
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value:.1f}s"
+
+
+def _format_p(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value:.2g}"
+
+
+def format_regression_report(comparisons: List[SessionComparison], show_all: bool = False) -> str:
+    """Text report of flagged regressions (or of every comparison)"""
+    regressions = [comparison for comparison in comparisons if comparison.is_regression]
+    lines = [f"🔬 {len(comparisons)} endpoint/parameter groups compared, {len(regressions)} regressions"]
+    shown = comparisons if show_all else regressions
+    if shown:
+        lines.append(f"\n  {'group':<44} {'session':<19} {'median':>15} {'Δ':>7} {'p(MWU)':>7} "
+                     f"{'KS D+':>6} {'success':>15} {'p':>7}")
+    for comparison in shown:
+        slowdown = comparison.slowdown
+        marker = '🔴' if comparison.is_regression else '  '
+        lines.append(
+            f"{marker}{comparison.group[:44]:<44} {comparison.session[:19]:<19} "
+            f"{_format_seconds(comparison.baseline_median):>6} → {_format_seconds(comparison.current_median):<6} "
+            f"{'-' if slowdown is None else f'{slowdown * 100:+.0f}%':>7} {_format_p(comparison.latency_p):>7} "
+            f"{'-' if comparison.ks_d is None else f'{comparison.ks_d:.2f}':>6} "
+            f"{_format_rate(comparison.baseline_success_rate):>6} → {_format_rate(comparison.current_success_rate):<6} "
+            f"{_format_p(comparison.success_p):>7}")
+    return '\n'.join(lines)
+
+
+def default_report_path(logs_dir: str) -> str:
+    """Per-run report file under <logs_dir>/regressions/"""
+    return os.path.join(logs_dir, 'regressions', f"regression_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+
+def save_regression_report(comparisons: List[SessionComparison], path: str, **settings: Any) -> str:
+    ensure_directory_exists(os.path.dirname(path) or '.')
+    with open(path, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'settings': settings,
+            'regressions': sum(1 for comparison in comparisons if comparison.is_regression),
+            'comparisons': [comparison.to_dict() for comparison in comparisons],
+        }, f, indent=2)
+    return path
+
+
+def check_session_regressions(log_paths: List[str], logs_dir: str,
+                              session: Optional[str] = None) -> List[SessionComparison]:
+    """End-of-batch check: print flagged regressions and save the report"""
+    comparisons = detect_regressions(log_paths, session=session)
+    if not comparisons:
+        return comparisons
+    print(format_regression_report(comparisons))
+    path = save_regression_report(comparisons, default_report_path(logs_dir), logs=log_paths, session=session)
+    print(f"📋 Regression report saved to: {path}")
+    return comparisons
@@ -0,0 +1,89 @@
+"""
+One build pass shared by the review page generators
+
+Each generator used to start a pass of its own: refresh the results index,
+load the thumbnail manifest, fragment cache, latency histograms and stats
+rollups, then save them all again, so building every page repeated that
+work (and re-stat'ed the same result files) once per page. A ReportBuild
+holds that state for a single pass. build_reports.py creates one and hands
+it to every generator, so the trees are listed, each file is stat'ed and
+each metadata sidecar is parsed once for all pages. A generator run on its
+own creates a private one and finishes it itself.
+
+    build = ReportBuild()
+    generate_multiface_comparison(build)
+    generate_review_html(build)
+    build.finish()
+"""
+import os
+from typing import Dict, Optional
+
+from . import review_html
+from . import sprites as sprite_stage
+from . import thumbnails as thumbnail_stage
+from .fragments import FragmentCache
+from .latency_histogram import LatencyHistograms, load_latency_histograms
+from .results_index import FileIndex, results_index
+from .sprites import SpriteSheets
+from .stats_rollups import StatsRollups, load_stats_rollups
+from .thumbnails import ThumbnailStore
+
+
+class ReportBuild:
+    """Results index, thumbnails, sprite sheets, fragment caches and log aggregates for one build of the pages"""
+
+    def __init__(self, index: Optional[FileIndex] = None):
+        self.index = index or results_index(refresh=True)
+        self.fragment_caches: Dict[str, FragmentCache] = {}
+        self.sprite_sheets: Dict[str, SpriteSheets] = {}
+        self._thumbnails: Optional[ThumbnailStore] = None
+        self._histograms: Optional[LatencyHistograms] = None
+        self._rollups: Optional[StatsRollups] = None
+
+    def fragments(self, page: str, generator_path: str) -> FragmentCache:
+        """A page's fragment cache, invalidated by its generator's code, the shared markup and the thumbnail and sprite stages"""
+        cache = self.fragment_caches.get(page)
+        if cache is None:
+            cache = self.fragment_caches[page] = FragmentCache.load(
+                page, code_paths=[os.path.abspath(generator_path), review_html.__file__,
+                                   thumbnail_stage.__file__, sprite_stage.__file__],
+                stat=self.index.stat, variant=str(thumbnail_stage.THUMBNAIL_FORMAT))
+        return cache
+
+    def sprites(self, page: str) -> SpriteSheets:
+        """A page's contact sheets under sprites/<page>/"""
+        sheets = self.sprite_sheets.get(page)
+        if sheets is None:
+            sheets = self.sprite_sheets[page] = SpriteSheets.load(page, stat=self.index.stat)
+        return sheets
+
+    @property
+    def thumbnails(self) -> ThumbnailStore:
+        """The thumbnail store every page renders into; each image is checked once per build"""
+        if self._thumbnails is None:
+            self._thumbnails = ThumbnailStore.load(stat=self.index.stat)
+        return self._thumbnails
+
+    @property
+    def histograms(self) -> LatencyHistograms:
+        """Latency histograms, brought up to date with the request logs once per build"""
+        if self._histograms is None:
+            self._histograms = load_latency_histograms()
+        return self._histograms
+
+    @property
+    def rollups(self) -> StatsRollups:
+        """Stats rollups (and stats.json), brought up to date once per build"""
+        if self._rollups is None:
+            self._rollups = load_stats_rollups()
+        return self._rollups
+
+    def finish(self) -> None:
+        """Save whatever the pages changed: index, fragment caches, sprite maps and thumbnail manifest"""
+        self.index.save()
+        for cache in self.fragment_caches.values():
+            cache.save()
+        for sheets in self.sprite_sheets.values():
+            sheets.save()
+        if self._thumbnails is not None:
+            self._thumbnails.save()
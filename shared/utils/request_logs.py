@@ -0,0 +1,280 @@
+"""
+Streaming access to the request log CSVs written by the test runners
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .common import get_project_root
+
+# The Thortful runner writes a short 12-column log while the Segmind runners
+# write the detailed per-request log. Rows from both are normalised to the
+# detailed column names so analysis code only has to know one schema.
+FIELD_ALIASES = {
+    'request_time_seconds': 'request_duration_seconds',
+    'generation_time_seconds': 'api_generation_time',
+    'source_face_index': 'source_faces_index',
+    'target_face_index': 'target_faces_index',
+}
+
+DURATION_COLUMNS = ('request_duration_seconds', 'request_time_seconds')
+
+# Placeholder values the runners write instead of a number
+MISSING_VALUES = {'', 'unknown', 'error', 'exception', 'timeout_error',
+                  'gateway_timeout', 'N/A', 'None', 'nan'}
+
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv'}
+
+
+def parse_float(value: Optional[str]) -> Optional[float]:
+    """Parse a numeric log field, returning None for placeholders"""
+    if value is None or value in MISSING_VALUES:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_bool(value: Optional[str]) -> Optional[bool]:
+    """Parse a True/False log field, returning None if it is blank"""
+    if value in ('True', 'true', '1'):
+        return True
+    if value in ('False', 'false', '0'):
+        return False
+    return None
+
+
+def is_request_log(csv_path: str) -> bool:
+    """Check whether a CSV file has the header of a request log"""
+    try:
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+    except (OSError, UnicodeDecodeError):
+        return False
+    return 'success' in header and any(col in header for col in DURATION_COLUMNS)
+
+
+def _log_fingerprint(csv_path: str) -> Tuple[int, str]:
+    """Identify a log by size plus a hash of its head and tail"""
+    size = os.path.getsize(csv_path)
+    digest = hashlib.sha1()
+    with open(csv_path, 'rb') as f:
+        digest.update(f.read(65536))
+        if size > 65536:
+            f.seek(max(65536, size - 65536))
+            digest.update(f.read())
+    return size, digest.hexdigest()
+
+
+def find_request_logs(root: Optional[str] = None, include_archive: bool = False) -> List[str]:
+    """
+    Find every request log CSV under the project root
+
+    Several logs are kept both at the repo root and in their testing
+    folder; identical copies are returned only once.
+    """
+    root = root or get_project_root()
+    logs = []
+    seen = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames
+                             if d not in SKIP_DIRS and (include_archive or d != 'archive'))
+        for filename in sorted(filenames):
+            if filename.endswith('.csv'):
+                path = os.path.join(dirpath, filename)
+                if is_request_log(path):
+                    fingerprint = _log_fingerprint(path)
+                    if fingerprint not in seen:
+                        seen.add(fingerprint)
+                        logs.append(path)
+    return logs
+
+
+def canonical_header(header: List[str]) -> List[str]:
+    """Rename short-schema column names to the detailed log column names"""
+    return [FIELD_ALIASES.get(name, name) for name in header]
+
+
+def infer_api_version(row: Dict[str, str]) -> str:
+    """Recover api_version for logs that predate the column (e.g. v4_requests_log.csv)"""
+    request_id = row.get('request_id', '')
+    if request_id.startswith('v43_'):
+        return 'v4.3'
+    if request_id[:3] in ('v2_', 'v4_'):
+        return request_id[:2]
+    url = row.get('api_endpoint_url', '')
+    return url.rsplit('faceswap-', 1)[1] if 'faceswap-' in url else ''
+
+
+def normalize_row(row: Dict[str, str]) -> Dict[str, str]:
+    """Rename short-schema columns to the detailed log column names"""
+    normalized = {FIELD_ALIASES.get(key, key): value for key, value in row.items()
+                  if key is not None}
+
+    if not normalized.get('api_version'):
+        normalized['api_version'] = infer_api_version(normalized)
+
+    # Thortful rows have no combo_key; derive the same source_to_target form
+    if not normalized.get('combo_key') and normalized.get('source_image'):
+        source = os.path.splitext(normalized['source_image'])[0]
+        target = os.path.splitext(normalized.get('target_image', ''))[0]
+        normalized['combo_key'] = f"{source}_to_{target}"
+
+    if 'error_type' not in normalized and normalized.get('success') == 'False':
+        normalized['error_type'] = classify_error_type(normalized.get('error_message', ''))
+
+    return normalized
+
+
+def classify_error_type(error_message: str) -> str:
+    """Derive the coarse error_type the detailed loggers would have written"""
+    message = error_message.lower()
+    if 'timeout' in message or 'timed out' in message or 'http 504' in message:
+        return 'timeout'
+    if message.startswith('http '):
+        return 'http_error'
+    return 'request_exception' if message else ''
+
+
+def segments_dir(csv_path: str) -> str:
+    """Directory holding the fix segments written alongside a log"""
+    return csv_path + '.segments'
+
+
+def record_digest(raw: bytes) -> str:
+    """Short digest of a raw CSV record, used to confirm an exclusion still applies"""
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def load_exclusions(csv_path: str) -> Dict[int, str]:
+    """
+    Read the exclusion segments written by the consistency checker
+
+    Returns {row start offset: record digest}. Logs are append-only, so a
+    row's byte offset is stable; the digest guards against a log that has
+    since been rewritten.
+    """
+    directory = segments_dir(csv_path)
+    excluded: Dict[int, str] = {}
+    if not os.path.isdir(directory):
+        return excluded
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.name.startswith('exclude-') and entry.name.endswith('.csv'):
+            with open(entry.path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    excluded[int(row['offset'])] = row['digest']
+    return excluded
+
+
+def exclusions_fingerprint(csv_path: str) -> str:
+    """Short hash of a log's exclusion segments, to notice when they change"""
+    excluded = load_exclusions(csv_path)
+    return hashlib.sha1(json.dumps(sorted(excluded.items())).encode('utf-8')).hexdigest()[:16]
+
+
+def iter_raw_records(csv_path: str, offset: int = 0) -> Iterator[Tuple[List[str], List[str], int, int, bytes]]:
+    """
+    Stream (header, values, start, end, raw bytes) records from a byte offset
+
+    A trailing record without a final newline is returned if its quotes
+    balance and it has the header's field count, since a finished log may
+    simply not end in one. A record that is still being written (an
+    unterminated quoted field, or too few fields) is left for the next call.
+    """
+    with open(csv_path, 'rb') as f:
+        header_line = f.readline()
+        header = canonical_header(next(csv.reader([header_line.decode('utf-8')]), []))
+        f.seek(max(offset, f.tell()))
+
+        start = f.tell()
+        pending: List[bytes] = []
+        quotes = 0
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            complete = line.endswith(b'\n')
+            pending.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2:
+                if not complete:
+                    break
+                continue  # inside a quoted multi-line field (e.g. a JSON error body)
+
+            raw = b''.join(pending)
+            pending, quotes = [], 0
+            values = next(csv.reader(io.StringIO(raw.decode('utf-8', errors='replace'), newline='')), None)
+            if not complete and (not values or len(values) != len(header)):
+                break
+            end = f.tell()
+            if values:
+                yield header, values, start, end, raw
+            start = end
+
+
+def iter_request_rows_from(csv_path: str, offset: int = 0, apply_exclusions: bool = True,
+                           skip_ragged: bool = False) -> Iterator[Tuple[Dict[str, str], int]]:
+    """
+    Stream normalised rows starting at a byte offset
+
+    Each row is yielded with the byte offset just past it, so callers can
+    persist the offset and resume there once the log has grown. With
+    skip_ragged, rows whose field count differs from the header are left out.
+    """
+    excluded = load_exclusions(csv_path) if apply_exclusions else {}
+    ragged = 0
+    for header, values, start, end, raw in iter_raw_records(csv_path, offset):
+        if start in excluded and excluded[start] == record_digest(raw):
+            continue
+        if skip_ragged and len(values) != len(header):
+            ragged += 1
+            continue
+        normalized = normalize_row(dict(zip(header, values)))
+        normalized['log_file'] = csv_path
+        yield normalized, end
+    _warn_ragged(csv_path, ragged)
+
+
+def iter_request_rows(csv_path: str, skip_ragged: bool = False) -> Iterator[Dict[str, str]]:
+    """
+    Stream normalised rows from a single request log, honouring exclusion segments
+
+    Rows written by an older runner layout than the log's header have a
+    different field count and their values sit under the wrong columns;
+    skip_ragged leaves them out (with a warning) instead of misreading them.
+    """
+    if os.path.isdir(segments_dir(csv_path)):
+        for row, _ in iter_request_rows_from(csv_path, skip_ragged=skip_ragged):
+            yield row
+        return
+
+    ragged = 0
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = canonical_header(next(reader, []))
+        for values in reader:
+            if not values:
+                continue
+            if skip_ragged and len(values) != len(header):
+                ragged += 1
+                continue
+            normalized = normalize_row(dict(zip(header, values)))
+            normalized['log_file'] = csv_path
+            yield normalized
+    _warn_ragged(csv_path, ragged)
+
+
+def _warn_ragged(csv_path: str, ragged: int) -> None:
+    if ragged:
+        print(f"⚠️ Skipped {ragged} rows of {csv_path} whose field count differs from its header")
+
+
+def iter_all_request_rows(paths: Optional[List[str]] = None,
+                          skip_ragged: bool = False) -> Iterator[Dict[str, str]]:
+    """Stream normalised rows from several request logs in turn"""
+    for path in (paths if paths is not None else find_request_logs()):
+        yield from iter_request_rows(path, skip_ragged=skip_ragged)
@@ -0,0 +1,276 @@
+"""
+Shared index of the result, source and target image trees
+
+The review generators used to glob the same directories independently, and
+generate_single_face_review globbed and sorted source-single-face/ inside
+its per-result loop. FileIndex lists each directory with one os.scandir
+pass and keeps the listing until the directory's mtime changes (adding,
+removing or renaming a file updates it). Parsed *_metadata.json files are
+cached against their own mtime and size, so a result that is rewritten in
+place is re-read. Both survive between runs in .cache/results_index.json.
+Within one build pass (a generator starts one with results_index(refresh=True))
+a directory or file is stat'ed at most once, however many lookups hit it.
+
+    index = results_index(refresh=True)
+    results = index.results('test-results/single-face-results')
+    results.get('source_01', 'target_03', 'v4')   # O(1)
+    results.by_source('source_01'); results.by_version('v2')
+    index.metadata(entry.metadata_path)
+    index.save()
+"""
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .common import get_project_root, write_json_atomic
+
+STATE_VERSION = 1
+
+RESULT_SUFFIX = '_result.jpg'
+METADATA_SUFFIX = '_metadata.json'
+API_VERSIONS = ('v2', 'v4', 'v43')
+
+
+@dataclass(frozen=True)
+class ResultEntry:
+    """One <source>_to_<target>[_<version>]_result.jpg and its metadata sidecar"""
+    stem: str
+    source: str
+    target: str
+    version: Optional[str]
+    path: str
+    metadata_path: str
+    metadata_exists: bool
+
+
+def parse_result_stem(stem: str) -> Tuple[str, str, Optional[str]]:
+    """(source, target, api version) from a result name without _result.jpg"""
+    source, _, target = stem.partition('_to_')
+    name, _, suffix = target.rpartition('_')
+    if name and suffix in API_VERSIONS:
+        return source, name, suffix
+    return source, target, None
+
+
+class ResultSet:
+    """Result files of one directory with lookups by source, target and version"""
+
+    def __init__(self, entries: List[ResultEntry]):
+        self.entries = entries
+        self._by_key: Dict[Tuple[str, str, Optional[str]], ResultEntry] = {}
+        self._by_source: Dict[str, List[ResultEntry]] = defaultdict(list)
+        self._by_target: Dict[str, List[ResultEntry]] = defaultdict(list)
+        self._by_version: Dict[Optional[str], List[ResultEntry]] = defaultdict(list)
+        for entry in entries:
+            self._by_key[(entry.source, entry.target, entry.version)] = entry
+            self._by_source[entry.source].append(entry)
+            self._by_target[entry.target].append(entry)
+            self._by_version[entry.version].append(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, source: str, target: str, version: Optional[str] = None) -> Optional[ResultEntry]:
+        return self._by_key.get((source, target, version))
+
+    def by_source(self, source: str) -> List[ResultEntry]:
+        return self._by_source.get(source, [])
+
+    def by_target(self, target: str) -> List[ResultEntry]:
+        return self._by_target.get(target, [])
+
+    def by_version(self, version: Optional[str]) -> List[ResultEntry]:
+        return self._by_version.get(version, [])
+
+
+class FileIndex:
+    """Directory listings and parsed metadata, invalidated by mtime"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        # abspath -> {'mtime_ns': int, 'names': [sorted file names]}
+        self.directories: Dict[str, Dict[str, Any]] = state.get('directories', {})
+        # abspath -> {'mtime_ns': int, 'size': int, 'data': {...}}
+        self.metadata_cache: Dict[str, Dict[str, Any]] = state.get('metadata', {})
+        self._results: Dict[str, Tuple[int, ResultSet]] = {}
+        self._name_sets: Dict[str, Tuple[int, frozenset]] = {}
+        self._paths: Dict[Tuple[str, str, str], Tuple[int, List[str]]] = {}
+        self._keys: Dict[str, str] = {}
+        self._cwd = os.getcwd()
+        self.dirty = False
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Start a new build pass: directories and files are re-checked on next use"""
+        if os.getcwd() != self._cwd:
+            self._keys, self._cwd = {}, os.getcwd()
+        self._checked: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def _key(self, path: str) -> str:
+        key = self._keys.get(path)
+        if key is None:
+            # Normalise each directory once rather than every file path in it
+            directory, name = os.path.split(path)
+            if name in ('', '.', '..') or directory == path:
+                key = os.path.abspath(path)
+            else:
+                parent = self._key(directory or '.')
+                key = parent + name if parent.endswith(os.sep) else parent + os.sep + name
+            self._keys[path] = key
+        return key
+
+    def stat(self, path: str) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, size) of a file, or None if missing; stat'ed once per pass"""
+        if path in self._stats:
+            return self._stats[path]
+        try:
+            stat = os.stat(self._key(path))
+            result = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            result = None
+        self._stats[path] = result
+        return result
+
+    def names(self, directory: str, suffix: str = '', prefix: str = '') -> List[str]:
+        """Sorted file names in a directory, from one os.scandir pass per change"""
+        key = self._key(directory)
+        listing = self._checked.get(key)
+        if listing is None:
+            try:
+                mtime_ns = os.stat(key).st_mtime_ns
+            except OSError:
+                return []
+            listing = self.directories.get(key)
+            if listing is None or listing['mtime_ns'] != mtime_ns:
+                with os.scandir(key) as entries:
+                    names = sorted(entry.name for entry in entries if entry.is_file())
+                listing = self.directories[key] = {'mtime_ns': mtime_ns, 'names': names}
+                self.dirty = True
+            self._checked[key] = listing
+        if not suffix and not prefix:
+            return listing['names']
+        return [name for name in listing['names'] if name.endswith(suffix) and name.startswith(prefix)]
+
+    def paths(self, directory: str, suffix: str = '', prefix: str = '') -> List[str]:
+        """Sorted paths like glob.glob(f"{directory}/{prefix}*{suffix}") would return"""
+        names = self.names(directory)
+        mtime_ns = self._checked.get(self._key(directory), {}).get('mtime_ns', -1)
+        cached = self._paths.get((directory, suffix, prefix))
+        if cached is None or cached[0] != mtime_ns:
+            # One join for the directory rather than one per name; same paths glob would give
+            base = os.path.join(directory, '')
+            paths = [base + name for name in names if name.endswith(suffix) and name.startswith(prefix)]
+            cached = self._paths[(directory, suffix, prefix)] = (mtime_ns, paths)
+        return cached[1]
+
+    def exists(self, path: str) -> bool:
+        """Whether a file exists, answered from its directory's listing"""
+        directory, name = os.path.split(path)
+        directory = directory or '.'
+        names = self.names(directory)
+        key = self._key(directory)
+        if key not in self._checked:
+            return False
+        mtime_ns = self._checked[key]['mtime_ns']
+        cached = self._name_sets.get(key)
+        if cached is None or cached[0] != mtime_ns:
+            cached = self._name_sets[key] = (mtime_ns, frozenset(names))
+        return name in cached[1]
+
+    def results(self, directory: str) -> ResultSet:
+        """Every *_result.jpg in a directory, keyed by source, target and version"""
+        names = self.names(directory)
+        key = self._key(directory)
+        mtime_ns = self._checked.get(key, {}).get('mtime_ns', -1)
+        cached = self._results.get(key)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        # After a file lands, only its entry is new; the rest are reused from the last listing
+        previous = {entry.stem: entry for entry in cached[1].entries} if cached else {}
+        base = os.path.join(directory, '')
+        present = set(names)
+        entries = []
+        for name in names:
+            if not name.endswith(RESULT_SUFFIX):
+                continue
+            stem = name[:-len(RESULT_SUFFIX)]
+            metadata_name = stem + METADATA_SUFFIX
+            metadata_exists = metadata_name in present
+            entry = previous.get(stem)
+            if entry is None or entry.metadata_exists != metadata_exists or entry.path != base + name:
+                source, target, version = parse_result_stem(stem)
+                entry = ResultEntry(stem, source, target, version, base + name, base + metadata_name,
+                                    metadata_exists)
+            entries.append(entry)
+        result_set = ResultSet(entries)
+        self._results[key] = (mtime_ns, result_set)
+        return result_set
+
+    def metadata(self, metadata_path: str) -> Dict[str, Any]:
+        """Parsed metadata JSON, re-read only when the file's mtime or size changes"""
+        stat = self.stat(metadata_path)
+        if stat is None:
+            return {}
+        key = self._key(metadata_path)
+        cached = self.metadata_cache.get(key)
+        if cached and cached['mtime_ns'] == stat[0] and cached['size'] == stat[1]:
+            return cached['data']
+        try:
+            with open(key, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.metadata_cache[key] = {'mtime_ns': stat[0], 'size': stat[1], 'data': data}
+        self.dirty = True
+        return data
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'updated': datetime.now().isoformat(),
+            'directories': self.directories,
+            'metadata': self.metadata_cache,
+        }
+
+    def save(self, state_path: Optional[str] = None) -> None:
+        """Write state atomically, and only if something was rescanned or re-read"""
+        if not self.dirty:
+            return
+        write_json_atomic(state_path or default_state_path(), self.to_state())
+        self.dirty = False
+
+    @classmethod
+    def load(cls, state_path: str) -> 'FileIndex':
+        """Load saved state, or start empty if none exists or the format changed"""
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r') as f:
+                    state = json.load(f)
+            except ValueError:
+                return cls()
+            if state.get('version') == STATE_VERSION:
+                return cls(state)
+        return cls()
+
+
+def default_state_path() -> str:
+    return os.path.join(get_project_root(), '.cache', 'results_index.json')
+
+
+_index: Optional[FileIndex] = None
+_index_path: Optional[str] = None
+
+
+def results_index(refresh: bool = False) -> FileIndex:
+    """The process-wide FileIndex, loaded from .cache/ on first use; refresh=True starts a new pass"""
+    global _index, _index_path
+    state_path = default_state_path()
+    if _index is None or _index_path != state_path:
+        _index, _index_path = FileIndex.load(state_path), state_path
+    elif refresh:
+        _index.refresh()
+    return _index
@@ -0,0 +1,320 @@
+"""
+Compact column-oriented table of request log rows for analytics
+
+Rows are streamed from the CSV logs straight into typed buffers, so a
+million-row log never exists as a million dicts. Numeric columns become
+NumPy arrays and repeated strings (api_version, card_id, error_type...)
+are dictionary encoded as small integer codes.
+"""
+import array
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .common import ensure_directory_exists, get_project_root
+from .request_logs import find_request_logs, iter_all_request_rows, parse_bool
+
+# column name -> (array typecode used while loading, numpy dtype)
+NUMERIC_COLUMNS = {
+    'request_duration_seconds': ('f', np.float32),
+    'api_generation_time': ('f', np.float32),
+    'source_file_size_kb': ('f', np.float32),
+    'target_file_size_kb': ('f', np.float32),
+    'total_payload_size_mb': ('f', np.float32),
+    'response_content_length': ('f', np.float32),
+    'api_remaining_credits': ('d', np.float64),
+    'credits_used': ('f', np.float32),
+}
+
+STATUS_COLUMN = 'http_status_code'
+BOOL_COLUMNS = ('success', 'timeout_occurred', 'output_file_saved')
+TIME_COLUMNS = ('timestamp',)
+
+CATEGORICAL_COLUMNS = (
+    'api_version',
+    'card_id',
+    'error_type',
+    'source_image',
+    'target_image',
+    'combo_key',
+    'detection_face_order',
+    'model_type',
+    'test_type',
+    'session_start_time',
+    'log_file',
+)
+
+NAN = float('nan')
+
+AGGREGATES = ('count', 'sum', 'mean', 'min', 'max', 'success_rate', 'error_rate', 'timeout_rate')
+
+
+def _parse_timestamp(value: str) -> float:
+    """Convert an ISO timestamp into epoch seconds (NaN if blank)"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return NAN
+
+
+class ResultTable:
+    """Typed, dictionary-encoded columns of request log rows"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]]):
+        self.columns = columns
+        self.categories = categories
+        self._lookup = {name: {value: code for code, value in enumerate(values)}
+                        for name, values in categories.items()}
+
+    def __len__(self) -> int:
+        first = next(iter(self.columns.values()), None)
+        return 0 if first is None else len(first)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays (excluding category strings)"""
+        return sum(column.nbytes for column in self.columns.values())
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a column; categoricals are decoded to an object array"""
+        if name in self.categories:
+            values = np.array(self.categories[name], dtype=object)
+            return values[self.columns[name]]
+        return self.columns[name]
+
+    def codes(self, name: str) -> np.ndarray:
+        """Return the integer codes of a categorical column"""
+        return self.columns[name]
+
+    def code_for(self, name: str, value: str) -> int:
+        """Return the code for a categorical value, or -1 if it never occurs"""
+        return self._lookup[name].get(value, -1)
+
+    def mask(self, **conditions: Any) -> np.ndarray:
+        """Build a boolean row mask from column=value (or column=[values]) pairs"""
+        result = np.ones(len(self), dtype=bool)
+        for name, wanted in conditions.items():
+            values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            if name in self.categories:
+                codes = [self.code_for(name, v) for v in values]
+                result &= np.isin(self.columns[name], codes)
+            else:
+                result &= np.isin(self.columns[name], values)
+        return result
+
+    def with_categorical(self, name: str, values: np.ndarray) -> 'ResultTable':
+        """Return a table with an extra column dictionary-encoded from raw values"""
+        categories, codes = np.unique(values, return_inverse=True)
+        columns = dict(self.columns)
+        columns[name] = codes.ravel().astype(np.int32)
+        all_categories = dict(self.categories)
+        all_categories[name] = [str(c) for c in categories]
+        return ResultTable(columns, all_categories)
+
+    def save(self, path: str) -> None:
+        """Persist the table as a single .npz file"""
+        np.savez(path, __categories__=np.array(json.dumps(self.categories)), **self.columns)
+
+    @classmethod
+    def load(cls, path: str) -> 'ResultTable':
+        """Load a table written by save()"""
+        with np.load(path) as data:
+            categories = json.loads(str(data['__categories__']))
+            columns = {name: data[name] for name in data.files if name != '__categories__'}
+        return cls(columns, categories)
+
+    def filter(self, mask: Optional[np.ndarray] = None, **conditions: Any) -> 'ResultTable':
+        """Return a new table holding only the selected rows"""
+        if mask is None:
+            mask = np.ones(len(self), dtype=bool)
+        if conditions:
+            mask = mask & self.mask(**conditions)
+        return ResultTable({name: column[mask] for name, column in self.columns.items()},
+                           self.categories)
+
+    def group_by(self, keys: Union[str, Sequence[str]], value: str = 'request_duration_seconds',
+                 aggregates: Sequence[str] = ('count', 'mean'),
+                 percentiles: Sequence[float] = ()) -> List[Dict[str, Any]]:
+        """
+        Aggregate a numeric column per group of categorical keys
+
+        Returns one dict per group with the key values, the requested
+        aggregates and a pNN entry for each percentile. NaN values are
+        ignored except by 'count' and 'success_rate'.
+        """
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        if len(self) == 0:
+            return []
+
+        stacked = np.stack([self.columns[k].astype(np.int64) for k in keys], axis=1)
+        group_keys, inverse = np.unique(stacked, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n_groups = len(group_keys)
+
+        values = self.columns[value].astype(np.float64)
+        valid = ~np.isnan(values)
+        counts = np.bincount(inverse, minlength=n_groups)
+        valid_counts = np.bincount(inverse, weights=valid, minlength=n_groups)
+        sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=n_groups)
+
+        stats: Dict[str, np.ndarray] = {'count': counts, 'sum': sums}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['mean'] = sums / valid_counts
+            if 'success_rate' in aggregates or 'error_rate' in aggregates:
+                successes = np.bincount(inverse, weights=self.columns['success'] == 1,
+                                        minlength=n_groups)
+                stats['success_rate'] = successes / counts
+                stats['error_rate'] = 1.0 - stats['success_rate']
+            if 'timeout_rate' in aggregates:
+                timed_out = ((self.columns['timeout_occurred'] == 1)
+                             | (self.columns['error_type'] == self.code_for('error_type', 'timeout')))
+                stats['timeout_rate'] = np.bincount(inverse, weights=timed_out,
+                                                    minlength=n_groups) / counts
+
+        if 'min' in aggregates or 'max' in aggregates or percentiles:
+            # Sort once by (group, value) so every group is a contiguous slice
+            order = np.lexsort((values, ~valid, inverse))
+            sorted_values = values[order]
+            starts = np.searchsorted(inverse[order], np.arange(n_groups))
+            n_valid = valid_counts.astype(np.int64)
+            stats['min'] = np.full(n_groups, np.nan)
+            stats['max'] = np.full(n_groups, np.nan)
+            for p in percentiles:
+                stats[f'p{p:g}'] = np.full(n_groups, np.nan)
+            for g in range(n_groups):
+                if n_valid[g] == 0:
+                    continue
+                group_values = sorted_values[starts[g]:starts[g] + n_valid[g]]
+                stats['min'][g] = group_values[0]
+                stats['max'][g] = group_values[-1]
+                for p in percentiles:
+                    stats[f'p{p:g}'][g] = np.percentile(group_values, p)
+
+        wanted = [a for a in aggregates if a in stats] + [f'p{p:g}' for p in percentiles]
+        rows = []
+        for g in range(n_groups):
+            row: Dict[str, Any] = {}
+            for i, key in enumerate(keys):
+                code = int(group_keys[g, i])
+                row[key] = self.categories[key][code] if key in self.categories else code
+            for name in wanted:
+                stat = stats[name][g]
+                row[name] = int(stat) if name == 'count' else float(stat)
+            rows.append(row)
+        return rows
+
+
+class ResultTableBuilder:
+    """Accumulate normalised log rows into typed buffers"""
+
+    def __init__(self):
+        self._numeric = {name: array.array(code) for name, (code, _) in NUMERIC_COLUMNS.items()}
+        self._status = array.array('h')
+        self._bools = {name: array.array('b') for name in BOOL_COLUMNS}
+        self._times = {name: array.array('d') for name in TIME_COLUMNS}
+        self._codes = {name: array.array('i') for name in CATEGORICAL_COLUMNS}
+        self._lookup: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL_COLUMNS}
+        self._numeric_items = list(self._numeric.items())
+        self._bool_items = list(self._bools.items())
+        self._time_items = list(self._times.items())
+        self._code_items = [(self._codes[name], self._lookup[name], name)
+                            for name in CATEGORICAL_COLUMNS]
+
+    def append(self, row: Dict[str, str]) -> None:
+        """Append one normalised log row"""
+        get = row.get
+        for name, buffer in self._numeric_items:
+            value = get(name)
+            try:
+                buffer.append(float(value))
+            except (TypeError, ValueError):
+                buffer.append(NAN)
+
+        try:
+            self._status.append(int(get(STATUS_COLUMN)))
+        except (TypeError, ValueError):
+            self._status.append(0)
+
+        for name, buffer in self._bool_items:
+            value = parse_bool(get(name))
+            buffer.append(-1 if value is None else value)
+
+        for name, buffer in self._time_items:
+            buffer.append(_parse_timestamp(get(name)))
+
+        for buffer, lookup, name in self._code_items:
+            value = get(name) or ''
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            buffer.append(code)
+
+    def extend(self, rows: Iterable[Dict[str, str]]) -> 'ResultTableBuilder':
+        """Append every row from an iterable"""
+        for row in rows:
+            self.append(row)
+        return self
+
+    def build(self) -> ResultTable:
+        """Freeze the buffers into a ResultTable"""
+        columns: Dict[str, np.ndarray] = {}
+        for name, buffer in self._numeric.items():
+            columns[name] = np.frombuffer(buffer, dtype=NUMERIC_COLUMNS[name][1]).copy()
+        columns[STATUS_COLUMN] = np.frombuffer(self._status, dtype=np.int16).copy()
+        for name, buffer in self._bools.items():
+            columns[name] = np.frombuffer(buffer, dtype=np.int8).copy()
+        for name, buffer in self._times.items():
+            columns[name] = np.frombuffer(buffer, dtype=np.float64).copy()
+        for name, buffer in self._codes.items():
+            n_categories = len(self._lookup[name])
+            dtype = np.int8 if n_categories < 2**7 else np.int16 if n_categories < 2**15 else np.int32
+            columns[name] = np.frombuffer(buffer, dtype=np.int32).astype(dtype)
+
+        categories = {name: list(lookup) for name, lookup in self._lookup.items()}
+        return ResultTable(columns, categories)
+
+
+def load_results_table(paths: Optional[List[str]] = None) -> ResultTable:
+    """Load request logs into a ResultTable (all discovered logs by default)"""
+    return ResultTableBuilder().extend(iter_all_request_rows(paths)).build()
+
+
+def load_results_table_cached(paths: Optional[List[str]] = None,
+                              cache_path: Optional[str] = None) -> ResultTable:
+    """
+    Load request logs, reusing a .npz cache while no log has changed
+
+    The cache is keyed on each log's path, size and mtime, so appending a
+    row to any log triggers a single reload.
+    """
+    paths = paths if paths is not None else find_request_logs()
+    cache_path = cache_path or os.path.join(get_project_root(), '.cache', 'results_table.npz')
+    signature = json.dumps([[p, os.stat(p).st_size, os.stat(p).st_mtime_ns] for p in paths])
+    signature_path = cache_path + '.key'
+
+    if os.path.exists(cache_path) and os.path.exists(signature_path):
+        with open(signature_path, 'r') as f:
+            if f.read() == signature:
+                return ResultTable.load(cache_path)
+
+    table = load_results_table(paths)
+    ensure_directory_exists(os.path.dirname(cache_path))
+    table.save(cache_path)
+    with open(signature_path, 'w') as f:
+        f.write(signature)
+    return table
+
+
+def table_from_rows(rows: Iterable[Dict[str, str]]) -> ResultTable:
+    """Build a ResultTable from already-normalised rows"""
+    return ResultTableBuilder().extend(rows).build()
+
+
+def group_counts(table: ResultTable, key: str) -> List[Tuple[str, int]]:
+    """Count rows per value of a categorical column, most common first"""
+    counts = np.bincount(table.codes(key), minlength=len(table.categories[key]))
+    order = np.argsort(-counts, kind='stable')
+    return [(table.categories[key][i], int(counts[i])) for i in order if counts[i]]
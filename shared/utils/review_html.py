@@ -0,0 +1,126 @@
+"""
+Source-group markup shared by the review pages
+
+Every results page draws the same thing per source image: a group with the
+source thumbnail in its header, a table with one row per target holding
+image cells (target, source, one per API version), "not available" cells
+for missing results and, on the comparison pages, the sidebar details
+stored per row. Each generator used to carry its own copy of that markup.
+They now build it from these helpers and keep only what differs between
+pages: the data walk, the columns, labels, badges and metadata items.
+
+    html = group_open(source_path, 'source_01', 'source_01 - Multi-Face Tests (10 targets)', columns)
+    html += row_open('multi_01_to_01')
+    html += image_cell(sprites.attrs('source_01', path), path, 'Target 01', 'Target 01')
+    html += result_cell(sprites.attrs('source_01', result), result, 'v2', 'v2 Result', ('api-v2', 'Multi-Face'))
+    html += ROW_CLOSE
+    html += details_script('multi_01_to_01', 'Multi-Face: source_01 → Target 01',
+                           [('API v2 Details', ['12.3s', 'CodeFormer'])])
+    html += GROUP_CLOSE
+"""
+from typing import Iterable, Optional, Sequence, Tuple
+
+from .thumbnails import thumbnail_attrs
+
+ROW_CLOSE = '''
+                    </tr>'''
+
+GROUP_CLOSE = '''
+                </tbody>
+            </table>
+        </div>'''
+
+
+def group_open(source_path: str, alt: str, title: str, columns: Sequence[str]) -> str:
+    """A source group's header and the head of its results table; columns are <th> contents"""
+    headings = ''.join(f'''
+                        <th>{column}</th>''' for column in columns)
+    return f'''
+        <div class="source-group">
+            <div class="source-header">
+                <img class="source-preview" {thumbnail_attrs(source_path, width=120)} alt="{alt}">
+                {title}
+            </div>
+
+            <table class="results-table">
+                <thead>
+                    <tr>{headings}
+                    </tr>
+                </thead>
+                <tbody>'''
+
+
+def row_open(details_key: Optional[str] = None) -> str:
+    """A table row; with a details key, clicking it opens that entry in the sidebar"""
+    if details_key is None:
+        return '''
+                    <tr>'''
+    return f'''
+                    <tr class="comparison-row" onclick="showDetails('{details_key}')" style="cursor: pointer;">'''
+
+
+def image_cell(img_attrs: str, path: str, alt: str, label: str,
+               badge: Optional[Tuple[str, str]] = None, in_details_row: bool = True) -> str:
+    """
+    An image that opens full size in the modal, with its label and an optional (class, text) API badge
+
+    In a row that opens the sidebar the click is kept from reaching the row.
+    """
+    onclick = f"openModal('{path}'); event.stopPropagation();" if in_details_row else f"openModal('{path}')"
+    badge_html = f'''
+                            <div class="api-version {badge[0]}">{badge[1]}</div>''' if badge else ''
+    return f'''
+                        <td class="image-cell">
+                            <img class="test-image" {img_attrs} alt="{alt}" onclick="{onclick}">
+                            <div class="image-label">{label}</div>{badge_html}
+                        </td>'''
+
+
+def result_cell(img_attrs: Optional[str], path: str, version: str, label: str,
+                badge: Optional[Tuple[str, str]] = None) -> str:
+    """A result's image cell, or a "not available" cell when img_attrs is None"""
+    if img_attrs is None:
+        return missing_cell(f"{version} result not available")
+    return image_cell(img_attrs, path, f"{version} Result", label, badge)
+
+
+def missing_cell(text: str) -> str:
+    return f'''
+                        <td class="image-cell">
+                            <div class="missing-result">{text}</div>
+                        </td>'''
+
+
+def metadata_cell(items: Iterable[str]) -> str:
+    """A plain cell of metadata chips, for pages without the sidebar"""
+    return f'''
+                        <td>
+                            {metadata_html(items)}
+                        </td>'''
+
+
+def metadata_html(items: Iterable[str]) -> str:
+    """A row of metadata chips"""
+    return '<div class="metadata">' + ''.join(f'<div class="metadata-item">{item}</div>' for item in items) + '</div>'
+
+
+def details_script(details_key: str, heading: str, sections: Sequence[Tuple[str, Optional[Sequence[str]]]],
+                   extra: str = '') -> str:
+    """
+    The sidebar entry for a row, stored by key for showDetails()
+
+    sections are (title, metadata items) pairs; None items mean there is no
+    result for that section. extra is appended after the sections.
+    """
+    body = ''.join(f'''
+                <div class="detail-section">
+                    <h4>{title}</h4>
+                    {metadata_html(items) if items is not None else '<div class="missing-result">No data</div>'}
+                </div>''' for title, items in sections)
+    return f'''
+                <script>
+                    if (!window.detailsData) window.detailsData = {{}};
+                    window.detailsData['{details_key}'] = `
+                <h3>{heading}</h3>{body}{extra}
+            `;
+                </script>'''
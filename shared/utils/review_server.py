@@ -0,0 +1,327 @@
+"""
+Threaded static file server for the review pages
+
+serve_review.py used socketserver.TCPServer with SimpleHTTPRequestHandler:
+one request at a time, a new connection per request (HTTP/1.0), every file
+read through Python in 64 KB copies, no compression and no validators, so
+a page with hundreds of thumbnails loaded one image after another and
+re-downloaded everything on reload. ReviewServer serves a directory with:
+
+  - a thread per connection and HTTP/1.1 keep-alive (idle connections are
+    closed after KEEP_ALIVE_SECONDS)
+  - socket.sendfile() for file bodies, so large images go from the page
+    cache to the socket without passing through Python
+  - an in-memory LRU of small files (thumbnails, sprite sheets, shards, CSS,
+    JS) and of compressed text, keyed by path, mtime and size so an edited
+    file is never served stale
+  - ETag / Last-Modified validators answering If-None-Match and
+    If-Modified-Since with 304, and single byte ranges (206 / 416)
+  - gzip or Brotli (if installed) for text, taken from the .gz/.br variants
+    build_static.py writes when they are up to date, else compressed once and
+    cached
+  - Cache-Control: immutable for content-hashed names (build_static.py) and
+    ?v= versioned URLs (publish_asset), revalidation for everything else
+
+Directories are listed (or their index.html served) as before.
+
+    with ReviewServer('thortful-v4-single-face', port=8080) as server:
+        print(server.url)
+        ...
+"""
+import email.utils
+import gzip
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .static_build import HASH_LENGTH, MIN_COMPRESS_SIZE, brotli
+
+CACHE_BYTES = 64 * 1024 * 1024
+# Thumbnails, sprite sheets and shards are held in memory; full-size images are sent from disk
+CACHE_FILE_LIMIT = 256 * 1024
+KEEP_ALIVE_SECONDS = 15
+# On-the-fly levels: a 65 MB page compresses in about a second, once
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+_HASHED_NAME = re.compile(rf'\.[0-9a-f]{{{HASH_LENGTH}}}\.[A-Za-z0-9]+$')
+_VERSIONED_QUERY = re.compile(r'(?:^|&)v=')
+
+
+class ContentCache:
+    """Byte-bounded LRU of response bodies, keyed by (path, mtime_ns, size, encoding)"""
+
+    def __init__(self, max_bytes: int = CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple[str, int, int, Optional[str]], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, int, int, Optional[str]]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Tuple[str, int, int, Optional[str]], body: bytes) -> None:
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def _compress(content: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, GZIP_LEVEL, mtime=0)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Browsers open several connections at once per viewer
+    request_queue_size = 128
+
+
+class ReviewServer:
+    """A directory served over threaded, keep-alive HTTP with caching, ranges and compression"""
+
+    def __init__(self, directory: str = '.', host: str = '', port: int = 8080,
+                 cache_bytes: int = CACHE_BYTES, on_get: Optional[Callable[[str], None]] = None,
+                 verbose: bool = False):
+        self.directory = os.path.abspath(directory)
+        self.cache = ContentCache(cache_bytes)
+        self.on_get = on_get
+        self.verbose = verbose
+        self._server = _HTTPServer((host, port), partial(self._handler_class(), directory=self.directory))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        host = self._server.server_address[0]
+        return f"http://{'localhost' if host in ('', '0.0.0.0') else host}:{self.port}/"
+
+    def compressed(self, path: str, stat: os.stat_result, encoding: str) -> bytes:
+        """A text file's body in an encoding: the cached copy, a fresh .gz/.br variant, or compressed now"""
+        key = (path, stat.st_mtime_ns, stat.st_size, encoding)
+        body = self.cache.get(key)
+        if body is not None:
+            return body
+        variant = path + ('.br' if encoding == 'br' else '.gz')
+        try:
+            fresh = os.stat(variant).st_mtime_ns >= stat.st_mtime_ns
+        except OSError:
+            fresh = False
+        if fresh:
+            with open(variant, 'rb') as f:
+                body = f.read()
+        else:
+            with open(path, 'rb') as f:
+                body = _compress(f.read(), encoding)
+        self.cache.put(key, body)
+        return body
+
+    def _handler_class(self):
+        review = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Idle keep-alive connections give up their thread after this long
+            timeout = KEEP_ALIVE_SECONDS
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def handle_one_request(self):
+                try:
+                    super().handle_one_request()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The page cancelled a lazy image load it scrolled past
+                    self.close_connection = True
+
+            def _serve(self, head: bool):
+                url = urlsplit(self.path)
+                if review.on_get is not None:
+                    review.on_get(url.path)
+                path = self.translate_path(self.path)
+                if os.path.isdir(path):
+                    return super().do_HEAD() if head else super().do_GET()
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+                    return
+
+                content_type = self.guess_type(path)
+                compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+                encoding = self._encoding() if compressible and stat.st_size >= MIN_COMPRESS_SIZE else None
+                etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+                headers = {
+                    'Content-Type': content_type,
+                    'ETag': etag,
+                    'Last-Modified': email.utils.formatdate(stat.st_mtime, usegmt=True),
+                    'Cache-Control': (IMMUTABLE if _HASHED_NAME.search(url.path) or _VERSIONED_QUERY.search(url.query)
+                                      else REVALIDATE),
+                }
+                if compressible:
+                    headers['Vary'] = 'Accept-Encoding'
+                if self._not_modified(etag, stat):
+                    self._send_headers(HTTPStatus.NOT_MODIFIED, headers, None)
+                    return
+
+                if encoding is not None:
+                    body = review.compressed(path, stat, encoding)
+                    headers['Content-Encoding'] = encoding
+                    self._send_headers(HTTPStatus.OK, headers, len(body))
+                    if not head:
+                        self.wfile.write(body)
+                    return
+
+                headers['Accept-Ranges'] = 'bytes'
+                byte_range = self._range(stat.st_size, etag)
+                if byte_range is False:
+                    headers['Content-Range'] = f"bytes */{stat.st_size}"
+                    self._send_headers(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, headers, 0)
+                    return
+                status, start, end = HTTPStatus.OK, 0, stat.st_size - 1
+                if byte_range is not None:
+                    status, (start, end) = HTTPStatus.PARTIAL_CONTENT, byte_range
+                    headers['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+                length = end - start + 1
+
+                key = (path, stat.st_mtime_ns, stat.st_size, None)
+                body = review.cache.get(key) if stat.st_size <= CACHE_FILE_LIMIT else None
+                if body is None and stat.st_size <= CACHE_FILE_LIMIT:
+                    with open(path, 'rb') as f:
+                        body = f.read()
+                    review.cache.put(key, body)
+                if body is not None:
+                    self._send_headers(status, headers, length)
+                    if not head:
+                        self.wfile.write(body[start:end + 1])
+                    return
+                try:
+                    f = open(path, 'rb')
+                except OSError:
+                    self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+                    return
+                with f:
+                    self._send_headers(status, headers, length)
+                    if not head and length:
+                        self.connection.sendfile(f, start, length)
+
+            def _send_headers(self, status: int, headers: dict, length: Optional[int]) -> None:
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if length is not None:
+                    self.send_header('Content-Length', str(length))
+                self.end_headers()
+
+            def _encoding(self) -> Optional[str]:
+                """br or gzip if the client accepts it (q > 0), br first"""
+                accepted = {}
+                for part in self.headers.get('Accept-Encoding', '').split(','):
+                    name, _, params = part.strip().partition(';')
+                    quality = 1.0
+                    if params.strip().startswith('q='):
+                        try:
+                            quality = float(params.strip()[2:])
+                        except ValueError:
+                            pass
+                    accepted[name.strip().lower()] = quality
+                if brotli is not None and accepted.get('br', 0) > 0:
+                    return 'br'
+                if accepted.get('gzip', 0) > 0:
+                    return 'gzip'
+                return None
+
+            def _not_modified(self, etag: str, stat: os.stat_result) -> bool:
+                if_none_match = self.headers.get('If-None-Match')
+                if if_none_match is not None:
+                    tags = [tag.strip() for tag in if_none_match.split(',')]
+                    return '*' in tags or etag in tags or f'W/{etag}' in tags
+                if_modified_since = self.headers.get('If-Modified-Since')
+                if if_modified_since:
+                    try:
+                        since = email.utils.parsedate_to_datetime(if_modified_since)
+                    except (TypeError, ValueError):
+                        return False
+                    return since is not None and int(stat.st_mtime) <= since.timestamp()
+                return False
+
+            def _range(self, size: int, etag: str) -> Any:
+                """(start, end) of a single satisfiable range, False if unsatisfiable, None to send it all"""
+                header = self.headers.get('Range')
+                if not header or not header.startswith('bytes=') or ',' in header:
+                    return None
+                if_range = self.headers.get('If-Range')
+                if if_range is not None and if_range.strip() != etag:
+                    return None
+                first, _, last = header[6:].strip().partition('-')
+                try:
+                    if not first:
+                        suffix = int(last)
+                        if suffix <= 0:
+                            return False
+                        return max(0, size - suffix), size - 1
+                    start = int(first)
+                    end = min(int(last), size - 1) if last else size - 1
+                except ValueError:
+                    return None
+                if start >= size or start > end:
+                    return False
+                return start, end
+
+            def log_message(self, format, *args):
+                if review.verbose:
+                    super().log_message(format, *args)
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> 'ReviewServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='review-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'ReviewServer':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
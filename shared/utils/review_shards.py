@@ -0,0 +1,193 @@
+"""
+Pre-parsed, sharded JSON data for the Thortful review page
+
+thortful_review.html used to fetch logs/main_test_results.csv and parse all
+of it in the browser before rendering every card. ReviewShards turns the log
+into review-data/index.json plus fixed-size shards of rows in log order:
+
+    index.json         columns, shard list, filter values
+    shard_00000.json   {"rows": [[timestamp, source_image, ...], ...]}
+
+Each shard entry in the index carries its row and success counts and its
+per-source and per-card counts (keyed by position in the index's sources
+and cards lists), so the page can size a virtualized grid and
+skip shards that cannot match a filter without fetching them. Only the
+index is loaded up front; shards are fetched as they scroll into view.
+
+Like the latency histograms, updates resume from the byte offset reached last
+time, so only appended rows are parsed and only the last shard (plus any new
+ones) is rewritten. A log that shrank or whose exclusion segments changed
+is re-read from the start, as is every row once thumbnails are switched
+on or off. Deleting review-data/ forces a full rebuild.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .common import ensure_directory_exists, write_json_atomic
+from .request_logs import exclusions_fingerprint, iter_request_rows_from, parse_bool
+
+STATE_VERSION = 2
+
+SHARD_ROWS = 250
+
+# Row layout in the shards; the page reads it from index.json
+COLUMNS = ['timestamp', 'source_image', 'target_image', 'card_id', 'result_image', 'api_version',
+           'success', 'generation_time_seconds', 'request_time_seconds', 'error_message',
+           'result_path', 'result_thumb', 'source_thumb']
+
+# Only this sub-project's diverse-face and numbered-source tests are shown
+SOURCE_PREFIXES = ('diverse_face_', 'source_')
+
+# result_image placeholders written instead of a file name
+NO_RESULT_IMAGES = {'', 'error', 'timeout', 'exception', 'gateway_timeout'}
+
+
+class _StaleShards(Exception):
+    pass
+
+
+class ReviewShards:
+    """review-data/ for one log: an index plus shards of pre-parsed rows"""
+
+    def __init__(self, out_dir: str, index: Optional[Dict[str, Any]] = None,
+                 thumbnail: Optional[Callable[[str], Optional[str]]] = None):
+        self.out_dir = out_dir
+        self.thumbnail = thumbnail or (lambda path: None)
+        self.has_thumbnails = thumbnail is not None
+        index = index or {}
+        self.log: Dict[str, Any] = index.get('log', {})
+        self.shards: List[Dict[str, Any]] = index.get('shards', [])
+        self.sources: List[str] = index.get('sources', [])
+        self.cards: List[str] = index.get('cards', [])
+        # shard number -> rows, for shards added to since the last save
+        self._pending: Dict[int, List[list]] = {}
+        self.dirty = not index
+
+    def _reset(self, log_path: str) -> None:
+        self.log = {'path': os.path.basename(log_path), 'offset': 0,
+                    'exclusions': exclusions_fingerprint(log_path), 'thumbnails': self.has_thumbnails}
+        self.shards, self.sources, self.cards = [], [], []
+        self._pending = {}
+        self.dirty = True
+
+    def _shard_path(self, number: int) -> str:
+        return os.path.join(self.out_dir, f"shard_{number:05d}.json")
+
+    def _open_shard(self) -> List[list]:
+        """Rows of the shard new rows go into: the last one if it has room, else a new one"""
+        number = len(self.shards) - 1
+        if number in self._pending and self.shards[number]['rows'] < SHARD_ROWS:
+            return self._pending[number]
+        if self.shards and self.shards[-1]['rows'] < SHARD_ROWS:
+            try:
+                with open(self._shard_path(number), 'r') as f:
+                    rows = json.load(f)['rows']
+            except (OSError, ValueError, KeyError):
+                rows = None
+            if rows is None or len(rows) != self.shards[-1]['rows']:
+                # The shard on disk no longer matches the index, so the offset cannot be trusted
+                raise _StaleShards()
+            self._pending[number] = rows
+            return rows
+        self.shards.append({'rows': 0, 'success': 0, 'sources': {}, 'cards': {}})
+        rows = self._pending[len(self.shards) - 1] = []
+        return rows
+
+    def _row(self, row: Dict[str, str]) -> Optional[list]:
+        source_image = row.get('source_image', '')
+        if not source_image.startswith(SOURCE_PREFIXES):
+            return None
+        success = parse_bool(row.get('success')) is True
+        result_image = row.get('result_image', '')
+        result_path = f"results/{result_image}" if success and result_image not in NO_RESULT_IMAGES else None
+        source_path = f"source-images/{source_image}"
+        return [row.get('timestamp', ''), source_image, row.get('target_image', ''), row.get('card_id', ''),
+                result_image, row.get('api_version', ''), success, row.get('api_generation_time', ''),
+                row.get('request_duration_seconds', ''), row.get('error_message', ''), result_path,
+                self.thumbnail(result_path) if result_path else None, self.thumbnail(source_path)]
+
+    def _add(self, values: list) -> None:
+        self._open_shard().append(values)
+        shard = self.shards[-1]
+
+        source_image, target_image, success = values[1], values[2], values[6]
+        if source_image not in self.sources:
+            self.sources.append(source_image)
+        if target_image not in self.cards:
+            self.cards.append(target_image)
+        # Keyed by position in sources/cards, which only ever grow
+        source_key, card_key = str(self.sources.index(source_image)), str(self.cards.index(target_image))
+        shard['rows'] += 1
+        shard['success'] += success
+        shard['sources'][source_key] = shard['sources'].get(source_key, 0) + 1
+        shard['cards'][card_key] = shard['cards'].get(card_key, 0) + 1
+
+    def update(self, log_path: str) -> int:
+        """Add rows appended to the log since the last update; returns how many were added"""
+        if (self.log.get('path') != os.path.basename(log_path)
+                or os.path.getsize(log_path) < self.log.get('offset', 0)
+                or self.log.get('exclusions') != exclusions_fingerprint(log_path)
+                or self.log.get('thumbnails') != self.has_thumbnails):
+            self._reset(log_path)
+        added = 0
+        try:
+            for row, end_offset in iter_request_rows_from(log_path, self.log['offset']):
+                values = self._row(row)
+                if values is not None:
+                    self._add(values)
+                    added += 1
+                self.log['offset'] = end_offset
+                self.dirty = True
+        except _StaleShards:
+            self._reset(log_path)
+            return self.update(log_path)
+        return added
+
+    @property
+    def total(self) -> int:
+        return sum(shard['rows'] for shard in self.shards)
+
+    def to_index(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'generated': datetime.now().isoformat(),
+            'columns': COLUMNS,
+            'shard_rows': SHARD_ROWS,
+            'log': self.log,
+            'total': self.total,
+            'sources': self.sources,
+            'cards': self.cards,
+            'shards': self.shards,
+        }
+
+    def save(self) -> None:
+        """Write changed shards, then the index that points at them; a no-op if the log had no new rows"""
+        if not self.dirty:
+            return
+        ensure_directory_exists(self.out_dir)
+        for number, rows in sorted(self._pending.items()):
+            write_json_atomic(self._shard_path(number), {'rows': rows})
+        for name in os.listdir(self.out_dir):
+            # Left over from a longer log that has since been rewritten
+            if name.startswith('shard_') and name.endswith('.json') and int(name[6:-5]) >= len(self.shards):
+                os.remove(os.path.join(self.out_dir, name))
+        write_json_atomic(os.path.join(self.out_dir, 'index.json'), self.to_index())
+        last = len(self.shards) - 1
+        self._pending = {last: self._pending[last]} if last in self._pending else {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, out_dir: str, thumbnail: Optional[Callable[[str], Optional[str]]] = None) -> 'ReviewShards':
+        """Existing review data, or an empty set if missing or written by another version"""
+        index_path = os.path.join(out_dir, 'index.json')
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, 'r') as f:
+                    index = json.load(f)
+            except ValueError:
+                index = {}
+            if index.get('version') == STATE_VERSION and index.get('columns') == COLUMNS:
+                return cls(out_dir, index, thumbnail)
+        return cls(out_dir, thumbnail=thumbnail)
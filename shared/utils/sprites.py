@@ -0,0 +1,264 @@
+"""
+Contact-sheet sprite atlases of each source group's thumbnails
+
+Even with thumbnails, a source group on the comparison pages shows dozens
+of separate images, and on GitHub Pages each one is a round trip.
+SpriteSheets composes every image a group shows into one contact sheet,
+sprites/<page>/<group>.webp (plus @2x), in a process pool, from the 2x
+thumbnails ThumbnailStore already rendered. The grid then loads one sheet
+per group, and the full-size image is fetched only when it is clicked
+(openModal).
+
+Tiles are TILE_WIDTH wide and as tall as their image's aspect ratio needs,
+laid out COLUMNS to a row with a small gutter so scaled tiles do not bleed
+into each other. Groups with more than MAX_TILES images get several
+sheets. sprites/<page>/manifest.json is the coordinate map: each sheet's
+size, content hash and the [x, y, width, height] of every tile at 1x.
+A sheet is recomposed only when one of its images' content hash changes,
+and its URL carries its hash so browsers never pair a new map with an old
+sheet. Images without a tile (no Pillow, or a thumbnail that failed) fall
+back to thumbnail_attrs().
+
+    sprites = SpriteSheets.load('multiface_comparison', stat=index.stat)
+    sprites.update({'source_01': image_paths, ...}, thumbnails)
+    html += f'<img class="test-image" {sprites.attrs("source_01", path)} onclick="openModal(\'{path}\')">'
+    sprites.save()
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+from .common import file_signature, write_json_atomic
+from .thumbnails import THUMBNAIL_FORMAT, THUMBNAIL_WIDTHS, Image, ThumbnailStore, thumbnail_attrs, thumbnail_path
+
+STATE_VERSION = 1
+
+SPRITE_DIR = 'sprites'
+# Tiles at the grid cells' 1x thumbnail width; sheets are composed at 2x and halved for 1x
+TILE_WIDTH = THUMBNAIL_WIDTHS[1]
+COLUMNS = 8
+MAX_TILES = 64
+# 1x pixels between tiles, so filtering at scaled sizes does not pick up the neighbouring tile
+GUTTER = 2
+BACKGROUND = (255, 255, 255)
+
+# A transparent 1x1 GIF: sprite tiles stay <img> elements, drawn by their background
+BLANK_IMAGE = 'data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7'
+
+
+def _save(sheet, path: str) -> None:
+    tmp_path = path + '.tmp'
+    if THUMBNAIL_FORMAT == 'WEBP':
+        sheet.save(tmp_path, 'WEBP', quality=80, method=2)
+    else:
+        sheet.save(tmp_path, 'JPEG', quality=82, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def _compose(job: Tuple[str, List[Tuple[str, str]], str, str]) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """Lay out and write one sheet at 2x and 1x; returns (name, sheet entry, error)"""
+    name, tiles, path_1x, path_2x = job
+    try:
+        thumbs = []
+        for image_path, thumb_path in tiles:
+            try:
+                with Image.open(thumb_path) as img:
+                    thumb = img.convert('RGB')
+            except Exception:
+                # Left out of the map; the page shows this image's own thumbnail instead
+                continue
+            thumbs.append((image_path, thumb, max(1, round(thumb.height * TILE_WIDTH / thumb.width))))
+        if not thumbs:
+            return name, None, 'NoTiles'
+
+        columns = min(COLUMNS, len(thumbs))
+        placed, x, y, row_height = {}, 0, 0, 0
+        for n, (image_path, _, height) in enumerate(thumbs):
+            if n and n % columns == 0:
+                x, y, row_height = 0, y + row_height + GUTTER, 0
+            placed[image_path] = [x, y, TILE_WIDTH, height]
+            x += TILE_WIDTH + GUTTER
+            row_height = max(row_height, height)
+        width, height = columns * (TILE_WIDTH + GUTTER) - GUTTER, y + row_height
+
+        sheet = Image.new('RGB', (width * 2, height * 2), BACKGROUND)
+        for image_path, thumb, tile_height in thumbs:
+            tile_x, tile_y = placed[image_path][:2]
+            if thumb.width != TILE_WIDTH * 2:
+                # Only images narrower than the 2x thumbnail; a pixel of rounding in height falls in the gutter
+                thumb = thumb.resize((TILE_WIDTH * 2, tile_height * 2), Image.LANCZOS)
+            sheet.paste(thumb, (tile_x * 2, tile_y * 2))
+        os.makedirs(os.path.dirname(path_2x), exist_ok=True)
+        _save(sheet, path_2x)
+        # Exactly half, so the 1x tiles sit at the same coordinates
+        _save(sheet.reduce(2), path_1x)
+        with open(path_2x, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    except Exception as e:
+        return name, None, type(e).__name__
+    return name, {'size': [width, height], 'hash': digest, 'tiles': placed}, None
+
+
+def _percent(offset: int, travel: int) -> str:
+    # background-position percentages align that fraction of the sheet with the same fraction of the tile
+    return f"{offset * 100 / travel:.4g}%" if travel > 0 else '0%'
+
+
+class SpriteSheets:
+    """One page's contact sheets, recomposed only when the images they hold change"""
+
+    def __init__(self, sprite_dir: str, state: Optional[Dict[str, Any]] = None,
+                 stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature):
+        self.sprite_dir = sprite_dir
+        self.stat = stat
+        # sheet name -> {'group', 'inputs': [[image path, sha256]], 'size', 'hash', 'tiles': {path: [x, y, w, h]}}
+        # (or {'group', 'inputs', 'error'} for a sheet that could not be composed)
+        self.sheets: Dict[str, Dict[str, Any]] = (state or {}).get('sheets', {})
+        self.errors: Dict[str, str] = {}
+        self.composed = 0
+        self.unchanged = 0
+        self.dirty = False
+        self._index_tiles()
+
+    def _index_tiles(self) -> None:
+        # (group, image path) -> (sheet name, sheet entry)
+        self.tiles: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {}
+        for name, sheet in self.sheets.items():
+            for image_path in sheet.get('tiles', ()):
+                self.tiles[(sheet['group'], image_path)] = (name, sheet)
+
+    def _path(self, name: str, scale: int = 1) -> str:
+        extension = '.jpg' if THUMBNAIL_FORMAT == 'JPEG' else '.webp'
+        return f"{self.sprite_dir}/{name}{'@2x' if scale == 2 else ''}{extension}"
+
+    def update(self, groups: Dict[str, Sequence[str]], thumbnails: ThumbnailStore,
+               workers: Optional[int] = None) -> int:
+        """
+        Compose the sheets of every group on the page; returns how many were recomposed
+
+        groups maps each group (a fragment key) to the images it shows, after
+        thumbnails.update() has run over them. Sheets of groups no longer on
+        the page are deleted.
+        """
+        if THUMBNAIL_FORMAT is None:
+            return 0
+        width_2x = TILE_WIDTH * 2 if TILE_WIDTH * 2 in thumbnails.widths else max(thumbnails.widths)
+        wanted, jobs = {}, []
+        for group, image_paths in groups.items():
+            usable = []
+            for image_path in dict.fromkeys(image_paths):
+                entry = thumbnails.images.get(image_path)
+                if entry is not None and 'error' not in entry:
+                    usable.append([image_path, entry['sha256']])
+            chunks = [usable[start:start + MAX_TILES] for start in range(0, len(usable), MAX_TILES)]
+            for n, inputs in enumerate(chunks):
+                name = group if len(chunks) == 1 else f"{group}-{n + 1}"
+                wanted[name] = group
+                sheet = self.sheets.get(name)
+                if sheet and sheet['group'] == group and sheet['inputs'] == inputs:
+                    if 'error' in sheet:
+                        self.errors[name] = sheet['error']
+                        continue
+                    if self.stat(self._path(name)) and self.stat(self._path(name, 2)):
+                        self.unchanged += 1
+                        continue
+                self.sheets[name] = {'group': group, 'inputs': inputs}
+                tiles = [(image_path, thumbnail_path(image_path, width_2x, thumbnails.thumbnail_dir))
+                         for image_path, _ in inputs]
+                jobs.append((name, tiles, self._path(name), self._path(name, 2)))
+
+        # A sheet takes far longer than the pool's startup, so any two are worth spreading out
+        if len(jobs) < 2:
+            results = list(map(_compose, jobs))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_compose, jobs))
+        composed = 0
+        for name, entry, error in results:
+            if error:
+                # Remembered so the group shows its thumbnails until one of its images changes
+                self.sheets[name]['error'] = self.errors[name] = error
+                continue
+            self.sheets[name].update(entry)
+            composed += 1
+        self.composed += composed
+
+        for name in set(self.sheets) - set(wanted):
+            del self.sheets[name]
+            for scale in (1, 2):
+                try:
+                    os.remove(self._path(name, scale))
+                except OSError:
+                    pass
+            self.dirty = True
+        self.dirty = self.dirty or bool(jobs)
+        self._index_tiles()
+        return composed
+
+    def token(self, group: str) -> List[List[str]]:
+        """The group's sheet names and hashes, for fragment signatures: the markup changes with them"""
+        return sorted([name, sheet.get('hash')] for name, sheet in self.sheets.items() if sheet['group'] == group)
+
+    def attrs(self, group: str, image_path: str, width: int = THUMBNAIL_WIDTHS[1]) -> str:
+        """
+        src/style attributes drawing an image from its group's sheet
+
+        The tile scales with the element like the thumbnail it replaces:
+        percentages size and position the sheet, and aspect-ratio gives
+        the element the tile's height. Falls back to thumbnail_attrs().
+        """
+        tile = self.tiles.get((group, image_path))
+        if tile is None:
+            return thumbnail_attrs(image_path, width)
+        name, sheet = tile
+        x, y, w, h = sheet['tiles'][image_path]
+        sheet_width, sheet_height = sheet['size']
+        url_1x = f"{quote(self._path(name))}?v={sheet['hash']}"
+        url_2x = f"{quote(self._path(name, 2), safe='/@')}?v={sheet['hash']}"
+        style = (f"background:url('{url_1x}') {_percent(x, sheet_width - w)} {_percent(y, sheet_height - h)}"
+                 f"/{sheet_width * 100 / w:.4g}% auto no-repeat;"
+                 f"background-image:image-set(url('{url_1x}') 1x,url('{url_2x}') 2x);aspect-ratio:{w}/{h}")
+        return f'src="{BLANK_IMAGE}" style="{style}"'
+
+    def summary(self) -> str:
+        if THUMBNAIL_FORMAT is None:
+            return "Pillow not installed, pages use full-size images"
+        text = f"composed {self.composed}, {self.unchanged} unchanged"
+        if self.errors:
+            text += f", {len(self.errors)} failed (shown as thumbnails)"
+        return text
+
+    def save(self) -> None:
+        """Write the coordinate map atomically, and only if a sheet changed"""
+        if not self.dirty:
+            return
+        write_json_atomic(os.path.join(self.sprite_dir, 'manifest.json'),
+                          {'version': STATE_VERSION, 'format': THUMBNAIL_FORMAT, 'tile_width': TILE_WIDTH,
+                           'sheets': self.sheets})
+        self.dirty = False
+
+    @classmethod
+    def load(cls, page: str, sprite_dir: Optional[str] = None,
+             stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature) -> 'SpriteSheets':
+        """
+        A page's sheets under sprites/<page>/ (relative to the pages that show them)
+
+        Starts empty if the map is missing, or if the format or tile size
+        changed. Pass a FileIndex's stat to share its once-per-pass checks.
+        """
+        sprite_dir = sprite_dir or f"{SPRITE_DIR}/{page}"
+        manifest_path = os.path.join(sprite_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as f:
+                    state = json.load(f)
+            except ValueError:
+                state = {}
+            if (state.get('version') == STATE_VERSION and state.get('format') == THUMBNAIL_FORMAT
+                    and state.get('tile_width') == TILE_WIDTH):
+                return cls(sprite_dir, state, stat)
+        return cls(sprite_dir, stat=stat)
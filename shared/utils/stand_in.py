@@ -0,0 +1,365 @@
+"""
+Local stand-ins for the face swap endpoints
+
+StandInServer is a threaded HTTP server that behaves like a gateway in
+front of a fixed number of GPU workers: each POST waits for a free worker,
+"generates" for a log-normally distributed time and returns a small JSON
+image response. A request that cannot finish within the gateway timeout
+gets a 504 at the deadline while its worker stays busy until the generation
+ends, which is how queueing turns into 504s on the real endpoints.
+
+    with StandInServer(workers=2, generation_seconds=1.0, gateway_timeout=3.0) as server:
+        requests.post(server.url, json={...})
+
+ApiStandInServer serves the real routes (Segmind /v1/faceswap-v2, -v4 and
+-v4.3, Thortful /api/v1/faceswap and /api/v1/auth/*) and replays latency,
+error and 504 outcomes sampled from our request logs, with the
+X-generation-time / X-remaining-credits headers and real result images.
+Setting FACESWAP_STAND_IN_URL makes the runners' route_url() send their
+requests there instead of to the paid APIs:
+
+    python3 stand_in_server.py --port 8765 --time-scale 0.1
+    FACESWAP_STAND_IN_URL=http://127.0.0.1:8765 python3 continue_multiface_v43_with_logging.py
+"""
+import base64
+import glob
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .common import get_project_root
+from .request_logs import iter_all_request_rows, parse_bool, parse_float
+
+STAND_IN_ENV = 'FACESWAP_STAND_IN_URL'
+
+# (status, headers, body) as written by the request handler
+Response = Tuple[int, Dict[str, str], bytes]
+
+# 1x1 greyscale JPEG, enough for clients that decode the returned image
+PLACEHOLDER_IMAGE = base64.b64encode(bytes.fromhex(
+    'ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912130f'
+    '141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432ffc0000b08000100010101'
+    '1100ffc4001f0000010501010101010100000000000000000102030405060708090a0bffc400b5100002010303020403050504'
+    '040000017d01020300041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a2526'
+    '2728292a3435363738393a434445464748494a535455565758595a636465666768696a737475767778797a83848586878889'
+    '8a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4'
+    'e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9faffda0008010100003f00fbd3ffd9'
+)).decode('ascii')
+
+
+def json_response(status: int, body: Dict[str, Any], **headers: str) -> Response:
+    return status, dict(headers, **{'Content-Type': 'application/json'}), json.dumps(body).encode('utf-8')
+
+
+def route_url(url: str) -> str:
+    """Point an API URL at the stand-in when FACESWAP_STAND_IN_URL is set"""
+    base = os.environ.get(STAND_IN_ENV)
+    if not base:
+        return url
+    parts = urlsplit(url)
+    return base.rstrip('/') + parts.path + (f"?{parts.query}" if parts.query else '')
+
+
+class StandInServer:
+    """Threaded stand-in server with a worker pool and a gateway timeout"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, workers: int = 4,
+                 generation_seconds: float = 2.0, generation_sigma: float = 0.3,
+                 gateway_timeout: Optional[float] = 60.0, seed: Optional[int] = None):
+        self.workers = workers
+        self.generation_seconds = generation_seconds
+        self.generation_sigma = generation_sigma
+        self.gateway_timeout = gateway_timeout
+        self._slots = threading.BoundedSemaphore(workers)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.stats: Dict[str, int] = {'requests': 0, 'ok': 0, 'gateway_timeouts': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def sample_generation(self) -> float:
+        """Log-normal generation time whose median is generation_seconds"""
+        with self._random_lock:
+            return self._random.lognormvariate(math.log(self.generation_seconds), self.generation_sigma)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _occupy_worker(self, seconds: float) -> bool:
+        """Queue for a worker and hold it for `seconds`; False if the gateway gave up first"""
+        timeout = self.gateway_timeout
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if not self._slots.acquire(timeout=timeout):
+            return False
+        remaining = deadline - time.monotonic() if deadline is not None else math.inf
+        if seconds > remaining:
+            # The gateway gives up at its deadline; the worker keeps going
+            time.sleep(max(0.0, remaining))
+            threading.Timer(seconds - max(0.0, remaining), self._slots.release).start()
+            return False
+        time.sleep(seconds)
+        self._slots.release()
+        return True
+
+    def handle_swap(self, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Queue for a worker, generate, and return (status, body)"""
+        self._count('requests')
+        generation = self.sample_generation()
+        if not self._occupy_worker(generation):
+            self._count('gateway_timeouts')
+            return 504, {'error': 'Gateway Timeout'}
+        self._count('ok')
+        return 200, {'image': PLACEHOLDER_IMAGE, 'generation_time': round(generation, 3)}
+
+    def handle_request(self, method: str, path: str, headers: Any, body: bytes) -> Response:
+        """Answer one HTTP request; subclasses route on path"""
+        if method != 'POST':
+            return json_response(405, {'error': 'Method Not Allowed'})
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return json_response(400, {'error': 'Invalid JSON'})
+        return json_response(*self.handle_swap(payload))
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, headers, data = server.handle_request(self.command, self.path, self.headers, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stand-in', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+# api_version -> route on the stand-in
+SEGMIND_ROUTES = {
+    '/v1/faceswap-v2': 'v2',
+    '/v1/faceswap-v4': 'v4',
+    '/v1/faceswap-v4.3': 'v4.3',
+}
+THORTFUL_ROUTE = '/api/v1/faceswap'
+
+# A 400 depends on the parameters that were sent, not on the server
+REQUEST_SPECIFIC_STATUSES = {400, 422}
+
+
+@dataclass(frozen=True)
+class Outcome:
+    """One logged response: status, duration and what the API reported"""
+    status: int
+    seconds: float
+    generation_time: Optional[float] = None
+    credits_used: Optional[float] = None
+    error: str = ''
+
+
+def outcome_from_row(row: Dict[str, str]) -> Optional[Outcome]:
+    """Outcome of a normalised log row, or None if it cannot be replayed"""
+    success = parse_bool(row.get('success'))
+    seconds = parse_float(row.get('request_duration_seconds'))
+    if success is None or seconds is None:
+        return None
+    if success:
+        return Outcome(200, seconds, parse_float(row.get('api_generation_time')),
+                       parse_float(row.get('credits_used')))
+    message = row.get('error_message') or ''
+    status = int(parse_float(row.get('http_status_code')) or 0)
+    match = re.match(r'HTTP (\d{3}): ?(.*)', message, re.S)
+    if not status and match:
+        status = int(match.group(1))
+    if not status:
+        # Client-side timeouts: the server was still working when the client gave up
+        if parse_bool(row.get('timeout_occurred')) or 'timed out' in message.lower() or 'timeout' in message.lower():
+            status = 504
+        else:
+            return None
+    if status in REQUEST_SPECIFIC_STATUSES:
+        return None
+    return Outcome(status, seconds, error=(match.group(2) if match else message)[:500])
+
+
+class ReplayProfile:
+    """Logged outcomes per api_version, sampled with replacement"""
+
+    def __init__(self, outcomes: Optional[Dict[str, List[Outcome]]] = None,
+                 remaining_credits: Optional[float] = None):
+        self.outcomes = outcomes or {}
+        self.remaining_credits = remaining_credits
+
+    @classmethod
+    def from_logs(cls, paths: Optional[List[str]] = None) -> 'ReplayProfile':
+        outcomes: Dict[str, List[Outcome]] = {}
+        remaining_credits = None
+        for row in iter_all_request_rows(paths):
+            outcome = outcome_from_row(row)
+            if outcome is not None:
+                outcomes.setdefault(row.get('api_version') or 'unknown', []).append(outcome)
+            remaining_credits = parse_float(row.get('api_remaining_credits')) or remaining_credits
+        return cls(outcomes, remaining_credits)
+
+    def sample(self, api_version: str, rng: random.Random) -> Outcome:
+        """A random logged outcome, or a 20s success if the endpoint was never logged"""
+        outcomes = self.outcomes.get(api_version)
+        return rng.choice(outcomes) if outcomes else Outcome(200, 20.0, 18.0)
+
+    def summary(self) -> Dict[str, Dict[int, int]]:
+        """Outcome counts per api_version and status"""
+        counts: Dict[str, Dict[int, int]] = {}
+        for api_version, outcomes in sorted(self.outcomes.items()):
+            for outcome in outcomes:
+                counts.setdefault(api_version, {}).setdefault(outcome.status, 0)
+                counts[api_version][outcome.status] += 1
+        return counts
+
+
+def load_images(patterns: List[str], limit: int = 16) -> List[bytes]:
+    """Up to `limit` image files matching the glob patterns, as bytes"""
+    paths = sorted(path for pattern in patterns for path in glob.glob(pattern))[:limit]
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            images.append(f.read())
+    return images
+
+
+class ApiStandInServer(StandInServer):
+    """Segmind and Thortful routes replaying logged latency, errors and 504s"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, workers: int = 64,
+                 gateway_timeout: Optional[float] = None, time_scale: float = 1.0,
+                 profile: Optional[ReplayProfile] = None, images: Optional[Dict[str, List[bytes]]] = None,
+                 initial_credits: Optional[float] = None, seed: Optional[int] = None):
+        super().__init__(host, port, workers=workers, gateway_timeout=gateway_timeout, seed=seed)
+        self.time_scale = time_scale
+        self.profile = profile if profile is not None else ReplayProfile.from_logs()
+        if images is None:
+            root = get_project_root()
+            images = {
+                'segmind': load_images([os.path.join(root, 'test-results', 'results', '*_result.jpg')]),
+                'thortful': load_images([os.path.join(root, 'thortful-v4-single-face', 'results', '*.jpg')]),
+            }
+        self.images = images
+        self.credits = initial_credits if initial_credits is not None else (self.profile.remaining_credits or 1000.0)
+        self._credits_lock = threading.Lock()
+
+    def _sample(self, api_version: str) -> Outcome:
+        with self._random_lock:
+            return self.profile.sample(api_version, self._random)
+
+    def _image(self, kind: str) -> bytes:
+        images = self.images.get(kind)
+        if not images:
+            return base64.b64decode(PLACEHOLDER_IMAGE)
+        with self._random_lock:
+            return self._random.choice(images)
+
+    def _replay(self, api_version: str) -> Tuple[Optional[Outcome], float]:
+        """Sample an outcome and spend its (scaled) time on a worker; None if the gateway gave up"""
+        self._count('requests')
+        outcome = self._sample(api_version)
+        if not self._occupy_worker(outcome.seconds * self.time_scale):
+            self._count('gateway_timeouts')
+            return None, 0.0
+        self._count('ok' if outcome.status == 200 else 'gateway_timeouts' if outcome.status == 504 else 'errors')
+        with self._credits_lock:
+            if outcome.status == 200:
+                self.credits -= outcome.credits_used or 0.0
+            credits = self.credits
+        return outcome, credits
+
+    def handle_request(self, method: str, path: str, headers: Any, body: bytes) -> Response:
+        route = urlsplit(path).path.rstrip('/')
+        if method != 'POST':
+            return json_response(405, {'error': 'Method Not Allowed'})
+        if route in SEGMIND_ROUTES:
+            return self.handle_segmind(SEGMIND_ROUTES[route], headers)
+        if route == THORTFUL_ROUTE:
+            return self.handle_thortful(headers)
+        if route == '/api/v1/auth/enquire':
+            return json_response(201, {'anonymous_token': f"stand-in-anonymous-{uuid.uuid4().hex}"})
+        if route == '/api/v1/auth/thortful/login':
+            form = parse_qs(body.decode('utf-8', errors='replace'))
+            if not form.get('anonymous_token'):
+                return json_response(400, {'error': 'anonymous_token is required'})
+            return json_response(200, {'token': f"stand-in-user-{uuid.uuid4().hex}",
+                                       'user_id': '66aa45f0a15a6b1394759d25'})
+        return json_response(404, {'error': f"No stand-in route for {route}"})
+
+    def handle_segmind(self, api_version: str, headers: Any) -> Response:
+        if not headers.get('x-api-key'):
+            return json_response(401, {'error': 'Invalid API key'})
+        outcome, credits = self._replay(api_version)
+        request_id = str(uuid.uuid4())
+        if outcome is None or outcome.status == 504:
+            return 504, {'Content-Type': 'text/html'}, b'<html><head><title>504 Gateway Time-out</title></head></html>'
+        if outcome.status != 200:
+            return outcome.status, {'Content-Type': 'application/json', 'X-Request-ID': request_id}, \
+                outcome.error.encode('utf-8')
+        generation_time = (outcome.generation_time if outcome.generation_time is not None
+                           else outcome.seconds) * self.time_scale
+        return 200, {
+            'Content-Type': 'image/jpeg',
+            'X-generation-time': f"{generation_time:.3f}",
+            'X-remaining-credits': f"{credits:.10f}",
+            'X-Request-ID': request_id,
+        }, self._image('segmind')
+
+    def handle_thortful(self, headers: Any) -> Response:
+        if not headers.get('user_token'):
+            return json_response(403, {'title': 'Forbidden', 'status': 403})
+        outcome, _ = self._replay('v4-thortful')
+        if outcome is None or outcome.status == 504:
+            return 504, {'Content-Type': 'text/html'}, b'<html><head><title>504 Gateway Time-out</title></head></html>'
+        if outcome.status != 200:
+            return outcome.status, {'Content-Type': 'text/html'}, outcome.error.encode('utf-8')
+        # Reported like the sleep, so generation never exceeds the (scaled) request time
+        generation_time = None if outcome.generation_time is None else outcome.generation_time * self.time_scale
+        return json_response(200, {'image': base64.b64encode(self._image('thortful')).decode('ascii'),
+                                   'generation_time': generation_time})
@@ -0,0 +1,309 @@
+"""
+A content-hashed, precompressed copy of the review site for static hosting
+
+The pages, their assets and the Thortful review data used to be served
+as they lie in the tree, so a browser could only revalidate each file and
+re-download it in full whenever anything about it might have changed.
+StaticSite builds the site into dist/ instead:
+
+  - Pages keep their names (they are what people link to) and have every
+    local file they reference (images, thumbnails, sprite sheets, CSS, JS,
+    JSON, CSV) rewritten to a content-hashed name, e.g.
+    assets/review.js?v=... -> assets/review.3f9a1c0b2d4e.js. A hashed file
+    never changes, so it can be cached forever; an edit gives it a new name.
+  - review-data/ shards get hashed names too, listed per shard as "file" in
+    the copied index.json, so a repeat visit refetches the index and only the
+    shards that changed.
+  - HTML, JSON, CSV, CSS, JS and SVG outputs get .gz and (with the optional
+    Brotli package) .br variants next to them, for servers that send
+    precompressed files as they are.
+  - dist/manifest.json maps each source path to its URL, content hash, size,
+    encodings and whether it is immutable.
+
+Files the pages only address by name at runtime (the Thortful images named
+in shard rows, review-data/index.json and stats.json) are added under their
+own names. Builds are incremental: a file whose mtime and size match the
+manifest is not re-hashed, an output already in place is not rewritten, and
+only new outputs are compressed, in a process pool. Outputs no longer part
+of the site are removed.
+
+    site = StaticSite.load()
+    site.add_page('multiface_comparison.html')
+    site.add_review_data('thortful-v4-single-face/review-data')
+    site.add_file('thortful-v4-single-face/results/a.jpg', hashed=False)
+    site.finish()
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .common import ensure_directory_exists, file_signature, write_json_atomic
+
+STATE_VERSION = 1
+
+SITE_DIR = 'dist'
+HASH_LENGTH = 12
+
+COMPRESSED_EXTENSIONS = ('.html', '.json', '.csv', '.css', '.js', '.svg')
+# Below this the encoding headers cost about as much as compression saves
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Quality 11 runs at about 1 MB/s; the multi-megabyte pages get the much faster 9
+LARGE_BROTLI_QUALITY = 9
+LARGE_FILE_SIZE = 1 << 20
+
+# Below this many files to compress the pool's startup costs more than it saves
+POOL_THRESHOLD = 4
+
+# A local file name opening an attribute, srcset entry, url() or script string:
+# it may contain spaces (some source images do) but not quotes, brackets,
+# commas or newlines
+_REFERENCE = re.compile(
+    r'(?<=["\'(,=])\s*([^"\'()<>\s,=#][^"\'()<>\n,]*?'
+    r'\.(?:jpe?g|png|gif|webp|avif|svg|ico|css|js|json|csv))(\?[^"\'()<>\s]*)?(?=["\'),\s])',
+    re.IGNORECASE)
+
+
+def _content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hashed(name: str, sha: str) -> str:
+    root, extension = os.path.splitext(name)
+    return f"{root}.{sha[:HASH_LENGTH]}{extension}"
+
+
+def _write(path: str, content: bytes) -> None:
+    ensure_directory_exists(os.path.dirname(path) or '.')
+    with open(path + '.tmp', 'wb') as f:
+        f.write(content)
+    os.replace(path + '.tmp', path)
+
+
+def _compress(path: str) -> Tuple[str, List[str]]:
+    """Write path.gz and path.br where they are smaller; returns the encodings written"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    variants = [('gzip', '.gz', lambda: gzip.compress(content, GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        quality = LARGE_BROTLI_QUALITY if len(content) > LARGE_FILE_SIZE else BROTLI_QUALITY
+        variants.append(('br', '.br', lambda: brotli.compress(content, quality=quality)))
+    encodings = []
+    for encoding, suffix, compress in variants:
+        compressed = compress()
+        if len(compressed) < len(content):
+            _write(path + suffix, compressed)
+            encodings.append(encoding)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return path, encodings
+
+
+class StaticSite:
+    """The review site under dist/: pages under their own names, everything they reference content-hashed"""
+
+    def __init__(self, site_dir: str = SITE_DIR, state: Optional[Dict[str, Any]] = None,
+                 stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature):
+        self.site_dir = site_dir
+        self.stat = stat
+        self.previous: Dict[str, Dict[str, Any]] = (state or {}).get('files', {})
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.written = 0
+        self.unchanged = 0
+        self.compressed = 0
+        self.removed = 0
+        # output path -> source path, for outputs whose .gz/.br are missing or stale
+        self._compress: Dict[str, str] = {}
+        self._local: Dict[Tuple[str, str], Optional[str]] = {}
+        self._site_prefix = os.path.normpath(site_dir) + os.sep
+
+    def _output(self, url: str) -> str:
+        return os.path.join(self.site_dir, *url.split('/'))
+
+    def _record(self, path: str, url: str, sha: str, size: int, immutable: bool,
+                signature: Optional[Tuple[int, int]] = None, content: Optional[bytes] = None) -> None:
+        entry = {'url': url, 'sha256': sha, 'size': size, 'immutable': immutable}
+        if signature is not None:
+            entry['signature'] = list(signature)
+        previous = self.previous.get(path)
+        output = self._output(url)
+        if previous and previous['url'] == url and previous['sha256'] == sha and os.path.exists(output):
+            entry['encodings'] = previous.get('encodings', [])
+            self.unchanged += 1
+        else:
+            if content is None:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            _write(output, content)
+            entry['encodings'] = []
+            if url.lower().endswith(COMPRESSED_EXTENSIONS) and size >= MIN_COMPRESS_SIZE:
+                self._compress[output] = path
+            self.written += 1
+        self.files[path] = entry
+
+    def add_file(self, path: str, hashed: bool = True) -> str:
+        """Add a file as it is, under a content-hashed name unless hashed=False; returns its URL"""
+        path = os.path.normpath(path)
+        entry = self.files.get(path)
+        if entry is not None:
+            return entry['url']
+        signature = self.stat(path)
+        previous = self.previous.get(path)
+        if previous and signature is not None and previous.get('signature') == list(signature):
+            sha, size = previous['sha256'], previous['size']
+        else:
+            sha, size = _content_hash(path), os.path.getsize(path)
+        url = path.replace(os.sep, '/')
+        self._record(path, _hashed(url, sha) if hashed else url, sha, size, hashed, signature)
+        return self.files[path]['url']
+
+    def _resolve(self, base_dir: str, value: str) -> Optional[str]:
+        """The tree path a page's reference points at, or None if it is not a local file"""
+        key = (base_dir, value)
+        if key not in self._local:
+            path = None
+            if not value.startswith(('/', 'data:')) and '://' not in value:
+                candidate = os.path.normpath(os.path.join(base_dir, unquote(value)))
+                if (not candidate.startswith('..') and not candidate.startswith(self._site_prefix)
+                        and os.path.isfile(candidate)):
+                    path = candidate
+            self._local[key] = path
+        return self._local[key]
+
+    def add_page(self, path: str) -> str:
+        """
+        Add a page under its own name, with its references to local files rewritten to hashed ones
+
+        Files already added with hashed=False stay referenced by name, so add
+        those first.
+        """
+        path = os.path.normpath(path)
+        base_dir = os.path.dirname(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+        # A page names most of its images several times (thumbnail, srcset, modal)
+        replacements: Dict[str, str] = {}
+
+        def replace(match):
+            reference = match.group(0)
+            replacement = replacements.get(reference)
+            if replacement is None:
+                replacement = reference
+                value = match.group(1)
+                target = self._resolve(base_dir, value)
+                if target is not None:
+                    self.add_file(target)
+                    entry = self.files[target]
+                    if entry['immutable']:
+                        replacement = reference[:match.start(1) - match.start()] + _hashed(value, entry['sha256'])
+                replacements[reference] = replacement
+            return replacement
+
+        content = _REFERENCE.sub(replace, text).encode('utf-8')
+        self._record(path, path.replace(os.sep, '/'), hashlib.sha256(content).hexdigest(), len(content),
+                     immutable=False, content=content)
+        return self.files[path]['url']
+
+    def add_review_data(self, data_dir: str) -> int:
+        """
+        Add a review-data/ directory: shards under hashed names, named in its index.json
+
+        The index keeps its name (the page fetches it uncached) and gains a
+        "file" per shard; stats.json is added as it is. Returns the number
+        of shards.
+        """
+        data_dir = os.path.normpath(data_dir)
+        index_path = os.path.join(data_dir, 'index.json')
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        for number, shard in enumerate(index.get('shards', [])):
+            url = self.add_file(os.path.join(data_dir, f"shard_{number:05d}.json"))
+            shard['file'] = url.rsplit('/', 1)[-1]
+        content = json.dumps(index, separators=(',', ':')).encode('utf-8')
+        self._record(index_path, index_path.replace(os.sep, '/'), hashlib.sha256(content).hexdigest(),
+                     len(content), immutable=False, content=content)
+        stats_path = os.path.join(data_dir, 'stats.json')
+        if os.path.exists(stats_path):
+            self.add_file(stats_path, hashed=False)
+        return len(index.get('shards', []))
+
+    def compress(self, workers: Optional[int] = None) -> int:
+        """Write .gz/.br variants of the outputs added since the last build; returns how many"""
+        jobs = sorted(self._compress)
+        if not jobs:
+            return 0
+        if len(jobs) < POOL_THRESHOLD or workers == 1:
+            results = [_compress(job) for job in jobs]
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_compress, jobs))
+        for output, encodings in results:
+            self.files[self._compress[output]]['encodings'] = encodings
+        self.compressed += len(jobs)
+        self._compress = {}
+        return len(jobs)
+
+    def _prune(self) -> None:
+        """Remove outputs (and their variants) that are no longer part of the site"""
+        expected: Set[str] = {os.path.join(self.site_dir, 'manifest.json')}
+        for entry in self.files.values():
+            output = self._output(entry['url'])
+            expected.update((output, output + '.gz', output + '.br'))
+        for directory, _, names in os.walk(self.site_dir):
+            for name in names:
+                path = os.path.join(directory, name)
+                if path not in expected:
+                    os.remove(path)
+                    self.removed += 1
+
+    def summary(self) -> str:
+        text = (f"{len(self.files)} files: {self.written} written, {self.unchanged} unchanged, "
+                f"{self.compressed} compressed, {self.removed} removed")
+        if brotli is None:
+            text += " (gzip only, pip install Brotli for .br)"
+        return text
+
+    def finish(self, workers: Optional[int] = None) -> None:
+        """Compress new outputs, drop stale ones and write the manifest atomically"""
+        self.compress(workers)
+        ensure_directory_exists(self.site_dir)
+        self._prune()
+        write_json_atomic(os.path.join(self.site_dir, 'manifest.json'),
+                          {'version': STATE_VERSION, 'brotli': brotli is not None, 'files': self.files})
+
+    @classmethod
+    def load(cls, site_dir: str = SITE_DIR,
+             stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature) -> 'StaticSite':
+        """
+        The site as last built into site_dir, so unchanged files are skipped
+
+        Starts empty (rebuilding every output) if the manifest is missing, was
+        written by another version, or Brotli was installed or removed since.
+        """
+        manifest_path = os.path.join(site_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as f:
+                    state = json.load(f)
+            except ValueError:
+                state = {}
+            if state.get('version') == STATE_VERSION and state.get('brotli') == (brotli is not None):
+                return cls(site_dir, state, stat)
+        return cls(site_dir, stat=stat)
@@ -0,0 +1,321 @@
+"""
+Pre-aggregated request statistics per API, card, source and session
+
+The review pages each recomputed their headline numbers on every build
+(generate_multiface_comparison summed generation_time over every metadata
+file) or in the browser from the raw CSV. StatsRollups folds the request
+logs into rollups of count, success, timeouts, API generation time, credits
+used and a mergeable latency histogram, keyed like the latency histograms:
+
+    api       v2
+    card      v2|target_03
+    source    v2|source_01
+    session   v2|2025-07-23T10:15:02   (the calendar day for the Thortful log)
+
+Rollups are kept per log, so a log that is rewritten, shrinks or gets new
+exclusion segments is re-read on its own, and a page can merge just the
+logs it covers. Updates resume from each log's byte offset. write_stats()
+turns the merged rollups into the compact stats JSON the pages load:
+
+    rollups = load_stats_rollups()              # also refreshes stats.json
+    rollups.merged('api')['v2'].summary()
+    load_stats_rollups([log_path], 'review-data/stats.json')
+"""
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from .common import get_project_root, write_json_atomic
+from .latency_histogram import REPORT_PERCENTILES, LatencyHistogram, row_dimensions
+from .request_logs import (exclusions_fingerprint, find_request_logs, iter_request_rows_from, parse_bool,
+                           parse_float)
+
+STATE_VERSION = 1
+STATS_VERSION = 1
+
+DIMENSIONS = ['api', 'card', 'source', 'session']
+
+
+def row_keys(row: Dict[str, str]) -> Dict[str, str]:
+    """Rollup keys for one normalised log row"""
+    dimensions = row_dimensions(row)
+    endpoint = dimensions['endpoint']
+    source = os.path.splitext(row.get('source_image') or '')[0] or 'unknown'
+    return {
+        'api': endpoint,
+        'card': dimensions['card'],
+        'source': f"{endpoint}|{source}",
+        'session': dimensions['session'],
+    }
+
+
+def _round(value: Optional[float], digits: int = 3) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+class Rollup:
+    """Counts, generation time, credits and request latency of one group of rows"""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.count: int = data.get('count', 0)
+        self.success: int = data.get('success', 0)
+        self.timeouts: int = data.get('timeouts', 0)
+        self.generation_sum: float = data.get('generation_sum', 0.0)
+        self.generation_count: int = data.get('generation_count', 0)
+        self.credits_used: float = data.get('credits_used', 0.0)
+        # Remaining credits as of the latest row that reported them
+        self.credits_remaining: Optional[float] = data.get('credits_remaining')
+        self.credits_at: str = data.get('credits_at', '')
+        self.first_seen: str = data.get('first_seen', '')
+        self.last_seen: str = data.get('last_seen', '')
+        self.latency = LatencyHistogram.from_dict(data['latency']) if 'latency' in data else LatencyHistogram()
+
+    def add(self, row: Dict[str, str], credits_used: Optional[float] = None) -> None:
+        self.count += 1
+        success = parse_bool(row.get('success')) is True
+        self.success += success
+        if parse_bool(row.get('timeout_occurred')) or row.get('error_type') == 'timeout':
+            self.timeouts += 1
+        generation_time = parse_float(row.get('api_generation_time'))
+        if success and generation_time is not None:
+            self.generation_sum += generation_time
+            self.generation_count += 1
+        if credits_used:
+            self.credits_used += credits_used
+        timestamp = row.get('timestamp') or ''
+        remaining = parse_float(row.get('api_remaining_credits'))
+        if remaining is not None and timestamp >= self.credits_at:
+            self.credits_remaining, self.credits_at = remaining, timestamp
+        if timestamp:
+            self.first_seen = min(self.first_seen or timestamp, timestamp)
+            self.last_seen = max(self.last_seen, timestamp)
+        seconds = parse_float(row.get('request_duration_seconds'))
+        if seconds is not None:
+            self.latency.record(seconds)
+
+    def merge(self, other: 'Rollup') -> 'Rollup':
+        """Add another rollup's rows into this one"""
+        self.count += other.count
+        self.success += other.success
+        self.timeouts += other.timeouts
+        self.generation_sum += other.generation_sum
+        self.generation_count += other.generation_count
+        self.credits_used += other.credits_used
+        if other.credits_remaining is not None and other.credits_at >= self.credits_at:
+            self.credits_remaining, self.credits_at = other.credits_remaining, other.credits_at
+        if other.first_seen:
+            self.first_seen = min(self.first_seen or other.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.latency.merge(other.latency)
+        return self
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        return self.success / self.count if self.count else None
+
+    @property
+    def generation_mean(self) -> Optional[float]:
+        return self.generation_sum / self.generation_count if self.generation_count else None
+
+    def summary(self, percentiles: Iterable[float] = REPORT_PERCENTILES) -> Dict[str, Any]:
+        """Compact figures for the stats JSON; times in seconds"""
+        latency = self.latency.summary(percentiles)
+        return {
+            'count': self.count,
+            'success': self.success,
+            'success_rate': _round(self.success_rate, 4),
+            'timeouts': self.timeouts,
+            'generation_mean': _round(self.generation_mean),
+            'credits_used': _round(self.credits_used),
+            'credits_remaining': self.credits_remaining,
+            'first_seen': self.first_seen or None,
+            'last_seen': self.last_seen or None,
+            'latency': {key: _round(value) if key != 'count' else value for key, value in latency.items()},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'success': self.success,
+            'timeouts': self.timeouts,
+            'generation_sum': self.generation_sum,
+            'generation_count': self.generation_count,
+            'credits_used': self.credits_used,
+            'credits_remaining': self.credits_remaining,
+            'credits_at': self.credits_at,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'latency': self.latency.to_dict(),
+        }
+
+
+class LogRollups:
+    """Rollups of one request log and where reading it stopped"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.offset: int = state.get('offset', 0)
+        self.exclusions: Optional[str] = state.get('exclusions')
+        # api_version -> last api_remaining_credits seen, to derive credits used
+        self.credits: Dict[str, float] = state.get('credits', {})
+        self.rollups: Dict[str, Dict[str, Rollup]] = {
+            dimension: {key: Rollup(data) for key, data in state.get('rollups', {}).get(dimension, {}).items()}
+            for dimension in DIMENSIONS
+        }
+
+    def _credits_used(self, row: Dict[str, str], endpoint: str) -> Optional[float]:
+        """credits_used if logged, else the drop in remaining credits since the endpoint's previous row"""
+        used = parse_float(row.get('credits_used'))
+        remaining = parse_float(row.get('api_remaining_credits'))
+        if remaining is not None:
+            previous = self.credits.get(endpoint)
+            self.credits[endpoint] = remaining
+            if used is None and previous is not None and previous > remaining:
+                used = previous - remaining
+        return used
+
+    def add(self, row: Dict[str, str]) -> None:
+        keys = row_keys(row)
+        credits_used = self._credits_used(row, keys['api'])
+        for dimension, key in keys.items():
+            rollup = self.rollups[dimension].get(key)
+            if rollup is None:
+                rollup = self.rollups[dimension][key] = Rollup()
+            rollup.add(row, credits_used)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'offset': self.offset,
+            'exclusions': self.exclusions,
+            'credits': self.credits,
+            'rollups': {dimension: {key: rollup.to_dict() for key, rollup in sorted(keys.items())}
+                        for dimension, keys in self.rollups.items()},
+        }
+
+
+class StatsRollups:
+    """Per-log rollups of every request log, merged on demand"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.logs: Dict[str, LogRollups] = {path: LogRollups(data) for path, data in state.get('logs', {}).items()}
+        self.dirty = False
+
+    def update_from_csv(self, csv_path: str) -> int:
+        """Fold in rows appended to a request log since the last update"""
+        csv_path = os.path.abspath(csv_path)
+        exclusions = exclusions_fingerprint(csv_path)
+        log = self.logs.get(csv_path)
+        if log is None or os.path.getsize(csv_path) < log.offset or log.exclusions != exclusions:
+            # New, rewritten or re-excluded: its rollups are rebuilt from the start
+            log = self.logs[csv_path] = LogRollups({'exclusions': exclusions})
+            self.dirty = True
+        added = 0
+        for row, end_offset in iter_request_rows_from(csv_path, log.offset):
+            log.add(row)
+            log.offset = end_offset
+            added += 1
+        self.dirty = self.dirty or bool(added)
+        return added
+
+    def update(self, csv_paths: Optional[List[str]] = None) -> int:
+        """Incrementally consume every request log, dropping logs that no longer exist"""
+        csv_paths = csv_paths if csv_paths is not None else find_request_logs()
+        for path in list(self.logs):
+            if not os.path.exists(path):
+                del self.logs[path]
+                self.dirty = True
+        return sum(self.update_from_csv(path) for path in csv_paths)
+
+    def _selected(self, logs: Optional[Iterable[str]]) -> List[str]:
+        if logs is None:
+            return list(self.logs)
+        wanted = {os.path.abspath(path) for path in logs}
+        return [path for path in self.logs if path in wanted]
+
+    def merged(self, dimension: str, logs: Optional[Iterable[str]] = None) -> Dict[str, Rollup]:
+        """One dimension's rollups merged across logs (all of them by default)"""
+        merged: Dict[str, Rollup] = {}
+        for path in self._selected(logs):
+            for key, rollup in self.logs[path].rollups[dimension].items():
+                merged.setdefault(key, Rollup()).merge(rollup)
+        return merged
+
+    def stats(self, logs: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """The stats JSON document: totals plus a summary per key of each dimension"""
+        selected = self._selected(logs)
+        dimensions = {dimension: self.merged(dimension, selected) for dimension in DIMENSIONS}
+        total = Rollup()
+        for rollup in dimensions['api'].values():
+            total.merge(rollup)
+        root = get_project_root()
+        return {
+            'version': STATS_VERSION,
+            'generated': datetime.now().isoformat(),
+            'logs': sorted(os.path.relpath(path, root) for path in selected),
+            'total': total.summary(),
+            **{dimension: {key: rollup.summary() for key, rollup in sorted(rollups.items())}
+               for dimension, rollups in dimensions.items()},
+        }
+
+    def write_stats(self, stats_path: str, logs: Optional[Iterable[str]] = None) -> None:
+        """Write the stats JSON atomically"""
+        write_json_atomic(stats_path, self.stats(logs))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'updated': datetime.now().isoformat(),
+            'logs': {path: log.to_state() for path, log in sorted(self.logs.items())},
+        }
+
+    def save(self, state_path: str) -> None:
+        """Write state atomically, and only if a log had new rows"""
+        if not self.dirty:
+            return
+        write_json_atomic(state_path, self.to_state())
+        self.dirty = False
+
+    @classmethod
+    def load(cls, state_path: str) -> 'StatsRollups':
+        """Load saved state, or start empty if none exists or the format changed"""
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, 'r') as f:
+                    state = json.load(f)
+            except ValueError:
+                return cls()
+            if state.get('version') == STATE_VERSION:
+                return cls(state)
+        return cls()
+
+
+def default_state_path() -> str:
+    return os.path.join(get_project_root(), '.cache', 'stats_rollups.json')
+
+
+def default_stats_path() -> str:
+    """stats.json next to index.html"""
+    return os.path.join(get_project_root(), 'stats.json')
+
+
+def load_stats_rollups(logs: Optional[List[str]] = None, stats_path: Optional[str] = None,
+                       state_path: Optional[str] = None) -> StatsRollups:
+    """
+    Load saved rollups, fold in new log rows and refresh a stats JSON
+
+    logs defaults to every request log and stats_path to stats.json next to
+    index.html. The stats JSON is rewritten when it is older than the saved
+    state, so a file covering some logs notices updates made for another.
+    """
+    state_path = state_path or default_state_path()
+    stats_path = stats_path or default_stats_path()
+    rollups = StatsRollups.load(state_path)
+    rollups.update(logs)
+    rollups.save(state_path)
+    if not os.path.exists(stats_path) or (
+            os.path.exists(state_path) and os.path.getmtime(stats_path) < os.path.getmtime(state_path)):
+        rollups.write_stats(stats_path, logs)
+    return rollups
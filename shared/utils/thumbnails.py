@@ -0,0 +1,214 @@
+"""
+Multi-size thumbnails of the review images
+
+The review pages used to embed every source, target and result image at
+full size (test-results/ alone is 55 MB). ThumbnailStore renders each image
+at THUMBNAIL_WIDTHS into thumbnails/<width>/<image path>.webp (JPEG if
+Pillow lacks WebP support), in a process pool. JPEGs are decoded with
+Pillow's draft mode, which lets libjpeg scale by 1/2, 1/4 or 1/8 while
+decoding instead of decoding at full size and then resizing.
+
+thumbnails/manifest.json records each image's mtime, size and content hash.
+An image whose mtime and size are unchanged is skipped without being read.
+If they changed but the content hash did not, the image is skipped too, so
+a rerun that rewrites identical bytes costs one hash. Deleting thumbnails/
+removes the manifest with it and forces a full rebuild.
+
+    thumbnails = ThumbnailStore.load(stat=index.stat)
+    thumbnails.update(image_paths)
+    html += f'<img class="test-image" {thumbnail_attrs(path)} onclick="openModal(\'{path}\')">'
+    thumbnails.save()
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+from .common import file_signature, write_json_atomic
+
+STATE_VERSION = 1
+
+THUMBNAIL_DIR = 'thumbnails'
+# 1x and 2x of the 60px source previews (120, 240) and 200px grid cells (240, 480)
+THUMBNAIL_WIDTHS = (120, 240, 480)
+
+if Image is None:
+    THUMBNAIL_FORMAT = None
+elif features.check('webp'):
+    THUMBNAIL_FORMAT = 'WEBP'
+else:
+    THUMBNAIL_FORMAT = 'JPEG'
+
+# Below this many stale images the pool's startup costs more than it saves
+POOL_THRESHOLD = 8
+
+
+def _content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def thumbnail_path(image_path: str, width: int, thumbnail_dir: str = THUMBNAIL_DIR) -> str:
+    """Where an image's thumbnail of a given width lives, relative to the pages"""
+    relative = os.path.normpath(image_path).lstrip(os.sep).replace('..', '__')
+    extension = '.jpg' if THUMBNAIL_FORMAT == 'JPEG' else '.webp'
+    return f"{thumbnail_dir}/{width}/{os.path.splitext(relative)[0].replace(os.sep, '/')}{extension}"
+
+
+def thumbnail_attrs(image_path: str, width: int = THUMBNAIL_WIDTHS[1]) -> str:
+    """
+    src/srcset attributes showing an image's thumbnail at 1x and 2x, falling back to the original
+
+    Without Pillow only the original's src is returned. The full-size image
+    stays the click target (openModal) and the fallback if a thumbnail fails.
+    """
+    if THUMBNAIL_FORMAT is None:
+        return f'src="{image_path}"'
+    # Quoted: srcset splits on whitespace, and some source names contain spaces
+    return (f'src="{quote(thumbnail_path(image_path, width))}" srcset="{quote(thumbnail_path(image_path, width * 2))} 2x" '
+            f'loading="lazy" onerror="this.onerror=null;this.srcset=\'\';this.src=\'{image_path}\'"')
+
+
+def _render(job: Tuple[str, List[Tuple[int, str]]]) -> Tuple[str, Optional[str]]:
+    """Write one image's thumbnails, largest first; returns (path, error)"""
+    image_path, outputs = job
+    try:
+        with Image.open(image_path) as img:
+            largest = max(width for width, _ in outputs)
+            if img.width > largest:
+                # JPEG only: decode at the smallest 1/n scale that still covers the largest thumbnail
+                img.draft('RGB', (largest, max(1, img.height * largest // img.width)))
+            thumb = img.convert('RGB' if THUMBNAIL_FORMAT == 'JPEG' or img.mode not in ('RGBA', 'LA') else 'RGBA')
+        for width, out_path in sorted(outputs, reverse=True):
+            if thumb.width > width:
+                thumb = thumb.resize((width, max(1, round(thumb.height * width / thumb.width))),
+                                     Image.LANCZOS, reducing_gap=2.0)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            tmp_path = out_path + '.tmp'
+            if THUMBNAIL_FORMAT == 'WEBP':
+                thumb.save(tmp_path, 'WEBP', quality=80, method=2)
+            else:
+                thumb.save(tmp_path, 'JPEG', quality=82, optimize=True, progressive=True)
+            os.replace(tmp_path, out_path)
+    except Exception as e:
+        return image_path, type(e).__name__
+    return image_path, None
+
+
+class ThumbnailStore:
+    """Thumbnails under one directory, re-rendered only when their image's content changes"""
+
+    def __init__(self, thumbnail_dir: str = THUMBNAIL_DIR, state: Optional[Dict[str, Any]] = None,
+                 stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature,
+                 widths: Tuple[int, ...] = THUMBNAIL_WIDTHS):
+        self.thumbnail_dir = thumbnail_dir
+        self.stat = stat
+        self.widths = tuple(widths)
+        # image path -> {'mtime_ns': int, 'size': int, 'sha256': str[, 'error': str]}
+        self.images: Dict[str, Dict[str, Any]] = (state or {}).get('images', {})
+        self.errors: Dict[str, str] = {}
+        # Images already checked by this store, so pages sharing one build check each image once
+        self._checked: Set[str] = set()
+        self.rendered = 0
+        self.unchanged = 0
+        self.dirty = False
+
+    def _outputs(self, image_path: str) -> List[Tuple[int, str]]:
+        return [(width, thumbnail_path(image_path, width, self.thumbnail_dir)) for width in self.widths]
+
+    def update(self, image_paths: Iterable[str], workers: Optional[int] = None) -> int:
+        """Render thumbnails for new or changed images; returns how many were rendered"""
+        if THUMBNAIL_FORMAT is None:
+            return 0
+        stale = []
+        for image_path in dict.fromkeys(image_paths):
+            if image_path in self._checked:
+                continue
+            self._checked.add(image_path)
+            signature = self.stat(image_path)
+            if signature is None:
+                continue
+            entry = self.images.get(image_path)
+            if entry and (entry['mtime_ns'], entry['size']) == signature:
+                if 'error' in entry:
+                    self.errors[image_path] = entry['error']
+                else:
+                    self.unchanged += 1
+                continue
+            sha256 = _content_hash(image_path)
+            if entry and entry['sha256'] == sha256 and 'error' not in entry:
+                entry['mtime_ns'], entry['size'] = signature
+                self.unchanged += 1
+                self.dirty = True
+                continue
+            stale.append((image_path, signature, sha256))
+
+        jobs = [(image_path, self._outputs(image_path)) for image_path, _, _ in stale]
+        if len(jobs) < POOL_THRESHOLD:
+            errors = dict(map(_render, jobs))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                errors = dict(executor.map(_render, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+        rendered = 0
+        for image_path, signature, sha256 in stale:
+            entry = self.images[image_path] = {'mtime_ns': signature[0], 'size': signature[1], 'sha256': sha256}
+            if errors[image_path]:
+                # Remembered so an unreadable image is not retried until it changes
+                entry['error'] = self.errors[image_path] = errors[image_path]
+                continue
+            rendered += 1
+        self.rendered += rendered
+        self.dirty = self.dirty or bool(stale)
+        return rendered
+
+    def summary(self) -> str:
+        if THUMBNAIL_FORMAT is None:
+            return "Pillow not installed, pages use full-size images"
+        text = f"rendered {self.rendered}, {self.unchanged} unchanged"
+        if self.errors:
+            text += f", {len(self.errors)} failed (shown full size)"
+        return text
+
+    def save(self) -> None:
+        """Write the manifest atomically, and only if an image was rendered or re-hashed"""
+        if not self.dirty:
+            return
+        write_json_atomic(os.path.join(self.thumbnail_dir, 'manifest.json'),
+                          {'version': STATE_VERSION, 'format': THUMBNAIL_FORMAT, 'widths': self.widths,
+                           'images': self.images})
+        self.dirty = False
+
+    @classmethod
+    def load(cls, thumbnail_dir: str = THUMBNAIL_DIR,
+             stat: Callable[[str], Optional[Tuple[int, int]]] = file_signature,
+             widths: Tuple[int, ...] = THUMBNAIL_WIDTHS) -> 'ThumbnailStore':
+        """
+        Thumbnails under a directory (relative to the pages that show them)
+
+        Starts empty if the manifest is missing, or if the format or sizes
+        changed. Pass a FileIndex's stat to share its once-per-pass checks,
+        and widths if the pages only need some of the sizes.
+        """
+        manifest_path = os.path.join(thumbnail_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r') as f:
+                    state = json.load(f)
+            except ValueError:
+                state = {}
+            if (state.get('version') == STATE_VERSION and state.get('format') == THUMBNAIL_FORMAT
+                    and tuple(state.get('widths', ())) == tuple(widths)):
+                return cls(thumbnail_dir, state, stat, widths)
+        return cls(thumbnail_dir, stat=stat, widths=widths)
@@ -0,0 +1,213 @@
+"""
+Per-endpoint request timeouts derived from observed latencies
+
+The runners used to hard-code timeouts (60s, 120s, 150s, 180s) that had
+drifted apart. TimeoutPolicy keeps a histogram of successful request
+durations per endpoint and of connection setup time (DNS + TCP + TLS, from
+the *_phases.csv sidecars), and derives:
+
+    read timeout    = p99.5 of successful durations x 1.2, within 30-300s
+    connect timeout = p99.9 of connection setup x 3, within 3-30s
+
+Endpoints with too few successes keep their previous hard-coded value.
+Like the latency histograms, state is saved in .cache/ with byte offsets
+so each update only reads log rows appended since the last one.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .common import get_project_root, write_json_atomic
+from .latency_histogram import LatencyHistogram
+from .phase_timing import phases_log_path
+from .request_logs import (
+    find_request_logs, iter_raw_records, iter_request_rows_from, parse_bool, parse_float,
+)
+
+STATE_VERSION = 1
+
+# (connect, read) used until an endpoint has MIN_SAMPLES successes
+DEFAULT_TIMEOUTS = {
+    'v4-thortful': (10.0, 180.0),
+    'v4.3': (10.0, 120.0),
+    'v4': (10.0, 120.0),
+    'v2': (10.0, 120.0),
+}
+FALLBACK_TIMEOUT = (10.0, 120.0)
+
+READ_PERCENTILE = 99.5
+READ_MARGIN = 1.2
+READ_BOUNDS = (30.0, 300.0)
+CONNECT_PERCENTILE = 99.9
+CONNECT_MARGIN = 3.0
+CONNECT_BOUNDS = (3.0, 30.0)
+MIN_SAMPLES = 50
+
+CONNECT_PHASES = ('phase_dns_seconds', 'phase_connect_seconds', 'phase_tls_seconds')
+
+Timeout = Tuple[float, float]
+
+
+def _clamp(value: float, bounds: Tuple[float, float]) -> float:
+    return max(bounds[0], min(bounds[1], value))
+
+
+class TimeoutPolicy:
+    """Success-latency and connection-setup histograms per endpoint"""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.success: Dict[str, LatencyHistogram] = {
+            endpoint: LatencyHistogram.from_dict(data) for endpoint, data in state.get('success', {}).items()}
+        self.connect: Dict[str, LatencyHistogram] = {
+            endpoint: LatencyHistogram.from_dict(data) for endpoint, data in state.get('connect', {}).items()}
+        self.offsets: Dict[str, int] = state.get('offsets', {})
+
+    def add(self, row: Dict[str, str]) -> None:
+        """Record a request log row; only successes with a duration count"""
+        if not parse_bool(row.get('success')):
+            return
+        seconds = parse_float(row.get('request_duration_seconds'))
+        if seconds is not None:
+            self.observe(row.get('api_version') or 'unknown', seconds)
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        """Record one successful request duration"""
+        self.success.setdefault(endpoint, LatencyHistogram()).record(seconds)
+
+    def add_phases(self, row: Dict[str, str]) -> None:
+        """Record connection setup from a phases sidecar row (reused connections have none)"""
+        parts = [parse_float(row.get(column)) for column in CONNECT_PHASES]
+        if all(part is None for part in parts):
+            return
+        endpoint = row.get('api_version') or 'unknown'
+        self.connect.setdefault(endpoint, LatencyHistogram()).record(sum(part or 0.0 for part in parts))
+
+    def update_from_csv(self, csv_path: str) -> int:
+        """Consume rows appended to a request log and its phases sidecar"""
+        added = 0
+        offset = self.offsets.get(csv_path, 0)
+        if os.path.getsize(csv_path) < offset:
+            offset = 0  # file was rewritten; start over
+        for row, end_offset in iter_request_rows_from(csv_path, offset):
+            self.add(row)
+            self.offsets[csv_path] = end_offset
+            added += 1
+
+        phases_path = phases_log_path(csv_path)
+        if os.path.exists(phases_path):
+            offset = self.offsets.get(phases_path, 0)
+            if os.path.getsize(phases_path) < offset:
+                offset = 0
+            for header, values, _, end_offset, _ in iter_raw_records(phases_path, offset):
+                self.add_phases(dict(zip(header, values)))
+                self.offsets[phases_path] = end_offset
+        return added
+
+    def update(self, csv_paths: Optional[List[str]] = None) -> int:
+        """Incrementally consume every request log"""
+        return sum(self.update_from_csv(path)
+                   for path in (csv_paths if csv_paths is not None else find_request_logs()))
+
+    def read_timeout(self, endpoint: str, percentile: float = READ_PERCENTILE,
+                     margin: float = READ_MARGIN) -> float:
+        histogram = self.success.get(endpoint)
+        if histogram is None or histogram.total < MIN_SAMPLES:
+            return DEFAULT_TIMEOUTS.get(endpoint, FALLBACK_TIMEOUT)[1]
+        return round(_clamp(histogram.percentile(percentile) * margin, READ_BOUNDS), 1)
+
+    def connect_timeout(self, endpoint: str) -> float:
+        histogram = self.connect.get(endpoint)
+        if histogram is None or histogram.total < MIN_SAMPLES:
+            return DEFAULT_TIMEOUTS.get(endpoint, FALLBACK_TIMEOUT)[0]
+        return round(_clamp(histogram.percentile(CONNECT_PERCENTILE) * CONNECT_MARGIN, CONNECT_BOUNDS), 1)
+
+    def timeout(self, endpoint: str) -> Timeout:
+        """(connect, read) tuple for requests' timeout= argument"""
+        return self.connect_timeout(endpoint), self.read_timeout(endpoint)
+
+    def cut_off(self, endpoint: str, timeout: float) -> Tuple[int, int]:
+        """(successes slower than timeout, total successes) for an endpoint"""
+        histogram = self.success.get(endpoint)
+        if histogram is None:
+            return 0, 0
+        return histogram.count_above(timeout), histogram.total
+
+    def report(self, endpoints: Optional[Iterable[str]] = None,
+               candidates: Iterable[float] = (60, 120, 150, 180)) -> List[Dict[str, Any]]:
+        """Per endpoint: success percentiles, derived timeouts and successes each timeout would cut off"""
+        rows = []
+        for endpoint in sorted(endpoints if endpoints is not None else self.success):
+            histogram = self.success.get(endpoint) or LatencyHistogram()
+            connect, read = self.timeout(endpoint)
+            rows.append({
+                'endpoint': endpoint,
+                'successes': histogram.total,
+                'latency': histogram.summary((50, 99, READ_PERCENTILE)),
+                'connect_timeout': connect,
+                'read_timeout': read,
+                'tuned': histogram.total >= MIN_SAMPLES,
+                'cut_off': {f"{timeout:g}": self.cut_off(endpoint, timeout)[0]
+                            for timeout in sorted(set(candidates) | {read})},
+            })
+        return rows
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'updated': datetime.now().isoformat(),
+            'offsets': self.offsets,
+            'success': {endpoint: histogram.to_dict() for endpoint, histogram in sorted(self.success.items())},
+            'connect': {endpoint: histogram.to_dict() for endpoint, histogram in sorted(self.connect.items())},
+        }
+
+    def save(self, state_path: str) -> None:
+        """Write state atomically so an interrupted run never corrupts it"""
+        write_json_atomic(state_path, self.to_state())
+
+    @classmethod
+    def load(cls, state_path: str) -> 'TimeoutPolicy':
+        """Load saved state, or start empty if none exists or the format changed"""
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return cls(state)
+        return cls()
+
+
+def default_state_path() -> str:
+    return os.path.join(get_project_root(), '.cache', 'timeout_policy.json')
+
+
+def load_timeout_policy(state_path: Optional[str] = None) -> TimeoutPolicy:
+    """Load the saved policy, fold in new log rows and save it back"""
+    state_path = state_path or default_state_path()
+    policy = TimeoutPolicy.load(state_path)
+    if policy.update():
+        policy.save(state_path)
+    return policy
+
+
+_policy: Optional[TimeoutPolicy] = None
+
+
+def request_timeout(endpoint: str) -> Timeout:
+    """
+    Current (connect, read) timeout for an endpoint
+
+    The policy is loaded once per process and then only reads rows appended
+    since the previous call, so a long batch tunes itself as it goes. Any
+    problem reading the logs falls back to the endpoint's default.
+    """
+    global _policy
+    try:
+        if _policy is None:
+            _policy = load_timeout_policy()
+        else:
+            _policy.update()
+        return _policy.timeout(endpoint)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Timeout policy unavailable ({e}); using defaults")
+        return DEFAULT_TIMEOUTS.get(endpoint, FALLBACK_TIMEOUT)
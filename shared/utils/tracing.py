@@ -0,0 +1,153 @@
+"""
+Chrome trace (Perfetto-compatible) export of pipeline stage spans
+
+Wrap each stage in tracing.span(); when tracing is enabled every span is
+recorded with its thread and written as Chrome trace event JSON on close,
+which chrome://tracing, https://ui.perfetto.dev and speedscope all open:
+
+    tracing.enable('logs/traces/trace_20250801_120000.json', runner='...')
+    with tracing.span('encode', file=path.name):
+        ...
+    tracing.close()
+
+When tracing is not enabled span() returns one shared no-op context
+manager, so instrumented code pays a function call and a global lookup.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .common import ensure_directory_exists
+
+_NOOP = nullcontext()
+
+# name, category, start ns, end ns, thread id, args
+Span = Tuple[str, str, int, int, int, Dict[str, Any]]
+
+
+class _SpanScope:
+    """Records one span on exit"""
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> '_SpanScope':
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.spans.append((self.name, self.category, self.start, time.perf_counter_ns(),
+                                  threading.get_ident(), self.args))
+
+
+class Tracer:
+    """Collects spans in memory and writes them as Chrome trace JSON"""
+
+    def __init__(self, path: str, **metadata: Any):
+        self.path = path
+        self.metadata = metadata
+        self.origin = time.perf_counter_ns()
+        self.wall_start = time.time()
+        # list.append is atomic, so spans from worker threads need no lock
+        self.spans: List[Span] = []
+
+    def span(self, name: str, category: str = 'stage', **args: Any) -> _SpanScope:
+        return _SpanScope(self, name, category, args)
+
+    def instant(self, name: str, **args: Any) -> None:
+        """Zero-length marker (e.g. a retry or a notification)"""
+        now = time.perf_counter_ns()
+        self.spans.append((name, 'mark', now, now, threading.get_ident(), args))
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        pid = os.getpid()
+        thread_ids: Dict[int, int] = {}
+        events: List[Dict[str, Any]] = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+            'args': {'name': self.metadata.get('runner', 'face swap run')},
+        }]
+        for name, category, start, end, thread, args in self.spans:
+            # Small stable thread numbers read better than raw idents
+            tid = thread_ids.setdefault(thread, len(thread_ids) + 1)
+            event = {'name': name, 'cat': category, 'pid': pid, 'tid': tid,
+                     'ts': (start - self.origin) / 1000, 'args': args}
+            if category == 'mark':
+                event.update(ph='i', s='t')
+            else:
+                event.update(ph='X', dur=(end - start) / 1000)
+            events.append(event)
+        for thread, tid in thread_ids.items():
+            label = 'main' if thread == threading.main_thread().ident else f'worker {tid}'
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': label}})
+        return events
+
+    def write(self) -> str:
+        ensure_directory_exists(os.path.dirname(self.path) or '.')
+        metadata = dict(self.metadata, wall_start=datetime.fromtimestamp(self.wall_start).isoformat())
+        with open(self.path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms',
+                       'otherData': metadata}, f, default=str)
+        return self.path
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(path: str, **metadata: Any) -> Tracer:
+    """Start recording spans for this process"""
+    global _tracer
+    _tracer = Tracer(path, **metadata)
+    return _tracer
+
+
+def span(name: str, category: str = 'stage', **args: Any):
+    """Context manager timing one stage (no-op unless tracing is enabled)"""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.span(name, category, **args)
+
+
+def traced(name: str, category: str = 'stage') -> Callable:
+    """Decorator recording each call of a function as a span"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instant(name: str, **args: Any) -> None:
+    if _tracer is not None:
+        _tracer.instant(name, **args)
+
+
+def close() -> Optional[str]:
+    """Write the trace file and stop recording; returns its path"""
+    global _tracer
+    if _tracer is None:
+        return None
+    tracer, _tracer = _tracer, None
+    path = tracer.write()
+    print(f"🧵 Trace with {len(tracer.spans)} spans written to {path}")
+    return path
+
+
+def default_trace_path(logs_dir: str) -> str:
+    """Per-session trace file under <logs_dir>/traces/"""
+    return os.path.join(logs_dir, 'traces', f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
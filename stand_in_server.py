@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Run the local Segmind/Thortful stand-in until interrupted
+
+Serves /v1/faceswap-v2, -v4, -v4.3, the Thortful /api/v1/faceswap and
+/api/v1/auth/* routes, replaying latency, error and 504 outcomes sampled
+from the request logs. Point the runners at it with FACESWAP_STAND_IN_URL:
+
+    python3 stand_in_server.py --port 8765 --time-scale 0.1
+    FACESWAP_STAND_IN_URL=http://127.0.0.1:8765 python3 continue_multiface_v43_with_logging.py
+
+The runners still append to their usual logs, so run experiments in a
+scratch checkout if those rows should not mix with real data.
+"""
+
+import argparse
+import sys
+import time
+
+from shared.utils.stand_in import STAND_IN_ENV, ApiStandInServer, ReplayProfile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the Segmind and Thortful endpoints')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='multiply replayed latencies and reported generation times (0.1 = ten times faster)')
+    parser.add_argument('--workers', type=int, default=64, help='concurrent generations before requests queue')
+    parser.add_argument('--gateway-timeout', type=float,
+                        help='return 504 when queueing plus generation exceeds this many (scaled) seconds')
+    parser.add_argument('--credits', type=float, help='starting X-remaining-credits (default: last logged value)')
+    parser.add_argument('--logs', nargs='+', help='request log CSVs to sample from (default: all found)')
+    parser.add_argument('--seed', type=int, help='seed for outcome sampling')
+    args = parser.parse_args(argv)
+
+    profile = ReplayProfile.from_logs(args.logs)
+    server = ApiStandInServer(args.host, args.port, workers=args.workers, gateway_timeout=args.gateway_timeout,
+                              time_scale=args.time_scale, profile=profile, initial_credits=args.credits,
+                              seed=args.seed)
+    print(f"🧪 Stand-in at {server.url} (latencies × {args.time_scale:g}, {args.workers} workers)")
+    for api_version, counts in profile.summary().items():
+        outcomes = ', '.join(f"{status}×{count}" for status, count in sorted(counts.items()))
+        print(f"   {api_version:<12} {outcomes}")
+    print(f"\n   export {STAND_IN_ENV}={server.url.rstrip('/')}")
+
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"\n📊 {server.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
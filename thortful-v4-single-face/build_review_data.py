@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Build review-data/ for thortful_review.html
+
+Converts logs/main_test_results.csv into pre-parsed JSON shards plus a
+small index (shared/utils/review_shards.py), writes the log's rollups to
+review-data/stats.json (shared/utils/stats_rollups.py), and renders
+thumbnails of the source and result images the page shows. Only rows appended since the last
+build are parsed and only new or changed images are thumbnailed, so it is
+cheap to re-run; serve_review.py does so whenever the page refreshes.
+
+    python3 build_review_data.py
+    python3 build_review_data.py --no-thumbnails
+"""
+
+import argparse
+import os
+import sys
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.utils.review_shards import ReviewShards
+from shared.utils.stats_rollups import load_stats_rollups
+from shared.utils.thumbnails import THUMBNAIL_FORMAT, ThumbnailStore, thumbnail_path
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOG_PATH = os.path.join('logs', 'main_test_results.csv')
+DATA_DIR = 'review-data'
+IMAGE_DIRS = ['results', 'source-images']
+
+# The page's image cells are 130-180px tall, so the 240px thumbnail covers 1x and most 2x screens
+THUMBNAIL_WIDTH = 240
+
+
+def build_review_data(log_path=LOG_PATH, out_dir=DATA_DIR, thumbnails=True):
+    """Bring review-data/ (and thumbnails/) up to date; paths are relative to this directory"""
+    store = None
+    if thumbnails and THUMBNAIL_FORMAT is not None:
+        store = ThumbnailStore.load(widths=(THUMBNAIL_WIDTH,))
+        store.update(os.path.join(directory, name) for directory in IMAGE_DIRS if os.path.isdir(directory)
+                     for name in sorted(os.listdir(directory)) if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+        store.save()
+
+    def thumbnail(image_path):
+        entry = store.images.get(image_path)
+        if entry is None or 'error' in entry:
+            return None
+        return quote(thumbnail_path(image_path, THUMBNAIL_WIDTH))
+
+    shards = ReviewShards.load(out_dir, thumbnail=thumbnail if store is not None else None)
+    added = shards.update(log_path)
+    shards.save()
+    load_stats_rollups([log_path], os.path.join(out_dir, 'stats.json'))
+    return shards, added, store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build sharded JSON data for thortful_review.html')
+    parser.add_argument('--log', default=LOG_PATH, help='results log to convert')
+    parser.add_argument('--out', default=DATA_DIR, help='output directory')
+    parser.add_argument('--no-thumbnails', action='store_true', help='link the full-size images only')
+    args = parser.parse_args(argv)
+
+    os.chdir(HERE)
+    if not os.path.exists(args.log):
+        print(f"❌ Results log not found: {args.log}")
+        return 1
+
+    shards, added, store = build_review_data(args.log, args.out, thumbnails=not args.no_thumbnails)
+    print(f"📦 {args.out}/: {shards.total} rows in {len(shards.shards)} shards ({added} new)")
+    if store is not None:
+        print(f"🖼️ Thumbnails: {store.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,69 +1,69 @@
 #!/usr/bin/env python3
 """
-Clean the main_test_results.csv to only include entries with existing files
+Check main_test_results.csv against the source and result images
+
+Streams the log once against a single directory listing of source-images/
+and results/, reporting orphan rows (missing source or result image) and
+orphan images (result files no row refers to). Orphan rows are excluded
+by writing a small segment under logs/main_test_results.csv.segments/
+instead of rewriting the CSV, so the log stays append-only.
 """
 
-import csv
+import argparse
 import os
+import sys
+import time
 from pathlib import Path
 
-def clean_csv():
-    # Read existing CSV
-    with open('logs/main_test_results.csv', 'r') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from shared.utils.consistency import check_log, write_exclusion_segment
+
+LOG_FILE = Path('logs/main_test_results.csv')
+SOURCE_DIR = Path('source-images')
+RESULTS_DIR = Path('results')
+
+
+def clean_csv(dry_run=False, verbose=False):
+    started = time.perf_counter()
+    report = check_log(str(LOG_FILE), str(SOURCE_DIR), str(RESULTS_DIR))
+    elapsed = time.perf_counter() - started
 
-    print(f'Original CSV has {len(rows)} entries')
+    print(f"Checked {report.rows_checked} rows in {elapsed * 1000:.1f}ms "
+          f"({report.already_excluded} already excluded)")
 
-    # Filter to only include entries where:
-    # 1. Source image exists in source-images/
-    # 2. Result image exists in results/ (if success=True)
-    valid_rows = []
-    source_dir = Path('source-images')
-    results_dir = Path('results')
+    by_reason = {}
+    for row in report.orphan_rows:
+        by_reason.setdefault(row['reason'], []).append(row)
+    for reason, rows in sorted(by_reason.items()):
+        print(f"❌ {len(rows)} rows with {reason.replace('_', ' ')}")
+        if verbose:
+            for row in rows:
+                print(f"    {row['source_image']} -> {row['result_image']}")
 
-    for row in rows:
-        source_path = source_dir / row['source_image']
-        
-        # Check if source image exists
-        if not source_path.exists():
-            print(f"❌ Source image missing: {row['source_image']}")
-            continue
-        
-        # If it's a successful test, check if result image exists
-        if row['success'] == 'True' and row['result_image'] != 'error':
-            result_path = results_dir / row['result_image']
-            if not result_path.exists():
-                print(f"❌ Result image missing: {row['result_image']}")
-                continue
-        
-        valid_rows.append(row)
+    if report.orphan_images:
+        print(f"🖼️  {len(report.orphan_images)} result images not referenced by any log row")
+        if verbose:
+            for name in report.orphan_images:
+                print(f"    {name}")
 
-    print(f'Filtered CSV has {len(valid_rows)} valid entries')
+    if report.is_consistent:
+        print('✅ Log and result files are consistent')
+        return
 
-    # Create backup
-    with open('logs/main_test_results.csv.backup', 'w') as f:
-        with open('logs/main_test_results.csv', 'r') as original:
-            f.write(original.read())
+    if dry_run:
+        print('ℹ️ Dry run - no exclusion segment written')
+        return
 
-    # Write cleaned CSV
-    with open('logs/main_test_results.csv', 'w', newline='') as f:
-        if valid_rows:
-            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-            writer.writeheader()
-            writer.writerows(valid_rows)
-        else:
-            # Keep header only
-            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-            writer.writeheader()
+    segment = write_exclusion_segment(str(LOG_FILE), report.orphan_rows)
+    if segment:
+        print(f"✅ Excluded {len(report.orphan_rows)} rows via {os.path.relpath(segment)}")
 
-    print('✅ CSV cleaned - backup saved as main_test_results.csv.backup')
-    
-    # Show what's left
-    print(f"\n📊 Remaining entries:")
-    for row in valid_rows:
-        status = "✅" if row['success'] == 'True' else "❌"
-        print(f"  {status} {row['source_image']} -> {row['result_image']}")
 
 if __name__ == "__main__":
-    clean_csv()
\ No newline at end of file
+    os.chdir(Path(__file__).parent)
+    parser = argparse.ArgumentParser(description='Check main_test_results.csv against result files')
+    parser.add_argument('--dry-run', action='store_true', help='report only, do not write a segment')
+    parser.add_argument('-v', '--verbose', action='store_true', help='list every orphan row and image')
+    args = parser.parse_args()
+    clean_csv(dry_run=args.dry_run, verbose=args.verbose)
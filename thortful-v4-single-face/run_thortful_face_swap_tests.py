@@ -19,9 +19,17 @@ import subprocess
 from datetime import datetime
 from pathlib import Path
 from thortful_auth import get_thortful_auth
+from shared.utils import tracing
+from shared.utils.events import default_events_path, open_event_stream, RequestEvents
+from shared.utils.metrics import NullMetrics, pop_metrics_port, start_metrics
+from shared.utils.regression import check_session_regressions
+from shared.utils.timeout_policy import request_timeout
+from shared.utils.request_logs import parse_float
+from shared.utils.stand_in import route_url
+from shared.utils.phase_timing import log_phase_timings, phase_timer, timed_session
 
 # Configuration
-API_ENDPOINT = "https://www.thortful.com/api/v1/faceswap?variation=true"
+API_ENDPOINT = route_url("https://www.thortful.com/api/v1/faceswap?variation=true")
 SOURCE_DIR = Path("source-images")
 TARGET_DIR = Path("target-images")
 RESULTS_DIR = Path("results")
@@ -60,6 +68,10 @@ CARD_TARGETS = {
 
 CARD_IDS = list(CARD_TARGETS.keys())
 
+# Shared session: keeps the connection alive between requests and records
+# DNS/connect/TLS/upload/first-byte timings for each request
+SESSION = timed_session()
+
 def ensure_directories():
     """Create necessary directories if they don't exist"""
     for directory in [SOURCE_DIR, TARGET_DIR, RESULTS_DIR, LOGS_DIR]:
@@ -67,8 +79,11 @@ def ensure_directories():
 
 def encode_image_to_base64(image_path):
     """Convert image file to base64 string"""
-    with open(image_path, 'rb') as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+    with tracing.span('read', file=image_path.name):
+        with open(image_path, 'rb') as image_file:
+            image_bytes = image_file.read()
+    with tracing.span('encode', bytes=len(image_bytes)):
+        return base64.b64encode(image_bytes).decode('utf-8')
 
 def create_csv_header():
     """Create CSV log file with headers if it doesn't exist"""
@@ -90,16 +105,19 @@ def create_csv_header():
                 'notes'
             ])
 
-def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_retries=3):
+def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_retries=3, events=None):
     """
     Perform single face swap using Thortful API with retry logic for 504 errors
     Returns result data dictionary
     """
+    events = events or RequestEvents(None, '')
     start_time = time.time()
     last_error = None
+    timer = None
     
     try:
         # Encode images to base64
+        events.mark('encode_start')
         print(f"📸 Encoding source image: {source_path.name}")
         source_base64 = encode_image_to_base64(source_path)
         
@@ -113,6 +131,7 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
             "targetCardId": card_id,      # camelCase version
             "target_card_id": card_id     # snake_case version (fallback)
         }
+        events.mark('encode_end', source_base64_bytes=len(source_base64))
         
         print(f"🚀 Sending request to Thortful API...")
         print(f"   Source: {source_path.name}")
@@ -125,27 +144,40 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
         response = None
         for attempt in range(max_retries):
             try:
-                # Make API request (timeout set to 180s to work with gateway limits)
-                response = requests.post(
-                    API_ENDPOINT,
-                    headers=auth_headers,
-                    json=payload,
-                    timeout=180  # Reduced from 300s to work better with gateway
-                )
+                # Make API request (connect/read timeouts tuned from past success latencies,
+                # 180s until there are enough of them)
+                events.mark('send', attempt=attempt + 1)
+                with phase_timer() as timer, tracing.span('http', attempt=attempt + 1):
+                    attempt_response = SESSION.post(
+                        API_ENDPOINT,
+                        headers=auth_headers,
+                        json=payload,
+                        timeout=request_timeout('v4-thortful'),
+                        stream=True   # return at the headers so first byte can be timed
+                    )
+                    events.mark('first_byte', status=attempt_response.status_code)
+                    body = attempt_response.content  # read the body
+                    timer.mark('body_end')
+                events.mark('complete', status=attempt_response.status_code, bytes=len(body))
+                response = attempt_response
                 break  # Success, exit retry loop
             except requests.exceptions.Timeout as e:
                 last_error = f"Timeout on attempt {attempt + 1}: {str(e)}"
+                events.mark('error', attempt=attempt + 1, error='timeout')
                 print(f"⚠️ Timeout on attempt {attempt + 1}/{max_retries}")
                 if attempt < max_retries - 1:
                     print(f"   Retrying in 10 seconds...")
-                    time.sleep(10)
+                    with tracing.span('retry_wait', category='idle'):
+                        time.sleep(10)
                 continue
             except Exception as e:
                 last_error = str(e)
+                events.mark('error', attempt=attempt + 1, error=str(e)[:200])
                 print(f"⚠️ Error on attempt {attempt + 1}/{max_retries}: {e}")
                 if attempt < max_retries - 1:
                     print(f"   Retrying in 10 seconds...")
-                    time.sleep(10)
+                    with tracing.span('retry_wait', category='idle'):
+                        time.sleep(10)
                 continue
         
         if response is None:
@@ -158,13 +190,15 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
                 'generation_time': 'timeout_error',
                 'request_time': f"{request_time:.3f}",
                 'error_message': f"Failed after {max_retries} attempts: {last_error}",
+                'phases': timer,
                 'raw_response': {}
             }
         
         request_time = time.time() - start_time
         
         if response.status_code == 200:
-            result_data = response.json()
+            with tracing.span('decode', bytes=len(response.content)):
+                result_data = response.json()
             print(f"✅ Success! Processing took {request_time:.2f}s")
             
             # Print full API response for cost analysis
@@ -177,19 +211,23 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
             # Handle different response formats
             if 'image' in result_data:
                 # Save the result image
-                result_image_data = base64.b64decode(result_data['image'])
-                with open(result_path, 'wb') as f:
+                with tracing.span('decode', field='image'):
+                    result_image_data = base64.b64decode(result_data['image'])
+                with tracing.span('write', file=result_filename), open(result_path, 'wb') as f:
                     f.write(result_image_data)
                 print(f"💾 Result saved: {result_filename}")
             elif 'result_url' in result_data:
                 # Download from URL
-                img_response = requests.get(result_data['result_url'])
-                with open(result_path, 'wb') as f:
+                with tracing.span('http', url='result_url'):
+                    img_response = requests.get(result_data['result_url'])
+                with tracing.span('write', file=result_filename), open(result_path, 'wb') as f:
                     f.write(img_response.content)
                 print(f"💾 Result downloaded: {result_filename}")
             else:
                 print("⚠️ No image data found in response")
                 result_filename = "no_image_returned"
+            timer.mark('write_end')
+            events.mark('write', result_image=result_filename)
             
             # Extract generation time from various possible fields
             generation_time = 'unknown'
@@ -209,6 +247,7 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
                 'generation_time': generation_time,
                 'request_time': f"{request_time:.3f}",
                 'error_message': '',
+                'phases': timer,
                 'raw_response': result_data
             }
             
@@ -223,6 +262,7 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
                     'generation_time': 'gateway_timeout',
                     'request_time': f"{request_time:.3f}",
                     'error_message': f"Gateway Timeout (504) - V4 processing exceeded gateway limit (~60s)",
+                    'phases': timer,
                     'raw_response': {}
                 }
             else:
@@ -233,6 +273,7 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
                     'generation_time': 'error',
                     'request_time': f"{request_time:.3f}",
                     'error_message': f"HTTP {response.status_code}: {response.text}",
+                    'phases': timer,
                     'raw_response': {}
                 }
             
@@ -245,9 +286,11 @@ def run_single_face_swap(source_path, target_path, card_id, auth_headers, max_re
             'generation_time': 'exception',
             'request_time': f"{request_time:.3f}",
             'error_message': str(e),
+            'phases': timer,
             'raw_response': {}
         }
 
+@tracing.traced('log')
 def log_test_result(source_path, target_path, card_id, result_data):
     """Log test result to CSV file"""
     timestamp = datetime.now().isoformat()
@@ -271,7 +314,17 @@ def log_test_result(source_path, target_path, card_id, result_data):
             result_data['error_message'],
             f'Thortful API diverse face test - {target_template}'
         ])
+    
+    # Phase timings go to a sidecar keyed by the row timestamp (the main CSV schema is fixed)
+    if result_data.get('phases') is not None:
+        # generation_time falls back to request_time when the API does not report one
+        generation_time = result_data['generation_time']
+        if generation_time == result_data['request_time']:
+            generation_time = ''
+        log_phase_timings(LOG_FILE, {'timestamp': timestamp, 'api_version': 'v4-thortful', 'card_id': card_id},
+                          result_data['phases'], generation_time)
 
+@tracing.traced('git_publish')
 def commit_to_github(test_count, total_tests, success_count):
     """Commit results to GitHub and push to origin"""
     try:
@@ -326,10 +379,12 @@ def send_notification(message, is_error=False):
         with open(error_file, 'a', encoding='utf-8') as f:
             f.write(f"{full_message}\n")
 
-def run_test_batch():
+def run_test_batch(events_path=None, metrics=None):
     """Run tests on all source/target image combinations with auto-restart capabilities"""
     max_failures = 10  # Maximum consecutive failures before stopping
     consecutive_failures = 0
+    metrics = metrics or NullMetrics()
+    event_stream = open_event_stream(events_path, runner='run_thortful_face_swap_tests', endpoint=API_ENDPOINT)
     
     try:
         send_notification("🚀 Starting comprehensive face swap testing...")
@@ -339,7 +394,8 @@ def run_test_batch():
         
         # Get authentication
         print("🔐 Getting Thortful authentication...")
-        auth_headers = get_thortful_auth()
+        with tracing.span('auth'):
+            auth_headers = get_thortful_auth()
         if not auth_headers:
             send_notification("Failed to get authentication headers", is_error=True)
             return
@@ -371,13 +427,26 @@ def run_test_batch():
                 for card_id in CARD_IDS:
                     test_count += 1
                     print(f"\n=== Test {test_count}/{total_tests} ===")
+                    metrics.set_queue_depth('v4-thortful', total_tests - test_count + 1)
                     
                     try:
-                        # Run the test
-                        result_data = run_single_face_swap(source_path, target_path, card_id, auth_headers)
-                        
-                        # Log the result
-                        log_test_result(source_path, target_path, card_id, result_data)
+                        request_id = f"thortful_{int(time.time()*1000)}"
+                        with tracing.span('request', category='request', request_id=request_id,
+                                          card=CARD_TARGETS[card_id]):
+                            with event_stream.request(request_id, source_image=source_path.name,
+                                                      target_image=CARD_TARGETS[card_id], card_id=card_id,
+                                                      api_version='v4-thortful') as events:
+                                # Run the test
+                                with metrics.tracking('v4-thortful'):
+                                    result_data = run_single_face_swap(source_path, target_path, card_id, auth_headers,
+                                                                       events=events)
+                                metrics.observe('v4-thortful', parse_float(result_data['request_time']),
+                                                result_data['success'], result_data.get('error_message') or '')
+                            
+                                # Log the result
+                                log_test_result(source_path, target_path, card_id, result_data)
+                                events.mark('log', success=result_data['success'],
+                                            request_time=result_data['request_time'])
                         
                         if result_data['success']:
                             success_count += 1
@@ -404,7 +473,8 @@ def run_test_batch():
                                 send_notification(f"GitHub commit failed: {e}", is_error=True)
                         
                         # Brief pause between requests
-                        time.sleep(1)
+                        with tracing.span('pause', category='idle'):
+                            time.sleep(1)
                         
                     except KeyboardInterrupt:
                         send_notification("❌ Script interrupted by user", is_error=True)
@@ -426,6 +496,15 @@ def run_test_batch():
         print(f"📋 Detailed logs saved to: {LOG_FILE}")
         print(f"🖼️  Result images saved to: {RESULTS_DIR}")
         
+        # Compare this session's latency and success rate with earlier sessions
+        try:
+            regressions = [c for c in check_session_regressions([str(LOG_FILE)], str(LOGS_DIR)) if c.is_regression]
+            if regressions:
+                send_notification(f"⚠️ {len(regressions)} regressions vs earlier sessions "
+                                  f"({', '.join(c.group for c in regressions)})", is_error=True)
+        except Exception as e:
+            print(f"⚠️ Regression check failed: {e}")
+        
         # Final commit to GitHub
         try:
             commit_to_github(test_count, total_tests, success_count)
@@ -436,22 +515,40 @@ def run_test_batch():
     except Exception as e:
         send_notification(f"❌ Critical error in run_test_batch: {e}", is_error=True)
         raise
+    finally:
+        event_stream.close()
+        metrics.set_queue_depth('v4-thortful', 0)
 
 def main():
     """Main function"""
     print("🧪 Thortful Diverse Face V4 Testing")
     print("=" * 50)
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--single':
+    # Stage events go to logs/events/ unless disabled
+    argv, metrics_port = pop_metrics_port(sys.argv)
+    events_path = None if '--no-events' in argv else default_events_path(str(LOGS_DIR))
+    # --trace writes a Chrome/Perfetto trace of every stage span to logs/traces/
+    if '--trace' in argv:
+        tracing.enable(tracing.default_trace_path(str(LOGS_DIR)), runner='run_thortful_face_swap_tests')
+    argv = [arg for arg in argv if arg not in ('--no-events', '--trace')]
+    try:
+        run_main(argv, events_path, metrics_port)
+    finally:
+        tracing.close()
+
+def run_main(argv, events_path, metrics_port):
+    """Dispatch single-test or batch mode"""
+    
+    if len(argv) > 1:
+        if argv[1] == '--single':
             # Single test mode
-            if len(sys.argv) < 4:
+            if len(argv) < 4:
                 print("Usage: python run_thortful_face_swap_tests.py --single <source_image> <target_image> [card_id]")
                 return
             
-            source_path = Path(sys.argv[2])
-            target_path = Path(sys.argv[3])
-            card_id = sys.argv[4] if len(sys.argv) > 4 else CARD_IDS[0]  # Use first card ID as default
+            source_path = Path(argv[2])
+            target_path = Path(argv[3])
+            card_id = argv[4] if len(argv) > 4 else CARD_IDS[0]  # Use first card ID as default
             
             if not source_path.exists():
                 print(f"❌ Source image not found: {source_path}")
@@ -471,8 +568,17 @@ def main():
                 return
             
             # Run single test
-            result_data = run_single_face_swap(source_path, target_path, card_id, auth_headers)
-            log_test_result(source_path, target_path, card_id, result_data)
+            request_id = f"thortful_{int(time.time()*1000)}"
+            with open_event_stream(events_path, runner='run_thortful_face_swap_tests --single') as event_stream:
+                with tracing.span('request', category='request', request_id=request_id,
+                                  card=CARD_TARGETS.get(card_id, card_id)):
+                    with event_stream.request(request_id, source_image=source_path.name,
+                                              target_image=CARD_TARGETS.get(card_id, card_id), card_id=card_id,
+                                              api_version='v4-thortful') as events:
+                        result_data = run_single_face_swap(source_path, target_path, card_id, auth_headers,
+                                                           events=events)
+                        log_test_result(source_path, target_path, card_id, result_data)
+                        events.mark('log', success=result_data['success'], request_time=result_data['request_time'])
             
             print(f"\n✅ Single test complete!")
             if result_data['success']:
@@ -480,10 +586,15 @@ def main():
             else:
                 print(f"❌ Test failed: {result_data['error_message']}")
         else:
-            print("Usage: python run_thortful_face_swap_tests.py [--single <source> <target>]")
+            print("Usage: python run_thortful_face_swap_tests.py [--single <source> <target>] [--no-events] "
+                  "[--metrics-port N] [--trace]")
     else:
-        # Batch test mode
-        run_test_batch()
+        # Batch test mode; live metrics are served while it runs if --metrics-port is given
+        metrics = start_metrics(metrics_port, 'run_thortful_face_swap_tests')
+        try:
+            run_test_batch(events_path, metrics)
+        finally:
+            metrics.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
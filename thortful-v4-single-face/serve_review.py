@@ -1,59 +1,100 @@
 #!/usr/bin/env python3
 """
-Simple HTTP Server for Thortful Test Results Review
-Serves the HTML review page and associated files
+HTTP Server for Thortful Test Results Review
+Serves the HTML review page and associated files with the shared
+ReviewServer (shared/utils/review_server.py): threaded keep-alive
+connections, sendfile for images, ETag/Range support, gzip/brotli for
+text and an in-memory cache of the thumbnails and shards.
+
+    python3 serve_review.py [port]
+    python3 serve_review.py --root ../dist/thortful-v4-single-face   # a build_static.py site
 """
 
-import http.server
-import socketserver
-import webbrowser
+import argparse
+import errno
 import os
 import sys
+import threading
+import webbrowser
 from pathlib import Path
 
-def start_server(port=8080):
+from build_review_data import DATA_DIR, LOG_PATH, build_review_data
+from shared.utils.review_server import ReviewServer
+
+# Ports tried, from the requested one up, before giving up
+PORT_ATTEMPTS = 10
+
+_build_lock = threading.Lock()
+
+
+def refresh_review_data(path):
+    """Bring review-data/ up to date whenever the page fetches its index"""
+    if path == f"/{DATA_DIR}/index.json" and os.path.exists(LOG_PATH):
+        with _build_lock:
+            build_review_data()
+
+
+def start_server(port=8080, root=None, open_browser=True, verbose=False):
     """Start the HTTP server for the review page"""
-    
+
     # Change to the current directory to serve files
     os.chdir(Path(__file__).parent)
-    
-    handler = http.server.SimpleHTTPRequestHandler
-    
+
+    if root is None and os.path.exists(LOG_PATH):
+        shards, _, _ = build_review_data()
+        print(f"📦 Review data: {shards.total} rows in {len(shards.shards)} shards")
+
+    httpd = None
+    for candidate in range(port, port + PORT_ATTEMPTS):
+        try:
+            httpd = ReviewServer(root or '.', port=candidate, verbose=verbose,
+                                 on_get=refresh_review_data if root is None else None)
+            break
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE:
+                print(f"❌ Error starting server: {e}")
+                return 1
+            print(f"❌ Port {candidate} is already in use. Trying port {candidate + 1}...")
+    if httpd is None:
+        print(f"❌ No free port in {port}-{port + PORT_ATTEMPTS - 1}")
+        return 1
+
+    print(f"🌐 Starting Thortful Review Server")
+    print(f"📊 Review page: {httpd.url}thortful_review.html")
+    print(f"📁 Serving files from: {httpd.directory}")
+    if root is None:
+        print("   - source-images/")
+        print("   - target-images/")
+        print("   - results/")
+        print("   - logs/")
+        print(f"   - {DATA_DIR}/ (rebuilt from logs/ on each refresh)")
+    print(f"🛑 Press Ctrl+C to stop server")
+    print("=" * 60)
+
+    if open_browser:
+        print(f"🔗 Opening in browser...")
+        webbrowser.open(f'{httpd.url}thortful_review.html')
+
     try:
-        with socketserver.TCPServer(("", port), handler) as httpd:
-            print(f"🌐 Starting Thortful Review Server")
-            print(f"📊 Review page: http://localhost:{port}/thortful_review.html")
-            print(f"🔗 Opening in browser...")
-            print(f"📁 Serving files from: {Path.cwd()}")
-            print("   - source-images/")
-            print("   - target-images/") 
-            print("   - results/")
-            print("   - logs/")
-            print(f"🛑 Press Ctrl+C to stop server")
-            print("=" * 60)
-            
-            # Open browser automatically
-            webbrowser.open(f'http://localhost:{port}/thortful_review.html')
-            
-            # Start serving
-            httpd.serve_forever()
-            
+        httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n🛑 Server stopped")
-    except OSError as e:
-        if "Address already in use" in str(e):
-            print(f"❌ Port {port} is already in use. Trying port {port + 1}...")
-            start_server(port + 1)
-        else:
-            print(f"❌ Error starting server: {e}")
+    finally:
+        httpd.stop()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the Thortful review page')
+    parser.add_argument('port', nargs='?', type=int, default=8080, help='port to try first (default 8080)')
+    parser.add_argument('--root', help='serve this directory instead, e.g. a build_static.py copy; no data rebuilds')
+    parser.add_argument('--no-browser', action='store_true', help="don't open the review page")
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    root = os.path.abspath(args.root) if args.root else None
+    return start_server(args.port, root, open_browser=not args.no_browser, verbose=args.verbose)
+
 
 if __name__ == "__main__":
-    port = 8080
-    if len(sys.argv) > 1:
-        try:
-            port = int(sys.argv[1])
-        except ValueError:
-            print("Usage: python serve_review.py [port_number]")
-            sys.exit(1)
-    
-    start_server(port)
\ No newline at end of file
+    sys.exit(main())
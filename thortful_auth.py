@@ -9,12 +9,14 @@ import json
 import os
 from datetime import datetime
 
+from shared.utils.stand_in import route_url
+
 def get_anonymous_token():
     """
     Get anonymous token from /auth/enquire endpoint
     Returns anonymous token or None if failed
     """
-    enquire_url = "https://www.thortful.com/api/v1/auth/enquire"
+    enquire_url = route_url("https://www.thortful.com/api/v1/auth/enquire")
     
     headers = {
         'Content-Type': 'application/json',
@@ -71,7 +73,7 @@ def authenticate_thortful():
         return get_fallback_headers()
     
     # Step 2: Login with anonymous token
-    login_url = "https://www.thortful.com/api/v1/auth/thortful/login"
+    login_url = route_url("https://www.thortful.com/api/v1/auth/thortful/login")
     
     # Headers for login request
     headers = {
@@ -254,10 +256,11 @@ if __name__ == "__main__":
         
         print("\n" + "⚠️ " * 20)
         print("🚨 CRITICAL REMINDER FOR API CALLS:")
-        print("   - Use minimum 120s timeout (recommended: 180s)")
         print("   - Face swap processing takes 45-60+ seconds")
         print("   - Short timeouts cause false failures!")
-        print("   - Example: requests.post(url, headers=headers, timeout=180)")
+        print("   - Use the tuned timeout (180s until there is enough latency data):")
+        print("     requests.post(url, headers=headers, timeout=request_timeout('v4-thortful'))")
+        print("   - python3 timeout_report.py shows the current values per endpoint")
         print("⚠️ " * 20)
     else:
         print("\n❌ Authentication failed!")
\ No newline at end of file
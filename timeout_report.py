@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Per-endpoint timeouts derived from the observed success latencies
+
+Shows, for each endpoint, the successful-request percentiles, the
+connect/read timeouts the runners will use (shared/utils/timeout_policy.py)
+and how many past successes each candidate timeout would have cut off.
+
+    python3 timeout_report.py
+    python3 timeout_report.py --endpoint v4-thortful --timeouts 60,90,120,180
+"""
+
+import argparse
+import json
+import sys
+
+from shared.utils.timeout_policy import (
+    MIN_SAMPLES, READ_MARGIN, READ_PERCENTILE, TimeoutPolicy, default_state_path,
+)
+
+
+def parse_timeouts(text):
+    try:
+        return [float(value) for value in text.split(',') if value.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError('timeouts must be numbers in seconds, e.g. 60,120,180')
+
+
+def format_seconds(value):
+    return '-' if value is None else f"{value:.1f}s"
+
+
+def print_report(rows):
+    for row in rows:
+        latency = row['latency']
+        source = 'tuned' if row['tuned'] else f"default, fewer than {MIN_SAMPLES} successes"
+        print(f"\n🎯 {row['endpoint']}  ({row['successes']} successes)")
+        print(f"   success latency  p50 {format_seconds(latency['p50'])}  p99 {format_seconds(latency['p99'])}  "
+              f"p{READ_PERCENTILE:g} {format_seconds(latency[f'p{READ_PERCENTILE:g}'])}  "
+              f"max {format_seconds(latency['max'])}")
+        print(f"   timeout          connect {row['connect_timeout']:g}s, read {row['read_timeout']:g}s ({source})")
+        for timeout, cut in row['cut_off'].items():
+            share = cut / row['successes'] * 100 if row['successes'] else 0.0
+            marker = '  ← policy' if float(timeout) == row['read_timeout'] else ''
+            print(f"   {timeout:>7}s would cut off {cut:>4} successes ({share:.1f}%){marker}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Timeouts derived from observed success latencies')
+    parser.add_argument('--state', default=default_state_path(), help='timeout policy state file')
+    parser.add_argument('--rebuild', action='store_true', help='ignore saved state and rescan everything')
+    parser.add_argument('--logs', nargs='+', help='request log CSVs (default: all found)')
+    parser.add_argument('--endpoint', action='append', help='endpoint(s) to show (default: all)')
+    parser.add_argument('--timeouts', type=parse_timeouts, default=parse_timeouts('60,120,150,180'),
+                        help='candidate read timeouts to evaluate, in seconds')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    policy = TimeoutPolicy() if args.rebuild else TimeoutPolicy.load(args.state)
+    added = policy.update(args.logs)
+    policy.save(args.state)
+    rows = policy.report(args.endpoint, args.timeouts)
+
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    else:
+        print(f"🔄 Read {added} new rows")
+        print(f"⏱️ Read timeout = p{READ_PERCENTILE:g} of successes × {READ_MARGIN:g}")
+        print_report(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())